@@ -9,7 +9,21 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import re
+import uuid
 from urllib.parse import urlparse, parse_qs
+from database import DATABASE_PATH, get_pool
+from migrations import migrate, current_version, LATEST_VERSION
+from cache import bump_version, module_catalog, MODULES
+from quiz_engine import (snapshot_cache, bank_cache, quiz_version_name, quiz_version, sample_snapshot,
+                         sample_ids, new_seed, fetch_questions, module_title, QuizSnapshot,
+                         OPTION_LETTERS, STRATA, QUIZ_SAMPLE_SIZE)
+from irt import AdaptiveTest, item_cache, MIN_BANK_SIZE
+from item_analysis import analysis_cache, answers_version_name
+from content_render import store_sections, section_cache, load_toc, read_anchors, record_section_read
+from search import search, SOURCES as SEARCH_SOURCES
+from question_dedup import find_duplicates, index_question, index_questions, duplicate_report, DUPLICATE_THRESHOLD
+from review_queue import record_answers, review_card, due_cards, queue_stats, AGAIN, HARD, GOOD, EASY
+from gamification import record_points, apply_points, apply_badge, leaderboard, gamification_queue, EVER
 
 # Page configuration
 st.set_page_config(
@@ -46,141 +60,32 @@ if 'quiz_answers' not in st.session_state:
     st.session_state.quiz_answers = {}
 if 'quiz_started' not in st.session_state:
     st.session_state.quiz_started = False
+if 'quiz_attempt_id' not in st.session_state:
+    st.session_state.quiz_attempt_id = None
+if 'quiz_snapshot' not in st.session_state:
+    st.session_state.quiz_snapshot = None
+if 'quiz_adaptive' not in st.session_state:
+    st.session_state.quiz_adaptive = None
+if 'quiz_deadline' not in st.session_state:
+    st.session_state.quiz_deadline = None
+if 'quiz_passing_score' not in st.session_state:
+    st.session_state.quiz_passing_score = 70
 
 # Database setup
-DATABASE_PATH = "realestate_guru.db"
-
 def migrate_database():
-    """Migrate existing database to add missing columns"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+    """Apply pending schema migrations"""
+    conn = get_db_connection()
     
     try:
-        # Check if points column exists
-        cursor.execute("PRAGMA table_info(users)")
-        columns = [col[1] for col in cursor.fetchall()]
-        
-        if 'points' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN points INTEGER DEFAULT 0")
-            
-        if 'badges' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN badges TEXT DEFAULT '[]'")
-            
-        if 'streak_days' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN streak_days INTEGER DEFAULT 0")
-        
-        # Check if youtube_url column exists in modules
-        cursor.execute("PRAGMA table_info(modules)")
-        module_columns = [col[1] for col in cursor.fetchall()]
-        
-        if 'youtube_url' not in module_columns:
-            cursor.execute("ALTER TABLE modules ADD COLUMN youtube_url TEXT")
-        
-        conn.commit()
-        
-    except Exception as e:
-        print(f"Migration error: {e}")
+        return migrate(conn)
     finally:
         conn.close()
 
 def init_database():
-    """Initialize database with comprehensive tables and content"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    """Seed the database with the default admin, modules and quiz questions"""
+    conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Create users table with all required columns
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            role TEXT NOT NULL DEFAULT 'student',
-            created_date TEXT NOT NULL,
-            last_login TEXT,
-            active INTEGER DEFAULT 1,
-            points INTEGER DEFAULT 0,
-            badges TEXT DEFAULT '[]',
-            streak_days INTEGER DEFAULT 0
-        )
-    """)
-    
-    # Create modules table with all required columns
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS modules (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT,
-            difficulty TEXT NOT NULL,
-            category TEXT NOT NULL,
-            content TEXT,
-            youtube_url TEXT,
-            order_index INTEGER DEFAULT 0,
-            created_date TEXT NOT NULL,
-            updated_date TEXT,
-            active INTEGER DEFAULT 1
-        )
-    """)
-    
-    # Create quizzes table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS quizzes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            module_id INTEGER NOT NULL,
-            question TEXT NOT NULL,
-            option_a TEXT NOT NULL,
-            option_b TEXT NOT NULL,
-            option_c TEXT NOT NULL,
-            option_d TEXT NOT NULL,
-            correct_answer TEXT NOT NULL,
-            explanation TEXT,
-            created_date TEXT NOT NULL,
-            FOREIGN KEY (module_id) REFERENCES modules (id)
-        )
-    """)
-    
-    # Create user progress table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_progress (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            module_id INTEGER NOT NULL,
-            progress_percentage REAL DEFAULT 0,
-            completed INTEGER DEFAULT 0,
-            started_date TEXT,
-            completed_date TEXT,
-            quiz_score REAL DEFAULT 0,
-            quiz_attempts INTEGER DEFAULT 0,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (module_id) REFERENCES modules (id)
-        )
-    """)
-    
-    # Create user achievements table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_achievements (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            achievement_type TEXT NOT NULL,
-            achievement_name TEXT NOT NULL,
-            points_earned INTEGER DEFAULT 0,
-            earned_date TEXT NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    """)
-    
-    # Create content research table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS content_research (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            topic TEXT NOT NULL,
-            content TEXT NOT NULL,
-            sources TEXT NOT NULL,
-            created_date TEXT NOT NULL,
-            status TEXT DEFAULT 'pending'
-        )
-    """)
-    
     # Insert default admin user if doesn't exist
     cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'admin'")
     admin_count = cursor.fetchone()[0]
@@ -188,9 +93,16 @@ def init_database():
     if admin_count == 0:
         admin_password = hashlib.sha256("admin123".encode()).hexdigest()
         cursor.execute("""
-            INSERT INTO users (username, email, password, role, created_date, points, badges, streak_days)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, ("admin", "admin@realestateguruapp.com", admin_password, "admin", datetime.now().isoformat(), 1000, '["Admin Master", "System Creator"]', 1))
+            INSERT INTO users (username, email, password, role, created_date, streak_days)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, ("admin", "admin@realestateguruapp.com", admin_password, "admin", datetime.now().isoformat(), 1))
+        
+        admin_id = cursor.lastrowid
+        record_points(cursor, admin_id, 1000, "Opening balance")
+        cursor.executemany("""
+            INSERT OR IGNORE INTO user_badges (user_id, badge, earned_date)
+            VALUES (?, ?, ?)
+        """, [(admin_id, badge, datetime.now().isoformat()) for badge in ("Admin Master", "System Creator")])
     
     # Insert comprehensive modules with rich content if they don't exist
     cursor.execute("SELECT COUNT(*) FROM modules")
@@ -304,6 +216,8 @@ RERA was enacted to protect homebuyer interests and promote transparency in real
                 INSERT INTO modules (title, description, difficulty, category, content, youtube_url, order_index, created_date, active)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
             """, (*module, datetime.now().isoformat()))
+            store_sections(cursor, cursor.lastrowid, module[4])
+        bump_version(cursor, MODULES)
     
     # Insert comprehensive quiz questions if they don't exist
     cursor.execute("SELECT COUNT(*) FROM quizzes")
@@ -331,13 +245,47 @@ RERA was enacted to protect homebuyer interests and promote transparency in real
                 INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d, correct_answer, explanation, created_date)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (*question, datetime.now().isoformat()))
+        
+        for module_id in sorted({question[0] for question in quiz_questions}):
+            bump_version(cursor, quiz_version_name(module_id))
+        
+        index_questions(cursor)
     
     conn.commit()
     conn.close()
 
 def get_db_connection():
-    """Get database connection"""
-    return sqlite3.connect(DATABASE_PATH)
+    """Get a pooled database connection (close() returns it to the pool)"""
+    return get_pool().acquire()
+
+def get_schema_version():
+    """Highest migration version applied to the database"""
+    conn = get_db_connection()
+    
+    try:
+        return current_version(conn)
+    finally:
+        conn.close()
+
+def bootstrap_database():
+    """Migrate the database if it is behind, then seed any default data it lacks.
+    
+    Seeding checks each table itself, so a database migrated elsewhere (by
+    hand or another process) still gets its admin, modules and questions.
+    Returns whether migrations ran.
+    """
+    migrated = get_schema_version() < LATEST_VERSION
+    if migrated:
+        migrate_database()
+    
+    init_database()
+    
+    return migrated
+
+@st.cache_resource(show_spinner=False)
+def bootstrap_database_once():
+    """Run the bootstrap a single time per server process, not per rerun"""
+    return bootstrap_database()
 
 # Enhanced CSS Styling with Fixed Images and Gamification
 st.markdown("""
@@ -623,43 +571,51 @@ class ContentResearcher:
 
 # Gamification Functions
 def award_points(user_id, points, reason):
-    """Award points to user"""
+    """Award points to user.
+    
+    Inside a transaction the award joins it (and a failure aborts the
+    transaction); otherwise it is queued for the background writer and shows
+    up in get_user_stats() right away.
+    """
+    if not get_pool().in_transaction():
+        gamification_queue.award_points(user_id, points, reason)
+        return
+    
     conn = get_db_connection()
-    cursor = conn.cursor()
     
     try:
-        cursor.execute("UPDATE users SET points = points + ? WHERE id = ?", (points, user_id))
-        cursor.execute("""
-            INSERT INTO user_achievements (user_id, achievement_type, achievement_name, points_earned, earned_date)
-            VALUES (?, ?, ?, ?, ?)
-        """, (user_id, "points", reason, points, datetime.now().isoformat()))
-        conn.commit()
-    except Exception as e:
-        print(f"Error awarding points: {e}")
+        apply_points(conn.cursor(), user_id, points, reason)
     finally:
         conn.close()
 
 def award_badge(user_id, badge_name):
-    """Award badge to user"""
+    """Award badge to user (queued unless called inside a transaction, which a failure aborts)"""
+    if not get_pool().in_transaction():
+        gamification_queue.award_badge(user_id, badge_name)
+        return
+    
+    conn = get_db_connection()
+    
+    try:
+        apply_badge(conn.cursor(), user_id, badge_name)
+    finally:
+        conn.close()
+
+def award_once(user_id, event_type, object_id, points=0, reason=None, badge=None, window=EVER):
+    """Award points/badge only the first time an event happens in its window"""
+    return gamification_queue.award_once(user_id, event_type, object_id, points, reason, badge, window)
+
+def get_user_badges(user_id):
+    """Get a user's badges in the order they were earned"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute("SELECT badges FROM users WHERE id = ?", (user_id,))
-        result = cursor.fetchone()
-        
-        if result:
-            badges = json.loads(result[0]) if result[0] else []
-            if badge_name not in badges:
-                badges.append(badge_name)
-                cursor.execute("UPDATE users SET badges = ? WHERE id = ?", (json.dumps(badges), user_id))
-                cursor.execute("""
-                    INSERT INTO user_achievements (user_id, achievement_type, achievement_name, points_earned, earned_date)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (user_id, "badge", badge_name, 0, datetime.now().isoformat()))
-                conn.commit()
+        cursor.execute("SELECT badge FROM user_badges WHERE user_id = ? ORDER BY id", (user_id,))
+        return [row[0] for row in cursor.fetchall()]
     except Exception as e:
-        print(f"Error awarding badge: {e}")
+        print(f"Error getting user badges: {e}")
+        return []
     finally:
         conn.close()
 
@@ -668,15 +624,24 @@ def get_user_stats(user_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     
+    def read():
+        cursor.execute("""
+            SELECT COALESCE(b.points, 0), u.streak_days
+            FROM users u
+            LEFT JOIN point_balances b ON b.user_id = u.id
+            WHERE u.id = ?
+        """, (user_id,))
+        return cursor.fetchone(), get_user_badges(user_id)
+    
     try:
-        cursor.execute("SELECT points, badges, streak_days FROM users WHERE id = ?", (user_id,))
-        result = cursor.fetchone()
+        # Awards still waiting in the write-behind queue are added on top
+        (result, badges), pending_points, pending_badges = gamification_queue.read_with_pending(user_id, read)
         
         if result:
             return {
-                'points': result[0] or 0,
-                'badges': json.loads(result[1]) if result[1] else [],
-                'streak_days': result[2] or 0
+                'points': (result[0] or 0) + pending_points,
+                'badges': badges + [b for b in dict.fromkeys(pending_badges) if b not in badges],
+                'streak_days': result[1] or 0
             }
     except Exception as e:
         print(f"Error getting user stats: {e}")
@@ -685,6 +650,49 @@ def get_user_stats(user_id):
     
     return {'points': 0, 'badges': [], 'streak_days': 0}
 
+def get_leaderboard(limit=10):
+    """Top learners by points, with usernames"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        leaderboard.refresh(conn)
+        top = leaderboard.top(limit)
+        
+        if not top:
+            return []
+        
+        user_ids = [user_id for user_id, _ in top]
+        cursor.execute(f"""
+            SELECT id, username FROM users
+            WHERE id IN ({','.join('?' * len(user_ids))})
+        """, user_ids)
+        usernames = dict(cursor.fetchall())
+        
+        return [
+            {'rank': leaderboard.rank(user_id), 'user_id': user_id,
+             'username': usernames.get(user_id, 'Unknown'), 'points': points}
+            for user_id, points in top
+        ]
+    except Exception as e:
+        print(f"Error getting leaderboard: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_user_rank(user_id):
+    """A learner's leaderboard rank and the number of ranked learners"""
+    conn = get_db_connection()
+    
+    try:
+        leaderboard.refresh(conn)
+        return leaderboard.rank(user_id), leaderboard.size()
+    except Exception as e:
+        print(f"Error getting user rank: {e}")
+        return None, 0
+    finally:
+        conn.close()
+
 # YouTube Functions
 def extract_youtube_id(url):
     """Extract YouTube video ID from URL"""
@@ -725,8 +733,10 @@ def authenticate_user(username, password):
     
     try:
         cursor.execute("""
-            SELECT id, username, role, points, badges FROM users 
-            WHERE username = ? AND password = ? AND active = 1
+            SELECT u.id, u.username, u.role, b.points
+            FROM users u
+            LEFT JOIN point_balances b ON b.user_id = u.id
+            WHERE u.username = ? AND u.password = ? AND u.active = 1
         """, (username, hashed_password))
         
         user = cursor.fetchone()
@@ -736,7 +746,7 @@ def authenticate_user(username, password):
             st.session_state.username = user[1]
             st.session_state.user_role = user[2]
             st.session_state.user_points = user[3] or 0
-            st.session_state.user_badges = json.loads(user[4]) if user[4] else []
+            st.session_state.user_badges = get_user_badges(user[0])
             return True
     except Exception as e:
         print(f"Authentication error: {e}")
@@ -757,9 +767,16 @@ def register_user(username, email, password, user_type):
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
         
         cursor.execute("""
-            INSERT INTO users (username, email, password, role, created_date, points, badges, streak_days)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (username, email, hashed_password, user_type, datetime.now().isoformat(), 100, '["Welcome Learner"]', 1))
+            INSERT INTO users (username, email, password, role, created_date, streak_days)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (username, email, hashed_password, user_type, datetime.now().isoformat(), 1))
+        
+        new_user_id = cursor.lastrowid
+        record_points(cursor, new_user_id, 100, "Welcome bonus")
+        cursor.execute("""
+            INSERT INTO user_badges (user_id, badge, earned_date)
+            VALUES (?, ?, ?)
+        """, (new_user_id, "Welcome Learner", datetime.now().isoformat()))
         
         conn.commit()
         return True
@@ -782,9 +799,16 @@ def create_user_by_admin(username, email, password, role):
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
         
         cursor.execute("""
-            INSERT INTO users (username, email, password, role, created_date, points, badges, streak_days)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (username, email, hashed_password, role, datetime.now().isoformat(), 100, '["New Member"]', 0))
+            INSERT INTO users (username, email, password, role, created_date, streak_days)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (username, email, hashed_password, role, datetime.now().isoformat(), 0))
+        
+        new_user_id = cursor.lastrowid
+        record_points(cursor, new_user_id, 100, "Welcome bonus")
+        cursor.execute("""
+            INSERT INTO user_badges (user_id, badge, earned_date)
+            VALUES (?, ?, ?)
+        """, (new_user_id, "New Member", datetime.now().isoformat()))
         
         conn.commit()
         return True, "User created successfully"
@@ -793,20 +817,159 @@ def create_user_by_admin(username, email, password, role):
     finally:
         conn.close()
 
+# Users shown per page in user management
+USERS_PAGE_SIZE = 25
+
+def user_filters(search=None, role=None, active=None):
+    """WHERE clauses and parameters for the user management filters"""
+    clauses, params = [], []
+    
+    if search:
+        # Prefix ranges, so the unique username/email indexes are searched rather than scanned
+        clauses.append("((u.username >= ? AND u.username < ?) OR (u.email >= ? AND u.email < ?))")
+        params += [search, search + '\uffff', search, search + '\uffff']
+    if role:
+        clauses.append("u.role = ?")
+        params.append(role)
+    if active is not None:
+        clauses.append("u.active = ?")
+        params.append(int(active))
+    
+    return clauses, params
+
+def get_user_totals(search=None, role=None, active=None):
+    """Total, active, admin and filter-matching user counts in one aggregate query"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        clauses, params = user_filters(search, role, active)
+        cursor.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(u.active = 1), 0), COALESCE(SUM(u.role = 'admin'), 0),
+                   COALESCE(SUM({' AND '.join(clauses) or '1'}), 0)
+            FROM users u
+        """, params)
+        
+        total, active_users, admins, matching = cursor.fetchone()
+        return {'total': total, 'active': active_users, 'admins': admins, 'matching': matching}
+    except Exception as e:
+        print(f"Error counting users: {e}")
+        return {'total': 0, 'active': 0, 'admins': 0, 'matching': 0}
+    finally:
+        conn.close()
+
+def get_users_page(search=None, role=None, active=None, after=None, page_size=USERS_PAGE_SIZE):
+    """One page of users, newest first; returns (users, key of the next page or None).
+    
+    Pages are keyed on (created_date, id) of the last row shown, so every
+    page is an index range scan however deep it is.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        clauses, params = user_filters(search, role, active)
+        if after:
+            clauses.append("(u.created_date, u.id) < (?, ?)")
+            params += list(after)
+        
+        cursor.execute(f"""
+            SELECT u.id, u.username, u.email, u.role, u.created_date, u.last_login, u.active,
+                   (SELECT points FROM point_balances p WHERE p.user_id = u.id),
+                   (SELECT COUNT(*) FROM user_badges b WHERE b.user_id = u.id)
+            FROM users u
+            {'WHERE ' + ' AND '.join(clauses) if clauses else ''}
+            ORDER BY u.created_date DESC, u.id DESC
+            LIMIT ?
+        """, params + [page_size + 1])
+        
+        rows = cursor.fetchall()
+        next_key = (rows[page_size - 1][4], rows[page_size - 1][0]) if len(rows) > page_size else None
+        rows = rows[:page_size]
+        
+        # First three badges of the users on this page
+        badge_preview = {}
+        if rows:
+            user_ids = [row[0] for row in rows]
+            cursor.execute(f"""
+                SELECT user_id, badge FROM (
+                    SELECT user_id, badge, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY id) as n
+                    FROM user_badges
+                    WHERE user_id IN ({','.join('?' * len(user_ids))})
+                )
+                WHERE n <= 3
+            """, user_ids)
+            for badge_user_id, badge in cursor.fetchall():
+                badge_preview.setdefault(badge_user_id, []).append(badge)
+        
+        users = [
+            {
+                'id': row[0],
+                'username': row[1],
+                'email': row[2],
+                'role': row[3],
+                'created_date': row[4],
+                'last_login': row[5],
+                'active': row[6],
+                'points': row[7] or 0,
+                'badge_count': row[8],
+                'badges': badge_preview.get(row[0], [])
+            }
+            for row in rows
+        ]
+        return users, next_key
+    except Exception as e:
+        print(f"Error getting users: {e}")
+        return [], None
+    finally:
+        conn.close()
+
+def set_user_active(user_id, active):
+    """Activate or deactivate a user account"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("UPDATE users SET active = ? WHERE id = ?", (int(active), user_id))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error updating user status: {e}")
+        return False
+    finally:
+        conn.close()
+
 # Module and Content Functions
 def get_available_modules():
+    """Get all available modules (process-wide cache, reloaded when modules change)"""
+    conn = get_db_connection()
+    
+    try:
+        return [dict(module) for module in module_catalog.get(conn)]
+    except Exception as e:
+        print(f"Error getting modules: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_module_summaries(user_id=None):
+    """Active modules with question count, video flag and the user's best score (one query).
+    
+    Each count is an index range over that module's questions, so the cost
+    follows the modules shown, not the size of the whole bank.
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
         cursor.execute("""
-            SELECT id, title, description, difficulty, category, youtube_url
-            FROM modules 
-            WHERE active = 1
-            ORDER BY order_index
-        """)
-        
-        modules = cursor.fetchall()
+            SELECT m.id, m.title, m.description, m.difficulty, m.category, m.youtube_url,
+                   (SELECT COUNT(*) FROM quizzes q WHERE q.module_id = m.id), p.best_score
+            FROM modules m
+            LEFT JOIN user_progress p ON p.module_id = m.id AND p.user_id = ?
+            WHERE m.active = 1
+            ORDER BY m.order_index
+        """, (user_id,))
         
         return [
             {
@@ -815,12 +978,15 @@ def get_available_modules():
                 'description': module[2],
                 'difficulty': module[3],
                 'category': module[4],
-                'youtube_url': module[5]
+                'youtube_url': module[5],
+                'has_video': bool(module[5]),
+                'question_count': module[6],
+                'best_score': module[7]
             }
-            for module in modules
+            for module in cursor.fetchall()
         ]
     except Exception as e:
-        print(f"Error getting modules: {e}")
+        print(f"Error getting module summaries: {e}")
         return []
     finally:
         conn.close()
@@ -855,17 +1021,94 @@ def get_module_content(module_id):
     
     return None
 
-def update_module_content(module_id, title, description, content, youtube_url):
-    """Update module content"""
+def get_module_page(module_id):
+    """Module header and table of contents for the module page.
+    
+    The header is a single primary-key lookup and the table of contents
+    comes from a covering index; the module's content isn't selected.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT title, description, difficulty, category, youtube_url, content_hash
+            FROM modules
+            WHERE active = 1 AND id = ?
+        """, (module_id,))
+        
+        result = cursor.fetchone()
+        
+        if result:
+            return {
+                'title': result[0],
+                'description': result[1],
+                'difficulty': result[2],
+                'category': result[3],
+                'youtube_url': result[4],
+                'content_hash': result[5],
+                'toc': load_toc(cursor, module_id)
+            }
+    except Exception as e:
+        print(f"Error getting module page: {e}")
+    finally:
+        conn.close()
+    
+    return None
+
+def get_module_section(module_id, content_hash, position):
+    """Body of one pre-rendered section, cached on the module's content hash"""
+    conn = get_db_connection()
+    
+    try:
+        return section_cache.get(conn.cursor(), module_id, content_hash, position)
+    except Exception as e:
+        print(f"Error getting module section: {e}")
+        return None
+    finally:
+        conn.close()
+
+def get_read_sections(user_id, module_id):
+    """Anchors of the module sections the user has read"""
+    conn = get_db_connection()
+    
+    try:
+        return read_anchors(conn.cursor(), user_id, module_id)
+    except Exception as e:
+        print(f"Error getting section progress: {e}")
+        return set()
+    finally:
+        conn.close()
+
+def mark_section_read(user_id, module_id, anchor):
+    """Record that the user has read a section"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        record_section_read(cursor, user_id, module_id, anchor)
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error saving section progress: {e}")
+        return False
+    finally:
+        conn.close()
+
+def update_module_content(module_id, title, description, content, youtube_url, difficulty=None, category=None):
+    """Update module content (difficulty and category are kept unless given)"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
         cursor.execute("""
             UPDATE modules 
-            SET title = ?, description = ?, content = ?, youtube_url = ?, updated_date = ?
+            SET title = ?, description = ?, content = ?, youtube_url = ?,
+                difficulty = COALESCE(?, difficulty), category = COALESCE(?, category), updated_date = ?
             WHERE id = ?
-        """, (title, description, content, youtube_url, datetime.now().isoformat(), module_id))
+        """, (title, description, content, youtube_url, difficulty, category, datetime.now().isoformat(), module_id))
+        store_sections(cursor, module_id, content)
+        bump_version(cursor, MODULES)
         
         conn.commit()
         return True
@@ -884,6 +1127,8 @@ def add_module(title, description, difficulty, category, content="", youtube_url
             INSERT INTO modules (title, description, difficulty, category, content, youtube_url, created_date, active)
             VALUES (?, ?, ?, ?, ?, ?, ?, 1)
         """, (title, description, difficulty, category, content, youtube_url, datetime.now().isoformat()))
+        store_sections(cursor, cursor.lastrowid, content)
+        bump_version(cursor, MODULES)
         
         conn.commit()
         return True
@@ -899,6 +1144,7 @@ def delete_module(module_id):
     
     try:
         cursor.execute("UPDATE modules SET active = 0 WHERE id = ?", (module_id,))
+        bump_version(cursor, MODULES)
         conn.commit()
         return True
     except Exception as e:
@@ -939,16 +1185,74 @@ def get_quiz_questions(module_id):
     finally:
         conn.close()
 
-def add_quiz_question(module_id, question, option_a, option_b, option_c, option_d, correct_answer, explanation):
+# Questions shown per page in quiz management
+QUESTIONS_PAGE_SIZE = 20
+
+def get_module_questions_page(module_id, after=None, page_size=QUESTIONS_PAGE_SIZE):
+    """One page of a module's questions in id order; returns (questions, id to continue after or None).
+    
+    Pages are keyed on the last id shown, so every page is an index range
+    scan however large the bank is.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT id, question, option_a, option_b, option_c, option_d, correct_answer, explanation
+            FROM quizzes
+            WHERE module_id = ? AND id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (module_id, after or 0, page_size + 1))
+        
+        rows = cursor.fetchall()
+        next_key = rows[page_size - 1][0] if len(rows) > page_size else None
+        
+        questions = [
+            {
+                'id': q[0],
+                'question': q[1],
+                'options': {'A': q[2], 'B': q[3], 'C': q[4], 'D': q[5]},
+                'correct_answer': q[6],
+                'explanation': q[7]
+            }
+            for q in rows[:page_size]
+        ]
+        return questions, next_key
+    except Exception as e:
+        print(f"Error getting quiz questions: {e}")
+        return [], None
+    finally:
+        conn.close()
+
+def get_question_bank(module_id):
+    """Question ids of a module at its current quiz version (no question text)"""
+    conn = get_db_connection()
+    
+    try:
+        return bank_cache.get(conn, module_id)
+    except Exception as e:
+        print(f"Error getting question bank: {e}")
+        return None
+    finally:
+        conn.close()
+
+def add_quiz_question(module_id, question, option_a, option_b, option_c, option_d, correct_answer, explanation,
+                      difficulty=None, tag=None):
     """Add a new quiz question"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
         cursor.execute("""
-            INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d, correct_answer, explanation, created_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (module_id, question, option_a, option_b, option_c, option_d, correct_answer, explanation, datetime.now().isoformat()))
+            INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d, correct_answer, explanation,
+                                 difficulty, tag, created_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (module_id, question, option_a, option_b, option_c, option_d, correct_answer, explanation,
+              difficulty, tag or None, datetime.now().isoformat()))
+        index_question(cursor, cursor.lastrowid, question, (option_a, option_b, option_c, option_d))
+        bump_version(cursor, quiz_version_name(module_id))
         
         conn.commit()
         return True
@@ -958,57 +1262,558 @@ def add_quiz_question(module_id, question, option_a, option_b, option_c, option_
     finally:
         conn.close()
 
-def save_quiz_result(user_id, module_id, score, total_questions):
-    """Save quiz result and award points/badges"""
+def find_similar_questions(question, option_a, option_b, option_c, option_d):
+    """Near-duplicates of a question already in the bank, most similar first"""
+    conn = get_db_connection()
+    
+    try:
+        return find_duplicates(conn.cursor(), question, (option_a, option_b, option_c, option_d))
+    except Exception as e:
+        print(f"Error checking for duplicate questions: {e}")
+        return []
+    finally:
+        conn.close()
+
+QUESTION_IMPORT_COLUMNS = ['question', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer']
+
+def import_quiz_questions(module_id, questions):
+    """Add a batch of questions in one transaction, skipping near-duplicates of the bank or of earlier rows.
+    
+    Returns (added, skipped) where skipped lists (row number, question, duplicate);
+    added is None if the import failed and nothing was written.
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        percentage = (score / total_questions) * 100
+        added, skipped = 0, []
+        now = datetime.now().isoformat()
+        
+        for i, q in enumerate(questions, 1):
+            options = (q['option_a'], q['option_b'], q['option_c'], q['option_d'])
+            duplicates = find_duplicates(cursor, q['question'], options, limit=1)
+            if duplicates:
+                skipped.append((i, q['question'], duplicates[0]))
+                continue
+            
+            cursor.execute("""
+                INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d, correct_answer, explanation,
+                                     difficulty, tag, created_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (module_id, q['question'], *options, q['correct_answer'], q.get('explanation') or '',
+                  q.get('difficulty') or None, q.get('tag') or None, now))
+            index_question(cursor, cursor.lastrowid, q['question'], options)
+            added += 1
         
-        cursor.execute("""
-            INSERT OR REPLACE INTO user_progress 
-            (user_id, module_id, quiz_score, quiz_attempts, started_date)
-            VALUES (?, ?, ?, 
-                    COALESCE((SELECT quiz_attempts FROM user_progress WHERE user_id = ? AND module_id = ?), 0) + 1,
-                    ?)
-        """, (user_id, module_id, percentage, user_id, module_id, datetime.now().isoformat()))
+        if added:
+            bump_version(cursor, quiz_version_name(module_id))
         
         conn.commit()
-        
-        # Award points based on performance
-        if percentage >= 90:
-            award_points(user_id, 100, f"Excellent Quiz Performance ({percentage:.1f}%)")
-            if percentage == 100:
-                award_badge(user_id, "Perfect Score")
-        elif percentage >= 80:
-            award_points(user_id, 75, f"Good Quiz Performance ({percentage:.1f}%)")
-        elif percentage >= 70:
-            award_points(user_id, 50, f"Passing Quiz Score ({percentage:.1f}%)")
-        
-        award_badge(user_id, "Quiz Taker")
-        
+        return added, skipped
     except Exception as e:
-        print(f"Error saving quiz result: {e}")
+        conn.rollback()
+        print(f"Error importing quiz questions: {e}")
+        return None, []
     finally:
         conn.close()
 
-# Data Visualization Functions
-def create_user_progress_chart(user_id):
-    """Create user progress visualization"""
+def get_duplicate_report(threshold=DUPLICATE_THRESHOLD):
+    """Near-duplicate question pairs across the bank with their text.
+    
+    The pairs are cached until a module's questions change; questions not yet
+    signed are indexed (and committed) on the way.
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute("""
-            SELECT m.title, COALESCE(p.quiz_score, 0) as score
-            FROM modules m
-            LEFT JOIN user_progress p ON m.id = p.module_id AND p.user_id = ?
-            WHERE m.active = 1
-            ORDER BY m.order_index
-        """, (user_id,))
+        pairs = duplicate_report.get(cursor, threshold)
+        conn.commit()
         
-        data = cursor.fetchall()
+        # Text only for the questions that appear in a pair
+        involved = sorted({question_id for _, first, second in pairs for question_id in (first, second)})
+        questions = {}
+        for start in range(0, len(involved), 500):
+            chunk = involved[start:start + 500]
+            cursor.execute(f"SELECT id, module_id, question FROM quizzes WHERE id IN ({','.join('?' * len(chunk))})",
+                           chunk)
+            questions.update((row[0], row[1:]) for row in cursor.fetchall())
+        
+        return [
+            {
+                'similarity': score,
+                'first_id': first,
+                'first_module': questions[first][0],
+                'first_question': questions[first][1],
+                'second_id': second,
+                'second_module': questions[second][0],
+                'second_question': questions[second][1],
+            }
+            for score, first, second in pairs
+        ]
+    except Exception as e:
+        print(f"Error building duplicate report: {e}")
+        return None
+    finally:
+        conn.close()
+
+def save_quiz_result(user_id, module_id, score, total_questions, percentage=None):
+    """Save quiz result and award points/badges.
+    
+    Inside a transaction errors propagate so the whole transaction rolls
+    back; a standalone call reports them and returns False.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        if percentage is None:
+            percentage = (score / total_questions) * 100
+        
+        # One row per (user, module): last score, best score and attempt count
+        cursor.execute("""
+            INSERT INTO user_progress 
+            (user_id, module_id, quiz_score, best_score, quiz_attempts, started_date)
+            VALUES (?, ?, ?, ?, 1, ?)
+            ON CONFLICT (user_id, module_id) DO UPDATE SET
+                quiz_score = excluded.quiz_score,
+                best_score = MAX(user_progress.best_score, excluded.best_score),
+                quiz_attempts = user_progress.quiz_attempts + 1
+        """, (user_id, module_id, percentage, percentage, datetime.now().isoformat()))
+        
+        conn.commit()
+        
+        # Award points based on performance
+        if percentage >= 90:
+            award_points(user_id, 100, f"Excellent Quiz Performance ({percentage:.1f}%)")
+            if percentage == 100:
+                award_badge(user_id, "Perfect Score")
+        elif percentage >= 80:
+            award_points(user_id, 75, f"Good Quiz Performance ({percentage:.1f}%)")
+        elif percentage >= 70:
+            award_points(user_id, 50, f"Passing Quiz Score ({percentage:.1f}%)")
+        
+        award_badge(user_id, "Quiz Taker")
+        return True
+    except Exception as e:
+        if get_pool().in_transaction():
+            raise
+        print(f"Error saving quiz result: {e}")
+        return False
+    finally:
+        conn.close()
+
+def start_quiz_attempt(user_id, bank, sample_size=None, stratify=None):
+    """Freeze an attempt's questions and open it; returns (attempt_id, snapshot).
+    
+    Asking for fewer questions than the bank has (or for balancing) draws a
+    seeded sample; the seed is stored so the draw can be reproduced.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        attempt_id = uuid.uuid4().hex
+        
+        if stratify or (sample_size and sample_size < len(bank)):
+            seed = new_seed()
+            snapshot = sample_snapshot(conn, bank, sample_size or len(bank), seed, stratify)
+        else:
+            seed, stratify = None, None
+            snapshot = snapshot_cache.get(conn, bank.module_id)
+        
+        cursor.execute("""
+            INSERT INTO quiz_attempts
+            (id, user_id, module_id, quiz_version, sample_seed, sample_size, sample_strata, status, started_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 'in_progress', ?)
+        """, (attempt_id, user_id, snapshot.module_id, snapshot.version,
+              seed, len(snapshot) if seed is not None else None, stratify, datetime.now().isoformat()))
+        
+        conn.commit()
+        return attempt_id, snapshot
+    except Exception as e:
+        print(f"Error starting quiz attempt: {e}")
+        return None, None
+    finally:
+        conn.close()
+
+def next_adaptive_question(cursor, test):
+    """Question of the test's current item, retiring items whose question no longer exists.
+    
+    None once the test has run out of items.
+    """
+    while test.current is not None:
+        questions = fetch_questions(cursor, [test.current_id()])
+        if questions:
+            return questions[0]
+        test.retire()
+    return None
+
+def get_adaptive_question(test):
+    """next_adaptive_question on its own connection; None if it could not be read"""
+    conn = get_db_connection()
+    
+    try:
+        return next_adaptive_question(conn.cursor(), test)
+    except Exception as e:
+        print(f"Error getting adaptive question: {e}")
+        return None
+    finally:
+        conn.close()
+
+def start_adaptive_attempt(user_id, bank):
+    """Open an adaptive attempt; returns (attempt_id, test, first question)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        test = AdaptiveTest(item_cache.get(conn, bank.module_id), bank.title)
+        question = next_adaptive_question(cursor, test)
+        if question is None:
+            return None, None, None
+        
+        attempt_id = uuid.uuid4().hex
+        
+        cursor.execute("""
+            INSERT INTO quiz_attempts (id, user_id, module_id, quiz_version, mode, status, started_date)
+            VALUES (?, ?, ?, ?, 'adaptive', 'in_progress', ?)
+        """, (attempt_id, user_id, bank.module_id, bank.version, datetime.now().isoformat()))
+        
+        conn.commit()
+        return attempt_id, test, question
+    except Exception as e:
+        print(f"Error starting adaptive attempt: {e}")
+        return None, None, None
+    finally:
+        conn.close()
+
+def assessment_from_row(row):
+    """Assessment dict from (id, module_id, title, questions, passing_score, time_limit)"""
+    return {
+        'id': row[0],
+        'module_id': row[1],
+        'title': row[2],
+        'questions': json.loads(row[3] or '[]'),
+        'passing_score': row[4],
+        'time_limit': row[5]
+    }
+
+def get_module_assessments(module_id):
+    """Active timed assessments of a module"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT id, title, questions, passing_score, time_limit
+            FROM assessments
+            WHERE module_id = ? AND active = 1
+            ORDER BY id
+        """, (module_id,))
+        
+        return [assessment_from_row((a[0], module_id, *a[1:])) for a in cursor.fetchall()]
+    except Exception as e:
+        print(f"Error getting assessments: {e}")
+        return []
+    finally:
+        conn.close()
+
+def create_assessment(module_id, title, question_count, time_limit, passing_score):
+    """Create a timed assessment over a fixed draw of the module's questions"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        bank = bank_cache.get(conn, module_id)
+        if not bank or not len(bank):
+            return False
+        
+        question_ids = sample_ids(bank, question_count, new_seed()) if question_count < len(bank) else list(bank.ids)
+        
+        cursor.execute("""
+            INSERT INTO assessments (module_id, title, questions, passing_score, time_limit, created_date)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (module_id, title, json.dumps(question_ids), passing_score, time_limit, datetime.now().isoformat()))
+        
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error creating assessment: {e}")
+        return False
+    finally:
+        conn.close()
+
+def deactivate_assessment(assessment_id):
+    """Hide an assessment from learners (results are kept)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("UPDATE assessments SET active = 0 WHERE id = ?", (assessment_id,))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error deactivating assessment: {e}")
+        return False
+    finally:
+        conn.close()
+
+# Time allowed after a deadline for the final submission to reach the server
+DEADLINE_GRACE_SECONDS = 30
+
+def timed_snapshot(cursor, assessment):
+    """Snapshot of an assessment's fixed questions"""
+    title = f"{module_title(cursor, assessment['module_id'])} – {assessment['title']}"
+    return QuizSnapshot(assessment['module_id'], quiz_version(cursor, assessment['module_id']),
+                        title, fetch_questions(cursor, assessment['questions']))
+
+def is_past_deadline(deadline):
+    """True once a stored deadline (ISO text or None) and its grace period have passed"""
+    return (deadline is not None and
+            datetime.now() > datetime.fromisoformat(deadline) + timedelta(seconds=DEADLINE_GRACE_SECONDS))
+
+def start_timed_attempt(user_id, assessment):
+    """Open a timed attempt; returns (attempt_id, snapshot, deadline).
+    
+    The deadline is stored with the attempt: completion checks it, and
+    resume_timed_attempt picks the attempt up again after a refresh.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        snapshot = timed_snapshot(cursor, assessment)
+        
+        attempt_id = uuid.uuid4().hex
+        started = datetime.now()
+        deadline = started + timedelta(minutes=assessment['time_limit'])
+        
+        cursor.execute("""
+            INSERT INTO quiz_attempts
+            (id, user_id, module_id, quiz_version, mode, assessment_id, deadline, status, started_date)
+            VALUES (?, ?, ?, ?, 'timed', ?, ?, 'in_progress', ?)
+        """, (attempt_id, user_id, snapshot.module_id, snapshot.version, assessment['id'],
+              deadline.isoformat(), started.isoformat()))
+        
+        conn.commit()
+        return attempt_id, snapshot, deadline
+    except Exception as e:
+        print(f"Error starting timed attempt: {e}")
+        return None, None, None
+    finally:
+        conn.close()
+
+def finalize_expired_attempts(user_id):
+    """Submit a learner's timed attempts that ran out of time; returns how many.
+    
+    Answers only reach the server when an attempt is submitted, so an
+    abandoned attempt is graded with every question unanswered.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cutoff = datetime.now() - timedelta(seconds=DEADLINE_GRACE_SECONDS)
+        cursor.execute("""
+            SELECT qa.id, a.id, a.module_id, a.title, a.questions, a.passing_score, a.time_limit
+            FROM quiz_attempts qa
+            JOIN assessments a ON a.id = qa.assessment_id
+            WHERE qa.user_id = ? AND qa.status = 'in_progress' AND qa.deadline < ?
+        """, (user_id, cutoff.isoformat()))
+        
+        expired = [(row[0], timed_snapshot(cursor, assessment_from_row(row[1:]))) for row in cursor.fetchall()]
+    except Exception as e:
+        print(f"Error finding expired attempts: {e}")
+        return 0
+    finally:
+        conn.close()
+    
+    return sum(complete_quiz_attempt(attempt_id, snapshot, {}) is not None for attempt_id, snapshot in expired)
+
+def resume_timed_attempt(user_id, module_id):
+    """(attempt_id, snapshot, deadline, passing_score) of a learner's running timed attempt on a module, or None.
+    
+    Attempts that already ran out of time are finalized first.
+    """
+    finalize_expired_attempts(user_id)
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT qa.id, qa.deadline, a.id, a.module_id, a.title, a.questions, a.passing_score, a.time_limit
+            FROM quiz_attempts qa
+            JOIN assessments a ON a.id = qa.assessment_id
+            WHERE qa.user_id = ? AND qa.module_id = ? AND qa.status = 'in_progress' AND qa.deadline IS NOT NULL
+            ORDER BY qa.started_date DESC
+            LIMIT 1
+        """, (user_id, module_id))
+        
+        row = cursor.fetchone()
+        if not row:
+            return None
+        
+        assessment = assessment_from_row(row[2:])
+        return row[0], timed_snapshot(cursor, assessment), datetime.fromisoformat(row[1]), assessment['passing_score']
+    except Exception as e:
+        print(f"Error resuming timed attempt: {e}")
+        return None
+    finally:
+        conn.close()
+
+def get_review_batch(user_id):
+    """Next due review cards as questions, most overdue first"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        return list(fetch_questions(cursor, due_cards(cursor, user_id)))
+    except Exception as e:
+        print(f"Error getting review cards: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_review_stats(user_id):
+    """(due now, total cards, next due time) of a learner's review queue"""
+    conn = get_db_connection()
+    
+    try:
+        return queue_stats(conn.cursor(), user_id)
+    except Exception as e:
+        print(f"Error getting review stats: {e}")
+        return 0, 0, None
+    finally:
+        conn.close()
+
+def rate_review(user_id, question_id, quality):
+    """Record a review rating and reschedule the card"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        review_card(cursor, user_id, question_id, quality)
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error saving review: {e}")
+        return False
+    finally:
+        conn.close()
+
+def search_content(text, kinds):
+    """Ranked full-text matches per source ({kind: (results, ranked)})"""
+    conn = get_db_connection()
+    
+    try:
+        return search(conn.cursor(), text, kinds)
+    except Exception as e:
+        print(f"Error searching: {e}")
+        return {}
+    finally:
+        conn.close()
+
+def get_item_analysis(module_id):
+    """Item statistics for a module, recomputed only after new attempts or questions"""
+    conn = get_db_connection()
+    
+    try:
+        return analysis_cache.get(conn, module_id)
+    except Exception as e:
+        print(f"Error running item analysis: {e}")
+        return None
+    finally:
+        conn.close()
+
+def complete_quiz_attempt(attempt_id, snapshot, answers, ability=None, percentage=None):
+    """Grade and record a quiz attempt exactly once.
+    
+    The attempt, its answers, progress, points and badges are written in a
+    single transaction. Completing an already completed attempt writes
+    nothing and returns the stored score. Adaptive attempts pass their
+    (ability, standard error) and the estimated percentage to record.
+    Answers submitted after a timed attempt's deadline (plus grace) don't
+    count; 'on_time' in the result says whether they did.
+    """
+    try:
+        with get_pool().transaction() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT deadline FROM quiz_attempts WHERE id = ?", (attempt_id,))
+            row = cursor.fetchone()
+            on_time = not (row and is_past_deadline(row[0]))
+            if not on_time:
+                answers = {}
+            
+            graded = snapshot.grade(answers)
+            correct_answers = sum(graded)
+            
+            theta, theta_se = ability or (None, None)
+            
+            cursor.execute("""
+                UPDATE quiz_attempts
+                SET status = 'completed', score = ?, total_questions = ?, ability = ?, ability_se = ?,
+                    completed_date = ?
+                WHERE id = ? AND status = 'in_progress'
+            """, (correct_answers, len(snapshot), theta, theta_se, datetime.now().isoformat(), attempt_id))
+            
+            if cursor.rowcount == 1:
+                cursor.executemany("""
+                    INSERT INTO quiz_attempt_answers (attempt_id, question_id, position, selected_answer, is_correct)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (attempt_id, question.id, i, answers.get(i), int(correct))
+                    for i, (question, correct) in enumerate(zip(snapshot.questions, graded))
+                ])
+                
+                cursor.execute("SELECT user_id, assessment_id, started_date FROM quiz_attempts WHERE id = ?",
+                               (attempt_id,))
+                user_id, assessment_id, started_date = cursor.fetchone()
+                bump_version(cursor, answers_version_name(snapshot.module_id))
+                
+                if assessment_id is not None:
+                    score = percentage if percentage is not None else correct_answers / len(snapshot) * 100
+                    cursor.execute("""
+                        INSERT INTO assessment_results
+                        (user_id, assessment_id, score, answers, started_date, completed_date, passed)
+                        SELECT ?, id, ?, ?, ?, ?, ? >= passing_score FROM assessments WHERE id = ?
+                    """, (user_id, score, json.dumps({str(i): a for i, a in answers.items()}),
+                          started_date, datetime.now().isoformat(), score, assessment_id))
+                save_quiz_result(user_id, snapshot.module_id, correct_answers, len(snapshot), percentage)
+                
+                # Missed questions go into the learner's review queue
+                record_answers(cursor, [
+                    (user_id, question.id, snapshot.module_id, correct)
+                    for question, correct in zip(snapshot.questions, graded)
+                ])
+            
+            cursor.execute("SELECT score, total_questions FROM quiz_attempts WHERE id = ?", (attempt_id,))
+            result = cursor.fetchone()
+        
+        if result:
+            return {'score': result[0], 'total_questions': result[1], 'on_time': on_time}
+    except Exception as e:
+        print(f"Error completing quiz attempt: {e}")
+    
+    return None
+
+# Data Visualization Functions
+def create_user_progress_chart(user_id):
+    """Create user progress visualization"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT m.title, COALESCE(p.best_score, 0) as score
+            FROM modules m
+            LEFT JOIN user_progress p ON m.id = p.module_id AND p.user_id = ?
+            WHERE m.active = 1
+            ORDER BY m.order_index
+        """, (user_id,))
+        
+        data = cursor.fetchall()
         
         if data:
             df = pd.DataFrame(data, columns=['Module', 'Score'])
@@ -1066,7 +1871,7 @@ def create_admin_analytics_charts():
         cursor.execute("""
             SELECT m.title, COUNT(p.user_id) as completions
             FROM modules m
-            LEFT JOIN user_progress p ON m.id = p.module_id AND p.quiz_score >= 70
+            LEFT JOIN user_progress p ON m.id = p.module_id AND p.best_score >= 70
             WHERE m.active = 1
             GROUP BY m.id, m.title
             ORDER BY completions DESC
@@ -1102,6 +1907,7 @@ def show_login_form():
         if submitted:
             if authenticate_user(username, password):
                 st.session_state.authenticated = True
+                finalize_expired_attempts(st.session_state.user_id)
                 st.success("Login successful!")
                 st.rerun()
             else:
@@ -1209,12 +2015,20 @@ def show_navigation():
             st.session_state.current_page = "quiz"
             st.rerun()
         
+        if st.button("🔁 Review Mistakes", use_container_width=True):
+            st.session_state.current_page = "review"
+            st.rerun()
+        
         if st.button("🎖️ Achievements", use_container_width=True):
             st.session_state.current_page = "achievements"
             st.rerun()
     
     st.divider()
     
+    if st.button("🔎 Search", use_container_width=True):
+        st.session_state.current_page = "search"
+        st.rerun()
+    
     if st.button("🤖 AI Assistant", use_container_width=True):
         st.session_state.current_page = "ai_assistant"
         st.rerun()
@@ -1285,6 +2099,7 @@ def show_user_dashboard():
     
     # Gamification metrics
     user_stats = get_user_stats(st.session_state.user_id)
+    modules = get_module_summaries(st.session_state.user_id)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -1305,7 +2120,7 @@ def show_user_dashboard():
     
     with col4:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric("📚 Modules", "5", "Available to learn")
+        st.metric("📚 Modules", len(modules), "Available to learn")
         st.markdown('</div>', unsafe_allow_html=True)
     
     st.markdown("---")
@@ -1319,8 +2134,6 @@ def show_user_dashboard():
     # Available Modules
     st.subheader("📚 Available Learning Modules")
     
-    modules = get_available_modules()
-    
     for module in modules:
         difficulty_color = {"Beginner": "🟢", "Intermediate": "🟡", "Advanced": "🔴"}
         color = difficulty_color.get(module['difficulty'], "📚")
@@ -1329,12 +2142,12 @@ def show_user_dashboard():
             st.write(f"**Category:** {module['category']}")
             st.write(f"**Description:** {module['description']}")
             
-            if module['youtube_url']:
+            if module['has_video']:
                 st.write("📹 **Video Available**")
             
-            # Show quiz count
-            quiz_count = len(get_quiz_questions(module['id']))
-            st.write(f"❓ **Quiz Questions:** {quiz_count}")
+            st.write(f"❓ **Quiz Questions:** {module['question_count']}")
+            if module['best_score'] is not None:
+                st.write(f"🎯 **Your Best Score:** {module['best_score']:.1f}%")
             
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -1359,7 +2172,7 @@ def show_module_content():
         st.error("No module selected")
         return
     
-    module = get_module_content(module_id)
+    module = get_module_page(module_id)
     if not module:
         st.error("Module not found")
         return
@@ -1389,24 +2202,60 @@ def show_module_content():
     if module['youtube_url']:
         st.subheader("📹 Module Video")
         if embed_youtube_video(module['youtube_url']):
-            # Award points for watching video
-            award_points(st.session_state.user_id, 10, f"Watched video: {module['title']}")
+            # Award points for watching video (once per module, not per rerun)
+            award_once(st.session_state.user_id, 'video_view', module_id, 10, f"Watched video: {module['title']}")
         else:
             st.error("Invalid YouTube URL")
     
-    # Module content
-    if module['content']:
+    # Module content: one pre-rendered section per rerun, picked from the table of contents
+    if module['toc']:
         st.subheader("📖 Module Content")
+        
+        toc = module['toc']
+        toc_key = f"toc_{module_id}"
+        if st.session_state.get(toc_key, 0) >= len(toc):
+            st.session_state[toc_key] = 0
+        
+        position = st.selectbox(
+            "Contents",
+            [entry.position for entry in toc],
+            format_func=lambda p: f"{'↳ ' if toc[p].level > 1 else ''}{toc[p].title}",
+            key=toc_key
+        )
+        section = toc[position]
+        
+        # Progress is only written the first time a section is opened
+        read = get_read_sections(st.session_state.user_id, module_id)
+        if section.anchor not in read and mark_section_read(st.session_state.user_id, module_id, section.anchor):
+            read.add(section.anchor)
+        
+        read_count = sum(entry.anchor in read for entry in toc)
+        st.progress(read_count / len(toc), text=f"Read {read_count} of {len(toc)} sections")
+        st.caption(f"Section {position + 1} of {len(toc)} · about {max(1, round(section.length / 1200))} min read")
+        
+        body = get_module_section(module_id, module['content_hash'], position)
         st.markdown('<div class="content-viewer">', unsafe_allow_html=True)
-        st.markdown(module['content'])
+        st.markdown(body or "")
         st.markdown('</div>', unsafe_allow_html=True)
         
+        def go_to_section(target):
+            st.session_state[toc_key] = target
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if position > 0:
+                st.button(f"← {toc[position - 1].title}", on_click=go_to_section, args=(position - 1,))
+        with col2:
+            if position < len(toc) - 1:
+                st.button(f"{toc[position + 1].title} →", on_click=go_to_section, args=(position + 1,))
+        
         # Award points for reading content
         if st.button("✅ Mark as Read (+20 points)", use_container_width=True):
-            award_points(st.session_state.user_id, 20, f"Completed reading: {module['title']}")
-            award_badge(st.session_state.user_id, "Content Reader")
-            st.success("Great! You've earned 20 points for reading this module!")
-            st.rerun()
+            if award_once(st.session_state.user_id, 'module_read', module_id, 20,
+                          f"Completed reading: {module['title']}", badge="Content Reader"):
+                st.success("Great! You've earned 20 points for reading this module!")
+            else:
+                st.info("You've already earned points for reading this module.")
     else:
         st.warning("No content available for this module yet.")
 
@@ -1417,18 +2266,39 @@ def show_quiz():
         st.error("No module selected")
         return
     
-    # Get module info
-    module = get_module_content(module_id)
-    if not module:
-        st.error("Module not found")
+    # A running attempt keeps the snapshot it started with; no DB reads while navigating
+    snapshot = st.session_state.quiz_snapshot
+    adaptive = st.session_state.quiz_adaptive
+    running = adaptive if adaptive is not None else snapshot
+    if st.session_state.quiz_started and (running is None or running.module_id != module_id):
+        st.session_state.quiz_started = False
+        st.session_state.quiz_attempt_id = None
+    
+    # A timed attempt outlives the session: pick it up (with its deadline) after a refresh
+    if not st.session_state.quiz_started:
+        running = resume_timed_attempt(st.session_state.user_id, module_id)
+        if running:
+            attempt_id, snapshot, deadline, passing_score = running
+            begin_quiz(attempt_id, snapshot, deadline=deadline, passing_score=passing_score)
+            st.rerun()
+    
+    if st.session_state.quiz_started and adaptive is not None:
+        show_adaptive_quiz(adaptive)
         return
     
-    st.markdown(f'<div class="main-header"><h1>🏆 Quiz: {module["title"]}</h1></div>', unsafe_allow_html=True)
+    if st.session_state.quiz_started:
+        title, bank_size = snapshot.title, len(snapshot)
+    else:
+        # Only question ids are loaded until the quiz starts
+        bank = get_question_bank(module_id)
+        if not bank:
+            st.error("Module not found")
+            return
+        title, bank_size = bank.title, len(bank)
     
-    # Get quiz questions
-    questions = get_quiz_questions(module_id)
+    st.markdown(f'<div class="main-header"><h1>🏆 Quiz: {title}</h1></div>', unsafe_allow_html=True)
     
-    if not questions:
+    if not bank_size:
         st.warning("No quiz questions available for this module yet.")
         if st.button("← Back to Module"):
             st.session_state.current_page = "module_content"
@@ -1440,9 +2310,26 @@ def show_quiz():
         # Quiz start screen
         st.subheader(f"📋 Quiz Information")
         
+        adaptive_mode = False
+        if bank_size >= MIN_BANK_SIZE:
+            adaptive_mode = st.radio("Quiz mode", ["Standard", "Adaptive"], horizontal=True,
+                                     help="Adaptive quizzes pick each question for your level "
+                                          "and end as soon as your result is clear") == "Adaptive"
+        
+        # Large banks are sampled: a fixed-size draw per attempt, optionally balanced
+        question_count, stratify = bank_size, None
+        if bank_size > QUIZ_SAMPLE_SIZE and not adaptive_mode:
+            col1, col2 = st.columns(2)
+            with col1:
+                question_count = st.number_input("Questions in this attempt", min_value=1,
+                                                 max_value=bank_size, value=QUIZ_SAMPLE_SIZE)
+            with col2:
+                stratify = st.selectbox("Balance questions by", [None, *STRATA],
+                                        format_func=lambda x: x.title() if x else "No balancing")
+        
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Questions", len(questions))
+            st.metric("Questions", "Adaptive" if adaptive_mode else question_count)
         with col2:
             st.metric("Points per Question", "10")
         with col3:
@@ -1456,16 +2343,54 @@ def show_quiz():
         st.write("- Earn bonus points for high scores!")
         
         if st.button("🚀 Start Quiz", use_container_width=True):
-            st.session_state.quiz_started = True
-            st.session_state.current_question = 0
-            st.session_state.quiz_answers = {}
-            st.session_state.quiz_score = 0
-            st.rerun()
+            if adaptive_mode:
+                attempt_id, adaptive, question = start_adaptive_attempt(st.session_state.user_id, bank)
+                snapshot = None
+            else:
+                attempt_id, snapshot = start_quiz_attempt(st.session_state.user_id, bank, question_count, stratify)
+                adaptive, question = None, None
+            
+            if attempt_id:
+                begin_quiz(attempt_id, snapshot, adaptive, question)
+                st.rerun()
+            else:
+                st.error("Could not start the quiz. Please try again.")
+        
+        assessments = get_module_assessments(module_id)
+        if assessments:
+            st.markdown("---")
+            st.subheader("⏱️ Timed Assessments")
+            
+            for assessment in assessments:
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    st.write(f"**{assessment['title']}** — {len(assessment['questions'])} questions, "
+                             f"{assessment['time_limit']} minutes, pass at {assessment['passing_score']}%")
+                with col2:
+                    if st.button("Start", key=f"assessment_{assessment['id']}"):
+                        attempt_id, snapshot, deadline = start_timed_attempt(st.session_state.user_id, assessment)
+                        
+                        if attempt_id:
+                            begin_quiz(attempt_id, snapshot, deadline=deadline,
+                                       passing_score=assessment['passing_score'])
+                            st.rerun()
+                        else:
+                            st.error("Could not start the assessment. Please try again.")
     
     else:
         # Quiz questions
+        questions = snapshot.questions
         total_questions = len(questions)
         current_q = st.session_state.current_question
+        deadline = st.session_state.quiz_deadline
+        
+        # Past the deadline: submit the answers given so far
+        if current_q < total_questions and deadline is not None and datetime.now() >= deadline:
+            st.session_state.quiz_timed_out = True
+            if not submit_quiz(snapshot):
+                st.error("Time's up, but your quiz could not be saved. Please refresh to try again.")
+                return
+            current_q = st.session_state.current_question
         
         if current_q < total_questions:
             question = questions[current_q]
@@ -1473,13 +2398,16 @@ def show_quiz():
             st.subheader(f"Question {current_q + 1} of {total_questions}")
             st.progress((current_q + 1) / total_questions)
             
-            st.markdown(f'<div class="quiz-question"><h4>{question["question"]}</h4></div>', unsafe_allow_html=True)
+            if deadline is not None:
+                show_countdown(deadline)
+            
+            st.markdown(f'<div class="quiz-question"><h4>{question.text}</h4></div>', unsafe_allow_html=True)
             
             # Answer options
             selected_answer = st.radio(
                 "Choose your answer:",
-                options=list(question['options'].keys()),
-                format_func=lambda x: f"{x}. {question['options'][x]}",
+                options=OPTION_LETTERS,
+                format_func=lambda x: f"{x}. {question.option(x)}",
                 key=f"q_{current_q}"
             )
             
@@ -1493,22 +2421,20 @@ def show_quiz():
             
             with col2:
                 if st.button("Next →" if current_q < total_questions - 1 else "Submit Quiz"):
+                    # Answers clicked in after the deadline don't count; the rerun auto-submits
+                    if deadline is not None and datetime.now() >= deadline:
+                        st.rerun()
+                    
                     # Save answer
                     st.session_state.quiz_answers[current_q] = selected_answer
                     
                     if current_q < total_questions - 1:
                         st.session_state.current_question += 1
                         st.rerun()
-                    else:
-                        # Calculate score and finish quiz
-                        correct_answers = 0
-                        for i, question in enumerate(questions):
-                            if st.session_state.quiz_answers.get(i) == question['correct_answer']:
-                                correct_answers += 1
-                        
-                        st.session_state.quiz_score = correct_answers
-                        st.session_state.current_question = total_questions
+                    elif submit_quiz(snapshot):
                         st.rerun()
+                    else:
+                        st.error("Could not save your quiz. Please try submitting again.")
         
         else:
             # Quiz results
@@ -1517,20 +2443,21 @@ def show_quiz():
             
             st.subheader("🎉 Quiz Completed!")
             
+            if st.session_state.get('quiz_timed_out'):
+                st.warning("⏰ Time ran out, so your quiz was submitted automatically. "
+                           "Unanswered questions count as incorrect.")
+            
             col1, col2, col3 = st.columns(3)
             with col1:
                 st.metric("Score", f"{correct_answers}/{total_questions}")
             with col2:
                 st.metric("Percentage", f"{percentage:.1f}%")
             with col3:
-                if percentage >= 70:
+                if percentage >= st.session_state.quiz_passing_score:
                     st.success("PASSED! 🎉")
                 else:
                     st.error("Try Again")
             
-            # Save results and award points
-            save_quiz_result(st.session_state.user_id, module_id, correct_answers, total_questions)
-            
             # Points calculation
             base_points = correct_answers * 10
             bonus_points = 0
@@ -1547,21 +2474,15 @@ def show_quiz():
             # Review answers
             st.subheader("📋 Answer Review")
             
-            for i, question in enumerate(questions):
-                user_answer = st.session_state.quiz_answers.get(i, 'Not answered')
-                correct = user_answer == question['correct_answer']
-                
-                with st.expander(f"Question {i+1} - {'✅ Correct' if correct else '❌ Incorrect'}"):
-                    st.write(f"**Question:** {question['question']}")
-                    st.write(f"**Your Answer:** {user_answer}. {question['options'].get(user_answer, 'Not selected')}")
-                    st.write(f"**Correct Answer:** {question['correct_answer']}. {question['options'][question['correct_answer']]}")
-                    if question['explanation']:
-                        st.write(f"**Explanation:** {question['explanation']}")
+            show_answer_review(snapshot, st.session_state.quiz_answers)
             
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("🔄 Retake Quiz"):
                     st.session_state.quiz_started = False
+                    st.session_state.quiz_attempt_id = None
+                    st.session_state.quiz_snapshot = None
+                    st.session_state.quiz_deadline = None
                     st.session_state.current_question = 0
                     st.session_state.quiz_answers = {}
                     st.session_state.quiz_score = 0
@@ -1570,9 +2491,290 @@ def show_quiz():
             with col2:
                 if st.button("← Back to Module"):
                     st.session_state.quiz_started = False
+                    st.session_state.quiz_attempt_id = None
+                    st.session_state.quiz_snapshot = None
+                    st.session_state.quiz_deadline = None
                     st.session_state.current_page = "module_content"
                     st.rerun()
 
+def begin_quiz(attempt_id, snapshot=None, adaptive=None, question=None, deadline=None, passing_score=70):
+    """Put a freshly opened attempt into session state"""
+    st.session_state.quiz_attempt_id = attempt_id
+    st.session_state.quiz_snapshot = snapshot
+    st.session_state.quiz_adaptive = adaptive
+    st.session_state.quiz_adaptive_questions = [question] if question else []
+    st.session_state.quiz_adaptive_result = None
+    st.session_state.quiz_deadline = deadline
+    st.session_state.quiz_passing_score = passing_score
+    st.session_state.quiz_timed_out = False
+    st.session_state.quiz_started = True
+    st.session_state.current_question = 0
+    st.session_state.quiz_answers = {}
+    st.session_state.quiz_score = 0
+
+def submit_quiz(snapshot):
+    """Grade and record the running attempt once; reruns of the results screen don't write"""
+    result = complete_quiz_attempt(
+        st.session_state.quiz_attempt_id,
+        snapshot,
+        st.session_state.quiz_answers
+    )
+    
+    if result:
+        st.session_state.quiz_score = result['score']
+        st.session_state.current_question = len(snapshot)
+        if not result['on_time']:
+            st.session_state.quiz_answers = {}
+            st.session_state.quiz_timed_out = True
+        return True
+    return False
+
+@st.fragment(run_every=1)
+def show_countdown(deadline):
+    """Time left on a timed attempt; only this fragment reruns each second, without DB reads"""
+    remaining = int((deadline - datetime.now()).total_seconds())
+    
+    if remaining <= 0:
+        # A full rerun lets show_quiz submit the attempt
+        st.rerun(scope="app")
+    
+    minutes, seconds = divmod(remaining, 60)
+    st.metric("⏱️ Time Left", f"{minutes:02d}:{seconds:02d}")
+    if remaining <= 60:
+        st.warning("Less than a minute left!")
+
+def show_answer_review(snapshot, answers):
+    """Expandable per-question review of a graded attempt"""
+    graded = snapshot.grade(answers)
+    
+    for i, (question, correct) in enumerate(zip(snapshot.questions, graded)):
+        user_answer = answers.get(i, 'Not answered')
+        
+        with st.expander(f"Question {i+1} - {'✅ Correct' if correct else '❌ Incorrect'}"):
+            st.write(f"**Question:** {question.text}")
+            st.write(f"**Your Answer:** {user_answer}. {question.option(user_answer) or 'Not selected'}")
+            st.write(f"**Correct Answer:** {question.correct_answer}. {question.option(question.correct_answer)}")
+            if question.explanation:
+                st.write(f"**Explanation:** {question.explanation}")
+
+def show_adaptive_quiz(test):
+    """Adaptive quiz: each question is chosen for the learner's current ability estimate"""
+    st.markdown(f'<div class="main-header"><h1>🏆 Adaptive Quiz: {test.title}</h1></div>', unsafe_allow_html=True)
+    
+    questions = st.session_state.quiz_adaptive_questions
+    answers = st.session_state.quiz_answers
+    
+    # One primary-key read per question; grading stays in memory
+    if test.current is not None and len(questions) == len(test.positions):
+        question = get_adaptive_question(test)
+        if question is not None:
+            questions.append(question)
+        elif test.current is not None:
+            st.error("Could not load the next question. Please refresh to try again.")
+            return
+    
+    if test.current is not None:
+        asked = len(test.positions)
+        question = questions[-1]
+        
+        st.subheader(f"Question {asked + 1}")
+        st.progress((asked + 1) / test.max_items)
+        st.caption(f"The quiz ends as soon as your result is clear (at most {test.max_items} questions)")
+        
+        st.markdown(f'<div class="quiz-question"><h4>{question.text}</h4></div>', unsafe_allow_html=True)
+        
+        selected_answer = st.radio(
+            "Choose your answer:",
+            options=OPTION_LETTERS,
+            format_func=lambda x: f"{x}. {question.option(x)}",
+            key=f"aq_{asked}"
+        )
+        
+        if st.button("Submit Answer →"):
+            answers[asked] = selected_answer
+            test.record(selected_answer == question.correct_answer)
+            st.rerun()
+        return
+    
+    # Record the attempt once; complete_quiz_attempt is a no-op if it already was
+    result = st.session_state.quiz_adaptive_result
+    if result is None:
+        snapshot = QuizSnapshot(test.module_id, test.index.version[0], test.title, tuple(questions))
+        result = complete_quiz_attempt(
+            st.session_state.quiz_attempt_id,
+            snapshot,
+            answers,
+            ability=(test.theta, test.se),
+            percentage=test.expected_score()
+        )
+        if not result:
+            st.error("Could not save your quiz. Please refresh to try again.")
+            return
+        st.session_state.quiz_adaptive_result = result
+    
+    st.subheader("🎉 Quiz Completed!")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Questions Asked", len(questions))
+    with col2:
+        st.metric("Estimated Score", f"{test.expected_score():.1f}%")
+    with col3:
+        if test.passed():
+            st.success("PASSED! 🎉")
+        else:
+            st.error("Try Again")
+    
+    st.write(f"You answered {result['score']} of {result['total_questions']} questions correctly. "
+             f"Your estimated score is what you'd be expected to get on the module's whole question bank.")
+    
+    st.subheader("📋 Answer Review")
+    show_answer_review(QuizSnapshot(test.module_id, test.index.version[0], test.title, tuple(questions)), answers)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔄 Retake Quiz"):
+            st.session_state.quiz_started = False
+            st.session_state.quiz_attempt_id = None
+            st.session_state.quiz_adaptive = None
+            st.session_state.quiz_answers = {}
+            st.rerun()
+    
+    with col2:
+        if st.button("← Back to Module"):
+            st.session_state.quiz_started = False
+            st.session_state.quiz_attempt_id = None
+            st.session_state.quiz_adaptive = None
+            st.session_state.current_page = "module_content"
+            st.rerun()
+
+def show_review():
+    """Spaced-repetition review of questions the learner got wrong"""
+    st.markdown('<div class="main-header"><h1>🔁 Review Mistakes</h1></div>', unsafe_allow_html=True)
+    
+    user_id = st.session_state.user_id
+    
+    # One batch of due cards is loaded at a time and worked through in session state
+    if not st.session_state.get('review_cards'):
+        st.session_state.review_cards = get_review_batch(user_id)
+        st.session_state.review_answer = None
+    
+    cards = st.session_state.review_cards
+    due, total, next_due = get_review_stats(user_id)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Due Now", due)
+    with col2:
+        st.metric("Cards in Queue", total)
+    
+    if not cards:
+        if total:
+            st.success(f"🎉 All caught up! Next review due {next_due[:16].replace('T', ' ')}.")
+        else:
+            st.info("No cards yet. Questions you miss in quizzes will show up here for review.")
+        return
+    
+    question = cards[0]
+    answer = st.session_state.review_answer
+    
+    st.markdown(f'<div class="quiz-question"><h4>{question.text}</h4></div>', unsafe_allow_html=True)
+    
+    if answer is None:
+        selected_answer = st.radio(
+            "Choose your answer:",
+            options=OPTION_LETTERS,
+            format_func=lambda x: f"{x}. {question.option(x)}",
+            key=f"review_{question.id}"
+        )
+        
+        if st.button("Check Answer"):
+            st.session_state.review_answer = selected_answer
+            st.rerun()
+        return
+    
+    def rate(quality):
+        if rate_review(user_id, question.id, quality):
+            cards.pop(0)
+            st.session_state.review_answer = None
+            st.rerun()
+        else:
+            st.error("Could not save your review. Please try again.")
+    
+    if answer == question.correct_answer:
+        st.success(f"✅ Correct! {question.correct_answer}. {question.option(question.correct_answer)}")
+        if question.explanation:
+            st.write(f"**Explanation:** {question.explanation}")
+        
+        st.write("How easy was it to recall?")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("😓 Hard", use_container_width=True):
+                rate(HARD)
+        with col2:
+            if st.button("🙂 Good", use_container_width=True):
+                rate(GOOD)
+        with col3:
+            if st.button("😎 Easy", use_container_width=True):
+                rate(EASY)
+    else:
+        st.error(f"❌ The answer is {question.correct_answer}. {question.option(question.correct_answer)}")
+        if question.explanation:
+            st.write(f"**Explanation:** {question.explanation}")
+        
+        if st.button("Next →"):
+            rate(AGAIN)
+
+def open_module(module_id):
+    st.session_state.current_module = module_id
+    st.session_state.current_page = "module_content"
+
+def show_search():
+    """Full-text search; learners search modules, admins also questions and research notes"""
+    st.markdown('<div class="main-header"><h1>🔎 Search</h1></div>', unsafe_allow_html=True)
+    
+    is_admin = st.session_state.user_role == 'admin'
+    kinds = tuple(SEARCH_SOURCES) if is_admin else ('modules',)
+    
+    text = st.text_input("Search", key="search_text",
+                         placeholder="e.g. carpet area, RERA registration, stamp duty",
+                         label_visibility="collapsed")
+    if not text.strip():
+        st.info("Search " + ("modules, quiz questions and research notes." if is_admin else "module titles, descriptions and content."))
+        return
+    
+    results = search_content(text, kinds)
+    if not any(found for found, _ in results.values()):
+        st.warning("No matches. Try fewer or different words.")
+        return
+    
+    titles = {module['id']: module['title'] for module in get_available_modules()}
+    headings = {'modules': "📚 Modules", 'quizzes': "❓ Quiz Questions", 'research': "🔍 Research Notes"}
+    
+    for kind in kinds:
+        found, ranked = results.get(kind, ([], True))
+        if not found:
+            continue
+        
+        st.subheader(headings[kind])
+        if not ranked:
+            st.caption("Too many matches to rank, showing the newest. Add more words to narrow the search.")
+        
+        for result in found:
+            with st.container(border=True):
+                if kind == 'modules':
+                    col1, col2 = st.columns([5, 1])
+                    with col1:
+                        st.markdown(f"**{result.title}**")
+                    with col2:
+                        st.button("Open", key=f"search_open_{result.id}", on_click=open_module, args=(result.id,))
+                elif kind == 'quizzes':
+                    st.markdown(f"**{result.title}**")
+                    st.caption(f"Question #{result.id} · {titles.get(result.module_id, f'Module {result.module_id}')}")
+                else:
+                    st.markdown(f"**{result.title}**")
+                st.markdown(result.snippet)
+
 def show_achievements():
     """Show user achievements and gamification elements"""
     st.markdown('<div class="main-header"><h1>🎖️ Your Achievements</h1></div>', unsafe_allow_html=True)
@@ -1625,6 +2827,23 @@ def show_achievements():
                 """, unsafe_allow_html=True)
     else:
         st.info("No badges earned yet. Complete modules and quizzes to earn badges!")
+    
+    st.markdown("---")
+    
+    # Leaderboard
+    st.subheader("🏆 Leaderboard")
+    
+    rank, ranked_users = get_user_rank(st.session_state.user_id)
+    if rank:
+        st.write(f"**Your Rank:** #{rank} of {ranked_users}")
+    
+    leaders = get_leaderboard(10)
+    if leaders:
+        df_leaders = pd.DataFrame(leaders, columns=['rank', 'username', 'points'])
+        df_leaders.columns = ['Rank', 'Learner', 'Points']
+        st.dataframe(df_leaders, hide_index=True, use_container_width=True)
+    else:
+        st.info("No learners on the leaderboard yet.")
 
 def show_admin_dashboard():
     st.markdown('<div class="main-header"><h1>Admin Dashboard</h1></div>', unsafe_allow_html=True)
@@ -1643,8 +2862,9 @@ def show_admin_dashboard():
         cursor.execute("SELECT COUNT(*) FROM quizzes")
         quiz_count = cursor.fetchone()[0]
         
-        cursor.execute("SELECT SUM(points) FROM users WHERE role != 'admin'")
-        total_points = cursor.fetchone()[0] or 0
+        # Maintained incrementally by the leaderboard instead of a SUM over all users
+        leaderboard.refresh(conn)
+        total_points = leaderboard.total_points()
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -1700,55 +2920,14 @@ def show_content_management():
     with tab1:
         st.subheader("Edit Existing Modules")
         
+        # Pick from the cached title index; only the selected module's content is fetched
         modules = get_available_modules()
+        difficulty_color = {"Beginner": "🟢", "Intermediate": "🟡", "Advanced": "🔴"}
+        module = st.selectbox("Select Module to Edit", modules,
+                              format_func=lambda m: f"{difficulty_color.get(m['difficulty'], '📚')} {m['title']} ({m['difficulty']})")
         
-        for module in modules:
-            difficulty_color = {"Beginner": "🟢", "Intermediate": "🟡", "Advanced": "🔴"}
-            color = difficulty_color.get(module['difficulty'], "📚")
-            
-            with st.expander(f"{color} {module['title']} ({module['difficulty']})"):
-                # Get full module data
-                full_module = get_module_content(module['id'])
-                
-                if full_module:
-                    with st.form(f"edit_module_{module['id']}"):
-                        title = st.text_input("Title", value=full_module['title'])
-                        description = st.text_area("Description", value=full_module['description'], height=100)
-                        
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            difficulty = st.selectbox("Difficulty", ["Beginner", "Intermediate", "Advanced"], 
-                                                    index=["Beginner", "Intermediate", "Advanced"].index(full_module['difficulty']))
-                        with col2:
-                            category = st.selectbox("Category", [
-                                "Fundamentals", "Legal Framework", "Property Measurements",
-                                "Valuation & Finance", "Technical & Construction", "Transactions & Documentation",
-                                "Property Management", "Brokerage & Agency", "Digital Tools", "Case Studies", "Sustainability"
-                            ])
-                        
-                        youtube_url = st.text_input("YouTube URL", value=full_module['youtube_url'] or "", 
-                                                  help="Enter YouTube video URL for this module")
-                        
-                        content = st.text_area("Module Content (Markdown)", value=full_module['content'] or "", 
-                                             height=300, help="Use Markdown formatting for better presentation")
-                        
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            if st.form_submit_button("💾 Update Module"):
-                                if update_module_content(module['id'], title, description, content, youtube_url):
-                                    st.success("Module updated successfully!")
-                                    st.rerun()
-                                else:
-                                    st.error("Failed to update module")
-                        
-                        with col2:
-                            if st.form_submit_button("🗑️ Delete Module"):
-                                if delete_module(module['id']):
-                                    st.success("Module deleted!")
-                                    st.rerun()
-                                else:
-                                    st.error("Failed to delete module")
+        if module:
+            show_module_editor(module['id'])
     
     with tab2:
         st.subheader("Add New Module")
@@ -1761,11 +2940,7 @@ def show_content_management():
             with col1:
                 difficulty = st.selectbox("Difficulty Level", ["Beginner", "Intermediate", "Advanced"])
             with col2:
-                category = st.selectbox("Category", [
-                    "Fundamentals", "Legal Framework", "Property Measurements",
-                    "Valuation & Finance", "Technical & Construction", "Transactions & Documentation",
-                    "Property Management", "Brokerage & Agency", "Digital Tools", "Case Studies", "Sustainability"
-                ])
+                category = st.selectbox("Category", MODULE_CATEGORIES)
             
             youtube_url = st.text_input("YouTube URL", help="Enter YouTube video URL for this module")
             content = st.text_area("Module Content (Markdown)", height=300, 
@@ -1822,98 +2997,187 @@ def show_content_management():
                                     st.success("Content updated with AI improvements!")
                                     st.rerun()
 
+MODULE_CATEGORIES = [
+    "Fundamentals", "Legal Framework", "Property Measurements",
+    "Valuation & Finance", "Technical & Construction", "Transactions & Documentation",
+    "Property Management", "Brokerage & Agency", "Digital Tools", "Case Studies", "Sustainability"
+]
+
+def show_module_editor(module_id):
+    """Edit form for one module.
+    
+    The module is read once into a working copy in session state; edits stay
+    there (Keep Draft) until they are saved or discarded.
+    """
+    drafts = st.session_state.setdefault('module_drafts', {})
+    if module_id not in drafts:
+        module = get_module_content(module_id)
+        if not module:
+            st.error("Module not found")
+            return
+        drafts[module_id] = module
+    
+    draft = drafts[module_id]
+    difficulties = ["Beginner", "Intermediate", "Advanced"]
+    
+    with st.form(f"edit_module_{module_id}"):
+        title = st.text_input("Title", value=draft['title'])
+        description = st.text_area("Description", value=draft['description'], height=100)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            difficulty = st.selectbox("Difficulty", difficulties,
+                                      index=difficulties.index(draft['difficulty']) if draft['difficulty'] in difficulties else 0)
+        with col2:
+            category = st.selectbox("Category", MODULE_CATEGORIES,
+                                    index=MODULE_CATEGORIES.index(draft['category']) if draft['category'] in MODULE_CATEGORIES else 0)
+        
+        youtube_url = st.text_input("YouTube URL", value=draft['youtube_url'] or "", 
+                                  help="Enter YouTube video URL for this module")
+        
+        content = st.text_area("Module Content (Markdown)", value=draft['content'] or "", 
+                             height=300, help="Use Markdown formatting for better presentation")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            save = st.form_submit_button("💾 Update Module")
+        with col2:
+            keep = st.form_submit_button("📝 Keep Draft")
+        with col3:
+            discard = st.form_submit_button("↩️ Discard Changes")
+        with col4:
+            delete = st.form_submit_button("🗑️ Delete Module")
+    
+    if save or keep:
+        draft.update(title=title, description=description, difficulty=difficulty, category=category,
+                     youtube_url=youtube_url, content=content)
+    
+    if save:
+        if update_module_content(module_id, title, description, content, youtube_url, difficulty, category):
+            drafts.pop(module_id, None)
+            st.success("Module updated successfully!")
+            st.rerun()
+        else:
+            st.error("Failed to update module")
+    elif keep:
+        st.info("Draft kept. It won't be saved until you click Update Module.")
+    elif discard:
+        drafts.pop(module_id, None)
+        st.rerun()
+    elif delete:
+        if delete_module(module_id):
+            drafts.pop(module_id, None)
+            st.success("Module deleted!")
+            st.rerun()
+        else:
+            st.error("Failed to delete module")
+
 def show_user_management():
     st.markdown('<div class="main-header"><h1>User Management</h1></div>', unsafe_allow_html=True)
     
     tab1, tab2 = st.tabs(["👥 Manage Users", "➕ Add New User"])
     
     with tab1:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            search = st.text_input("Search", placeholder="Username or email starts with...").strip()
+        with col2:
+            role = st.selectbox("Role", [None, "student", "professional", "admin"],
+                                format_func=lambda x: x.title() if x else "All roles")
+        with col3:
+            active = st.selectbox("Status", [None, True, False],
+                                  format_func=lambda x: "All" if x is None else ("Active" if x else "Inactive"))
         
-        try:
-            cursor.execute("""
-                SELECT id, username, email, role, created_date, last_login, active, points, badges
-                FROM users
-                ORDER BY created_date DESC
-            """)
-            
-            users = cursor.fetchall()
-            
-            # User statistics
-            col1, col2, col3 = st.columns(3)
-            
-            total_users = len(users)
-            active_users = len([u for u in users if u[6] == 1])
-            admin_users = len([u for u in users if u[3] == 'admin'])
-            
-            with col1:
-                st.metric("Total Users", total_users)
-            with col2:
-                st.metric("Active Users", active_users)
-            with col3:
-                st.metric("Admin Users", admin_users)
-            
-            st.markdown("---")
-            
-            st.subheader(f"All Users ({total_users})")
+        # Keys of the pages visited so far; changing a filter starts again from the first page
+        filters = (search, role, active)
+        if st.session_state.get('user_filters') != filters:
+            st.session_state.user_filters = filters
+            st.session_state.user_page_keys = [None]
+        page_keys = st.session_state.user_page_keys
+        
+        totals = get_user_totals(*filters)
+        users, next_key = get_users_page(*filters, after=page_keys[-1])
+        
+        # User statistics
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total Users", totals['total'])
+        with col2:
+            st.metric("Active Users", totals['active'])
+        with col3:
+            st.metric("Admin Users", totals['admins'])
+        
+        st.markdown("---")
+        
+        pages = max(1, -(-totals['matching'] // USERS_PAGE_SIZE))
+        st.subheader(f"Users ({totals['matching']}) - Page {len(page_keys)} of {pages}")
+        
+        if not users:
+            st.info("No users match these filters")
+        
+        # Widgets are only built for the users on this page
+        for user in users:
+            role_emoji = {"admin": "👑", "student": "📚", "professional": "💼"}
+            emoji = role_emoji.get(user['role'], "👤")
+            status = "🟢 Active" if user['active'] else "🔴 Inactive"
             
-            for user in users:
-                role_emoji = {"admin": "👑", "student": "📚", "professional": "💼"}
-                emoji = role_emoji.get(user[3], "👤")
-                status = "🟢 Active" if user[6] else "🔴 Inactive"
+            with st.expander(f"{emoji} {user['username']} ({user['role']}) - {status} - 🏆 {user['points']} points"):
+                col1, col2 = st.columns(2)
                 
-                badges = json.loads(user[8]) if user[8] else []
+                with col1:
+                    st.write(f"**Email:** {user['email']}")
+                    st.write(f"**Role:** {user['role'].title()}")
+                    st.write(f"**Joined:** {user['created_date']}")
+                    st.write(f"**Points:** {user['points']}")
                 
-                with st.expander(f"{emoji} {user[1]} ({user[3]}) - {status} - 🏆 {user[7] or 0} points"):
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.write(f"**Email:** {user[2]}")
-                        st.write(f"**Role:** {user[3].title()}")
-                        st.write(f"**Joined:** {user[4]}")
-                        st.write(f"**Points:** {user[7] or 0}")
-                    
-                    with col2:
-                        st.write(f"**Last Login:** {user[5] or 'Never'}")
-                        st.write(f"**Status:** {'Active' if user[6] else 'Inactive'}")
-                        st.write(f"**Badges:** {len(badges)}")
-                        
-                        if badges:
-                            for badge in badges[:3]:  # Show first 3 badges
-                                st.markdown(f'<span class="badge">🏅 {badge}</span>', unsafe_allow_html=True)
-                    
-                    # Admin actions
-                    col1, col2, col3 = st.columns(3)
+                with col2:
+                    st.write(f"**Last Login:** {user['last_login'] or 'Never'}")
+                    st.write(f"**Status:** {'Active' if user['active'] else 'Inactive'}")
+                    st.write(f"**Badges:** {user['badge_count']}")
                     
-                    with col1:
-                        if user[3] != 'admin':  # Don't allow deactivating admin users
-                            if st.button(f"{'Deactivate' if user[6] else 'Activate'}", key=f"toggle_{user[0]}"):
-                                cursor.execute("UPDATE users SET active = ? WHERE id = ?", (0 if user[6] else 1, user[0]))
-                                conn.commit()
-                                st.success(f"User {'deactivated' if user[6] else 'activated'} successfully!")
+                    for badge in user['badges']:  # Show first 3 badges
+                        st.markdown(f'<span class="badge">🏅 {badge}</span>', unsafe_allow_html=True)
+                
+                # Admin actions
+                col1, col2, col3 = st.columns(3)
+                
+                with col1:
+                    if user['role'] != 'admin':  # Don't allow deactivating admin users
+                        if st.button(f"{'Deactivate' if user['active'] else 'Activate'}", key=f"toggle_{user['id']}"):
+                            if set_user_active(user['id'], not user['active']):
+                                st.success(f"User {'deactivated' if user['active'] else 'activated'} successfully!")
                                 st.rerun()
-                        else:
-                            st.info("Admin user")
-                    
-                    with col2:
-                        points_to_award = st.number_input(f"Award Points", min_value=0, max_value=1000, value=50, key=f"points_{user[0]}")
-                        if st.button("🏆 Award", key=f"award_{user[0]}"):
-                            award_points(user[0], points_to_award, "Admin Awarded Points")
-                            st.success(f"Awarded {points_to_award} points!")
-                            st.rerun()
-                    
-                    with col3:
-                        badge_options = ["Excellence", "Top Performer", "Quick Learner", "Dedicated Student", "Expert Level"]
-                        selected_badge = st.selectbox("Award Badge", badge_options, key=f"badge_{user[0]}")
-                        if st.button("🏅 Badge", key=f"badge_btn_{user[0]}"):
-                            award_badge(user[0], selected_badge)
-                            st.success(f"Badge '{selected_badge}' awarded!")
-                            st.rerun()
-        except Exception as e:
-            st.error(f"Error loading users: {e}")
-        finally:
-            conn.close()
+                    else:
+                        st.info("Admin user")
+                
+                with col2:
+                    points_to_award = st.number_input(f"Award Points", min_value=0, max_value=1000, value=50, key=f"points_{user['id']}")
+                    if st.button("🏆 Award", key=f"award_{user['id']}"):
+                        award_points(user['id'], points_to_award, "Admin Awarded Points")
+                        # The user table reads the DB directly, so wait for the write
+                        gamification_queue.flush()
+                        st.success(f"Awarded {points_to_award} points!")
+                        st.rerun()
+                
+                with col3:
+                    badge_options = ["Excellence", "Top Performer", "Quick Learner", "Dedicated Student", "Expert Level"]
+                    selected_badge = st.selectbox("Award Badge", badge_options, key=f"badge_{user['id']}")
+                    if st.button("🏅 Badge", key=f"badge_btn_{user['id']}"):
+                        award_badge(user['id'], selected_badge)
+                        # The user table reads the DB directly, so wait for the write
+                        gamification_queue.flush()
+                        st.success(f"Badge '{selected_badge}' awarded!")
+                        st.rerun()
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if len(page_keys) > 1 and st.button("← Previous Page"):
+                page_keys.pop()
+                st.rerun()
+        with col2:
+            if next_key and st.button("Next Page →"):
+                page_keys.append(next_key)
+                st.rerun()
     
     with tab2:
         st.subheader("Add New User")
@@ -1938,27 +3202,50 @@ def show_user_management():
 def show_quiz_management():
     st.markdown('<div class="main-header"><h1>❓ Quiz Management</h1></div>', unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs(["📝 Manage Questions", "➕ Add Questions", "🤖 AI Generate"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["📝 Manage Questions", "➕ Add Questions", "🤖 AI Generate",
+                                                  "📊 Item Analysis", "⏱️ Assessments", "🧬 Duplicates"])
     
     with tab1:
         st.subheader("Existing Quiz Questions")
         
-        modules = get_available_modules()
-        
-        for module in modules:
-            questions = get_quiz_questions(module['id'])
+        # Counts come from the summaries; question text is loaded a page at a time for one module
+        modules = get_module_summaries()
+        module = st.selectbox("Module", modules, key="manage_questions_module",
+                              format_func=lambda m: f"📚 {m['title']} ({m['question_count']} questions)")
+        
+        if module:
+            # Keys of the pages visited so far; switching module starts again from the first page
+            if st.session_state.get('question_page_module') != module['id']:
+                st.session_state.question_page_module = module['id']
+                st.session_state.question_page_keys = [None]
+            page_keys = st.session_state.question_page_keys
             
-            with st.expander(f"📚 {module['title']} ({len(questions)} questions)"):
-                if questions:
-                    for i, question in enumerate(questions, 1):
-                        st.write(f"**Q{i}:** {question['question']}")
-                        st.write(f"**Options:** A) {question['options']['A']}, B) {question['options']['B']}, C) {question['options']['C']}, D) {question['options']['D']}")
-                        st.write(f"**Correct:** {question['correct_answer']}")
-                        if question['explanation']:
-                            st.write(f"**Explanation:** {question['explanation']}")
-                        st.markdown("---")
-                else:
-                    st.info("No questions available for this module")
+            questions, next_key = get_module_questions_page(module['id'], after=page_keys[-1])
+            
+            if questions:
+                pages = max(1, -(-module['question_count'] // QUESTIONS_PAGE_SIZE))
+                st.caption(f"Page {len(page_keys)} of {pages}")
+                
+                first = (len(page_keys) - 1) * QUESTIONS_PAGE_SIZE
+                for i, question in enumerate(questions, first + 1):
+                    st.write(f"**Q{i}:** {question['question']}")
+                    st.write(f"**Options:** A) {question['options']['A']}, B) {question['options']['B']}, C) {question['options']['C']}, D) {question['options']['D']}")
+                    st.write(f"**Correct:** {question['correct_answer']}")
+                    if question['explanation']:
+                        st.write(f"**Explanation:** {question['explanation']}")
+                    st.markdown("---")
+                
+                col1, col2 = st.columns(2)
+                with col1:
+                    if len(page_keys) > 1 and st.button("← Previous Page", key="questions_previous"):
+                        page_keys.pop()
+                        st.rerun()
+                with col2:
+                    if next_key and st.button("Next Page →", key="questions_next"):
+                        page_keys.append(next_key)
+                        st.rerun()
+            else:
+                st.info("No questions available for this module")
     
     with tab2:
         st.subheader("Add New Quiz Question")
@@ -1983,16 +3270,67 @@ def show_quiz_management():
                 correct_answer = st.selectbox("Correct Answer", ["A", "B", "C", "D"])
                 explanation = st.text_area("Explanation (Optional)", height=80)
                 
+                col1, col2 = st.columns(2)
+                with col1:
+                    question_difficulty = st.selectbox("Difficulty (Optional)", [None, "Beginner", "Intermediate", "Advanced"],
+                                                       format_func=lambda x: x or "Not set")
+                with col2:
+                    tag = st.text_input("Tag (Optional)")
+                
+                allow_similar = st.checkbox("Add even if a similar question already exists")
+                
                 if st.form_submit_button("➕ Add Question"):
                     if question and option_a and option_b and option_c and option_d:
-                        if add_quiz_question(selected_module[0], question, option_a, option_b, 
-                                           option_c, option_d, correct_answer, explanation):
+                        similar = [] if allow_similar else find_similar_questions(question, option_a, option_b,
+                                                                                  option_c, option_d)
+                        if similar:
+                            st.warning("This looks like a question already in the bank. Tick the box above to add it anyway.")
+                            for duplicate in similar:
+                                st.write(f"• **{duplicate.similarity:.0%} similar** (Q#{duplicate.question_id}): {duplicate.question}")
+                        elif add_quiz_question(selected_module[0], question, option_a, option_b, 
+                                           option_c, option_d, correct_answer, explanation,
+                                           question_difficulty, tag.strip()):
                             st.success("Question added successfully!")
                             st.rerun()
                         else:
                             st.error("Failed to add question")
                     else:
                         st.error("Please fill all required fields")
+            
+            st.markdown("---")
+            st.subheader("📥 Import Questions from CSV")
+            st.caption("Columns: " + ", ".join(QUESTION_IMPORT_COLUMNS) +
+                       " (explanation, difficulty and tag optional). Near-duplicates are skipped.")
+            
+            uploaded = st.file_uploader("Questions CSV", type="csv", key="question_import")
+            if uploaded and st.button("📥 Import Questions"):
+                try:
+                    rows = pd.read_csv(uploaded, dtype=str, keep_default_na=False)
+                except Exception as e:
+                    rows = None
+                    st.error(f"Could not read CSV: {str(e)}")
+                
+                if rows is not None:
+                    missing = [column for column in QUESTION_IMPORT_COLUMNS if column not in rows.columns]
+                    if missing:
+                        st.error(f"Missing columns: {', '.join(missing)}")
+                    else:
+                        rows['correct_answer'] = rows['correct_answer'].str.strip().str.upper()
+                        complete = rows[(rows[QUESTION_IMPORT_COLUMNS] != '').all(axis=1)
+                                        & rows['correct_answer'].isin(OPTION_LETTERS)]
+                        
+                        added, skipped = import_quiz_questions(selected_module[0], complete.to_dict('records'))
+                        if added is None:
+                            st.error("Import failed; no questions were added. Please check the file and try again.")
+                        else:
+                            st.success(f"Imported {added} questions.")
+                        if len(complete) < len(rows):
+                            st.warning(f"{len(rows) - len(complete)} incomplete rows were ignored.")
+                        if skipped:
+                            st.warning(f"Skipped {len(skipped)} near-duplicates:")
+                            for row_number, text, duplicate in skipped:
+                                st.write(f"• Row {row_number}: {text} — {duplicate.similarity:.0%} similar to "
+                                         f"Q#{duplicate.question_id}")
     
     with tab3:
         st.subheader("🤖 AI Question Generator")
@@ -2040,7 +3378,12 @@ def show_quiz_management():
                                 st.write(f"**Explanation:** {q['explanation']}")
                                 
                                 if st.button(f"✅ Add Question {i}", key=f"add_ai_q_{i}"):
-                                    if add_quiz_question(
+                                    similar = find_similar_questions(q['question'], q['option_a'], q['option_b'],
+                                                                     q['option_c'], q['option_d'])
+                                    if similar:
+                                        st.warning(f"Not added: {similar[0].similarity:.0%} similar to "
+                                                   f"Q#{similar[0].question_id}: {similar[0].question}")
+                                    elif add_quiz_question(
                                         selected_module[0],
                                         q['question'],
                                         q['option_a'],
@@ -2048,15 +3391,21 @@ def show_quiz_management():
                                         q['option_c'],
                                         q['option_d'],
                                         q['correct_answer'],
-                                        q['explanation']
+                                        q['explanation'],
+                                        difficulty
                                     ):
                                         st.success(f"Question {i} added successfully!")
                                         st.rerun()
                         
                         if st.button("✅ Add All Generated Questions"):
                             added_count = 0
+                            skipped_count = 0
                             for q in result['questions']:
-                                if add_quiz_question(
+                                # Checked one at a time, so repeats within the batch are caught too
+                                if find_similar_questions(q['question'], q['option_a'], q['option_b'],
+                                                          q['option_c'], q['option_d']):
+                                    skipped_count += 1
+                                elif add_quiz_question(
                                     selected_module[0],
                                     q['question'],
                                     q['option_a'],
@@ -2064,14 +3413,148 @@ def show_quiz_management():
                                     q['option_c'],
                                     q['option_d'],
                                     q['correct_answer'],
-                                    q['explanation']
+                                    q['explanation'],
+                                    difficulty
                                 ):
                                     added_count += 1
                             
                             st.success(f"Added {added_count} questions successfully!")
+                            if skipped_count:
+                                st.warning(f"Skipped {skipped_count} near-duplicates of existing questions.")
                             st.rerun()
                     else:
                         st.error("Failed to generate questions. Please try again.")
+    
+    with tab4:
+        show_item_analysis()
+    
+    with tab5:
+        show_assessment_management()
+    
+    with tab6:
+        show_duplicate_report()
+
+def show_duplicate_report():
+    st.subheader("🧬 Near-Duplicate Questions")
+    st.caption("Pairs of questions whose wording and options overlap. Similar wording can still ask different "
+               "things, so review each pair before removing anything.")
+    
+    threshold = st.slider("Minimum similarity", 0.5, 1.0, DUPLICATE_THRESHOLD, 0.05, key="duplicate_threshold")
+    
+    if st.button("🔍 Find Duplicates"):
+        started = datetime.now()
+        report = get_duplicate_report(threshold)
+        if report is None:
+            st.error("Could not build the duplicate report")
+            return
+        
+        st.caption(f"Checked the whole question bank in {(datetime.now() - started).total_seconds():.2f}s")
+        if not report:
+            st.success("No near-duplicate questions found.")
+            return
+        
+        titles = {module['id']: module['title'] for module in get_available_modules()}
+        st.dataframe(pd.DataFrame([
+            {
+                'Similarity': f"{pair['similarity']:.0%}",
+                'Question': f"Q#{pair['first_id']}: {pair['first_question']}",
+                'Module': titles.get(pair['first_module'], pair['first_module']),
+                'Similar Question': f"Q#{pair['second_id']}: {pair['second_question']}",
+                'Similar Module': titles.get(pair['second_module'], pair['second_module']),
+            }
+            for pair in report
+        ]), use_container_width=True, hide_index=True)
+
+def show_item_analysis():
+    st.subheader("📊 Item Analysis")
+    
+    modules = get_available_modules()
+    selected_module = st.selectbox("Select Module", [(m['id'], m['title']) for m in modules],
+                                   format_func=lambda x: x[1], key="analysis_module")
+    if not selected_module:
+        return
+    
+    analysis = get_item_analysis(selected_module[0])
+    if analysis is None:
+        st.error("Could not compute item analysis")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Completed Attempts", analysis.attempts)
+    with col2:
+        st.metric("Questions", len(analysis.items))
+    with col3:
+        st.metric("KR-20 Reliability", f"{analysis.kr20:.2f}" if analysis.kr20 is not None else "n/a")
+    
+    if not analysis.attempts:
+        st.info("No completed attempts for this module yet.")
+        return
+    
+    report = analysis.items.rename(columns={
+        'question': 'Question', 'responses': 'Responses', 'p_value': 'p-value',
+        'point_biserial': 'Point-biserial', 'rate_A': 'A', 'rate_B': 'B', 'rate_C': 'C', 'rate_D': 'D',
+        'flag': 'Flag'
+    }).drop(columns=['question_id'])
+    
+    st.dataframe(report, use_container_width=True, hide_index=True, column_config={
+        'p-value': st.column_config.NumberColumn(format="%.2f"),
+        'Point-biserial': st.column_config.NumberColumn(format="%.2f"),
+        **{letter: st.column_config.NumberColumn(format="%.2f") for letter in OPTION_LETTERS}
+    })
+    st.caption("p-value: share answering correctly. Point-biserial: how well the question separates "
+               "strong from weak attempts. A–D: share of responses choosing each option. "
+               "KR-20 uses attempts that took the full, unsampled quiz.")
+
+def show_assessment_management():
+    st.subheader("⏱️ Timed Assessments")
+    
+    modules = get_available_modules()
+    selected_module = st.selectbox("Select Module", [(m['id'], m['title']) for m in modules],
+                                   format_func=lambda x: x[1], key="assessment_module")
+    if not selected_module:
+        return
+    
+    assessments = get_module_assessments(selected_module[0])
+    if assessments:
+        for assessment in assessments:
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.write(f"**{assessment['title']}** — {len(assessment['questions'])} questions, "
+                         f"{assessment['time_limit']} minutes, pass at {assessment['passing_score']}%")
+            with col2:
+                if st.button("Deactivate", key=f"deactivate_assessment_{assessment['id']}"):
+                    if deactivate_assessment(assessment['id']):
+                        st.success("Assessment deactivated")
+                        st.rerun()
+    else:
+        st.info("No timed assessments for this module yet.")
+    
+    bank = get_question_bank(selected_module[0])
+    if not bank or not len(bank):
+        st.warning("Add quiz questions to this module before creating an assessment.")
+        return
+    
+    with st.form("add_assessment"):
+        st.write("**New Assessment**")
+        title = st.text_input("Title", value="Final Assessment")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            question_count = st.number_input("Questions", min_value=1, max_value=len(bank),
+                                             value=min(len(bank), QUIZ_SAMPLE_SIZE))
+        with col2:
+            time_limit = st.number_input("Time Limit (minutes)", min_value=1, max_value=240, value=30)
+        with col3:
+            passing_score = st.number_input("Passing Score (%)", min_value=1, max_value=100, value=70)
+        
+        if st.form_submit_button("Create Assessment"):
+            if not title:
+                st.error("Please enter a title")
+            elif create_assessment(selected_module[0], title, question_count, time_limit, passing_score):
+                st.success("Assessment created")
+                st.rerun()
+            else:
+                st.error("Failed to create assessment")
 
 def show_content_research():
     st.markdown('<div class="main-header"><h1>🔍 Content Research</h1></div>', unsafe_allow_html=True)
@@ -2237,7 +3720,9 @@ def show_ai_assistant():
                         'content': response
                     })
                 
-                award_points(st.session_state.user_id, 5, "Used AI Assistant")
+                # Quick questions earn points once per day
+                award_once(st.session_state.user_id, 'ai_quick_question', '', 5, "Used AI Assistant",
+                           window=datetime.now().date().isoformat())
                 st.rerun()
 
 def show_progress_page():
@@ -2264,9 +3749,8 @@ def show_progress_page():
     create_user_progress_chart(st.session_state.user_id)
 
 def main():
-    # Run migration first, then initialize database
-    migrate_database()
-    init_database()
+    # Migrate and seed once per process; reruns hit the cached resource
+    bootstrap_database_once()
     
     # Sidebar
     with st.sidebar:
@@ -2308,6 +3792,10 @@ def main():
                 show_progress_page()
             elif page == 'quiz':
                 show_quiz()
+            elif page == 'review':
+                show_review()
+            elif page == 'search':
+                show_search()
             elif page == 'achievements':
                 show_achievements()
             elif page == 'ai_assistant':
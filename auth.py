@@ -2,7 +2,7 @@ import hashlib
 import streamlit as st
 from datetime import datetime, timedelta
 import jwt
-from database.database import get_db_connection
+from database import get_db_connection
 
 class AuthManager:
     def __init__(self):
@@ -0,0 +1,207 @@
+"""Micro-benchmarks for the database layer.
+
+Run from a scratch directory (the app database is created in the cwd):
+
+    python /path/to/benchmarks.py [name ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def timed(fn, iterations):
+    """Return the mean wall time of fn() in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+def bench_bootstrap(iterations=200):
+    """Per-rerun cost of migrate+init versus the once-per-process bootstrap"""
+    import app
+
+    app.bootstrap_database()
+
+    def legacy_rerun():
+        app.migrate_database()
+        app.init_database()
+
+    results = {
+        'migrate + init every rerun': timed(legacy_rerun, iterations),
+        'schema stamp check': timed(app.bootstrap_database, iterations),
+        'cached bootstrap': timed(app.bootstrap_database_once, iterations),
+    }
+
+    for label, ms in results.items():
+        print(f"{label:<32} {ms:8.3f} ms/rerun")
+
+    return results
+
+def bench_bulk_grading(rows=100000, questions_per_sheet=5):
+    """Throughput of bulk_grading on a synthetic sheet of random answers"""
+    import numpy as np
+    import pandas as pd
+    import app
+    from bulk_grading import grade_sheets
+
+    app.bootstrap_database()
+    conn = app.get_db_connection()
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, module_id FROM quizzes ORDER BY module_id, id")
+        questions = pd.DataFrame([tuple(q) for q in cursor.fetchall()], columns=['question_id', 'module_id'])
+        module_ids = questions['module_id'].unique()
+
+        # Enough learners that every (learner, module) sheet is distinct
+        sheets = rows // questions_per_sheet
+        users = -(-sheets // len(module_ids))
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+        first_id = cursor.fetchone()[0] + 1
+        cursor.executemany("""
+            INSERT INTO users (username, email, password, role, created_date)
+            VALUES (?, ?, '', 'student', '')
+        """, [(f"bench{first_id + i}", f"bench{first_id + i}@example.com") for i in range(users)])
+        conn.commit()
+
+        rng = np.random.default_rng(0)
+        sheet = np.arange(sheets)
+        by_module = questions.groupby('module_id')['question_id'].apply(list)
+
+        frames = []
+        for k in range(questions_per_sheet):
+            module_id = module_ids[sheet % len(module_ids)]
+            frames.append(pd.DataFrame({
+                'user_id': first_id + sheet // len(module_ids),
+                'module_id': module_id,
+                'question_id': [by_module[m][k % len(by_module[m])] for m in module_id],
+                'answer': rng.choice(list('ABCD'), sheets),
+            }))
+
+        report = grade_sheets(conn, pd.concat(frames, ignore_index=True))
+    finally:
+        conn.close()
+
+    print(f"{report['rows']} rows, {report['attempts']} attempts: grading {report['grading_seconds']:.2f}s, "
+          f"writing {report['writing_seconds']:.2f}s, {report['rows_per_second']:,.0f} rows/sec")
+
+    return report
+
+def bench_search(modules=10000, questions=200000, iterations=20):
+    """Search latency over a synthetic corpus with a Zipf word distribution"""
+    import numpy as np
+    import app
+    from search import search
+
+    app.bootstrap_database()
+    conn = app.get_db_connection()
+
+    rng = np.random.default_rng(0)
+    vocabulary = np.array([f"t{i}" for i in range(20000)])
+    weights = 1 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+
+    def texts(count, words):
+        tokens = vocabulary[rng.choice(len(vocabulary), (count, words), p=weights)]
+        return [' '.join(row) for row in tokens.tolist()]
+
+    try:
+        cursor = conn.cursor()
+        start = time.perf_counter()
+
+        cursor.executemany("""
+            INSERT INTO modules (title, description, difficulty, category, content, created_date, active)
+            VALUES (?, ?, 'Beginner', 'Benchmark', ?, '', 1)
+        """, zip(texts(modules, 6), texts(modules, 20), texts(modules, 400)))
+        cursor.execute("SELECT MIN(id) FROM modules WHERE category = 'Benchmark'")
+        first_module = cursor.fetchone()[0]
+
+        cursor.executemany("""
+            INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d,
+                                 correct_answer, explanation, created_date)
+            VALUES (?, ?, 'A', 'B', 'C', 'D', 'A', ?, '')
+        """, zip((first_module + rng.integers(0, modules, questions)).tolist(),
+                 texts(questions, 15), texts(questions, 25)))
+        conn.commit()
+        print(f"indexed {modules} modules and {questions} questions in {time.perf_counter() - start:.1f}s")
+
+        results = {}
+        for text in ["t0", "t5", "t100", "t1000 t20", "t3", "t1 t2", "t15 t400 t9", "t0 t17000", "t17000", "t7 "]:
+            found = search(cursor, text)
+            ms = timed(lambda: search(cursor, text), iterations)
+            ranked = all(r for _, r in found.values())
+            results[text] = ms
+            print(f"{text!r:<16} {ms:8.2f} ms  {'ranked' if ranked else 'newest first'}")
+    finally:
+        conn.close()
+
+    return results
+
+def bench_question_dedup(questions=50000, planted=1000, iterations=50):
+    """Indexing, whole-bank report and insert check on a synthetic bank with planted near-duplicates"""
+    import numpy as np
+    import app
+    from question_dedup import index_questions, duplicate_pairs, find_duplicates
+
+    app.bootstrap_database()
+    conn = app.get_db_connection()
+
+    rng = np.random.default_rng(0)
+    letters = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+    vocabulary = np.array([''.join(rng.choice(letters, n)) for n in rng.integers(3, 10, 5000)])
+    weights = 1 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+    words = vocabulary[rng.choice(len(vocabulary), (questions, 16), p=weights)]
+
+    # Planted copies of the first questions with two words changed
+    copies = words[:planted].copy()
+    for _ in range(2):
+        copies[np.arange(planted), rng.integers(0, 16, planted)] = vocabulary[rng.integers(0, len(vocabulary), planted)]
+    rows = [(' '.join(row[:12]), *row[12:]) for row in np.concatenate([words, copies]).tolist()]
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM quizzes")
+        first_id = cursor.fetchone()[0] + 1
+        cursor.executemany("""
+            INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d,
+                                 correct_answer, explanation, created_date)
+            VALUES (1, ?, ?, ?, ?, ?, 'A', '', '')
+        """, rows)
+        conn.commit()
+
+        start = time.perf_counter()
+        indexed = index_questions(cursor)
+        conn.commit()
+        index_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pairs = duplicate_pairs(cursor)
+        report_seconds = time.perf_counter() - start
+
+        planted_pairs = {(first_id + i, first_id + questions + i) for i in range(planted)}
+        found = len(planted_pairs & {(first, second) for _, first, second in pairs})
+
+        check_ms = timed(lambda: find_duplicates(cursor, rows[0][0], rows[0][1:]), iterations)
+    finally:
+        conn.close()
+
+    print(f"indexed {indexed} questions in {index_seconds:.2f}s")
+    print(f"report over the bank: {report_seconds:.2f}s, {len(pairs)} pairs, {found}/{planted} planted pairs found")
+    print(f"insert check: {check_ms:.2f} ms")
+
+    return {'index_seconds': index_seconds, 'report_seconds': report_seconds, 'recall': found / planted,
+            'check_ms': check_ms}
+
+BENCHMARKS = {
+    'bootstrap': bench_bootstrap,
+    'bulk_grading': bench_bulk_grading,
+    'search': bench_search,
+    'question_dedup': bench_question_dedup,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        print(f"== {name}")
+        BENCHMARKS[name]()
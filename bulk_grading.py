@@ -0,0 +1,356 @@
+"""Bulk grading of offline exam answer sheets.
+
+Answer sheets come in as a CSV with one row per answered question:
+
+    username (or user_id), module_id, question_id, answer
+
+Every (user, module) pair in the file is one attempt, scored out of all
+of the module's questions: a question the attempt has no row for counts as
+wrong.  Grading is a single NumPy comparison of the answer column against
+the answer key loaded from the quizzes table; per-attempt scores are
+bincounts.  Attempts, answers, progress, points and badges are then
+written with executemany in one transaction per batch of attempts, so a
+sheet of 100k answer rows takes seconds instead of 100k trips through
+show_quiz.
+
+A sheet is checked before anything is written: answers must be an option
+letter (or blank for unanswered) and no (user, module, question) may
+repeat.  Each attempt id is derived from that attempt's own rows (user,
+module and its question/answer pairs), so running the same sheet again,
+including after a run that stopped part way or with other learners'
+rows added, writes only the attempts that aren't recorded yet.
+
+    python bulk_grading.py answers.csv [database]
+"""
+import hashlib
+import sys
+import time
+import uuid
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from cache import bump_version
+from gamification import apply_badge
+from item_analysis import answers_version_name
+from quiz_engine import quiz_version, OPTION_LETTERS
+from review_queue import record_answers
+
+# Attempts written per transaction
+BATCH_ATTEMPTS = 2000
+
+# Parameters per lookup query (SQLite's limit is 999 on older builds)
+LOOKUP_CHUNK = 500
+
+# Accepted answers; blank means unanswered
+ANSWER_CHOICES = OPTION_LETTERS + ('',)
+
+# CSV lines named per problem when a sheet is rejected
+MAX_REPORTED_LINES = 10
+
+# Same scale as save_quiz_result: (minimum percentage, points, reason)
+POINT_TIERS = (
+    (90, 100, "Excellent Quiz Performance"),
+    (80, 75, "Good Quiz Performance"),
+    (70, 50, "Passing Quiz Score"),
+)
+
+def chunked(values, size=LOOKUP_CHUNK):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def read_sheets(path):
+    """Answer rows with user_id or username, module_id, question_id and answer columns"""
+    sheets = pd.read_csv(path, dtype={'username': str, 'answer': str}, keep_default_na=False)
+
+    missing = {'module_id', 'question_id', 'answer'} - set(sheets.columns)
+    if missing or not {'user_id', 'username'} & set(sheets.columns):
+        raise ValueError(f"CSV needs user_id or username, module_id, question_id and answer columns "
+                         f"(missing: {', '.join(sorted(missing)) or 'user_id/username'})")
+    return sheets
+
+def resolve_users(cursor, sheets):
+    """user_id for every row (-1 where the user doesn't exist)"""
+    if 'user_id' in sheets.columns:
+        user_ids = pd.to_numeric(sheets['user_id'], errors='coerce').fillna(-1).astype(np.int64)
+        known = set()
+        for chunk in chunked(user_ids.unique().tolist()):
+            cursor.execute(f"SELECT id FROM users WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            known.update(row[0] for row in cursor.fetchall())
+        return np.where(user_ids.isin(known), user_ids, -1)
+
+    ids = {}
+    for chunk in chunked(sheets['username'].unique().tolist()):
+        cursor.execute(f"SELECT username, id FROM users WHERE username IN ({','.join('?' * len(chunk))})", chunk)
+        ids.update(cursor.fetchall())
+    return sheets['username'].map(ids).fillna(-1).astype(np.int64).to_numpy()
+
+def load_answer_key(cursor, module_ids):
+    """Question ids (sorted), their module ids and correct letters as aligned arrays"""
+    rows = []
+    for chunk in chunked(sorted(module_ids)):
+        cursor.execute(f"""
+            SELECT id, module_id, correct_answer FROM quizzes
+            WHERE module_id IN ({','.join('?' * len(chunk))})
+        """, chunk)
+        rows.extend(cursor.fetchall())
+
+    rows.sort()
+    return (
+        np.array([row[0] for row in rows], dtype=np.int64),
+        np.array([row[1] for row in rows], dtype=np.int64),
+        np.array([(row[2] or '').strip().upper() for row in rows], dtype=str),
+    )
+
+def csv_lines(rows):
+    """CSV line numbers (after the header) of row positions, shortened for messages"""
+    lines = ', '.join(str(row + 2) for row in rows[:MAX_REPORTED_LINES])
+    return lines + (f" and {len(rows) - MAX_REPORTED_LINES} more" if len(rows) > MAX_REPORTED_LINES else "")
+
+def sheet_problems(user_ids, module_ids, question_ids, answers, valid, key):
+    """Reasons a sheet can't be graded as it stands (empty if it can)"""
+    problems = []
+
+    bad = np.flatnonzero(~np.isin(answers, ANSWER_CHOICES))
+    if len(bad):
+        problems.append(f"answers other than {', '.join(OPTION_LETTERS)} or blank on lines {csv_lines(bad)}")
+
+    repeated = pd.DataFrame({'user': user_ids, 'module': module_ids, 'question': question_ids}).duplicated()
+    repeated = np.flatnonzero(valid & repeated.to_numpy())
+    if len(repeated):
+        problems.append(f"the same user, module and question more than once on lines {csv_lines(repeated)}")
+
+    key_ids, _, key_answers = key
+    unkeyed = np.flatnonzero(valid & np.isin(question_ids, key_ids[~np.isin(key_answers, OPTION_LETTERS)]))
+    if len(unkeyed):
+        problems.append(f"questions without a valid correct answer on lines {csv_lines(unkeyed)}")
+
+    return problems
+
+def attempt_id(user_id, module_id, question_ids, answers):
+    """Deterministic id of one attempt from its rows, whatever their order or the rest of the sheet"""
+    order = np.argsort(question_ids, kind='stable')
+    digest = hashlib.sha256(f"{user_id}:{module_id}:".encode('utf-8'))
+    digest.update(np.ascontiguousarray(question_ids[order], dtype='<i8').tobytes())
+    digest.update('\x1f'.join(answers[order].tolist()).encode('utf-8'))
+    return uuid.uuid5(uuid.NAMESPACE_OID, digest.hexdigest()).hex
+
+def recorded_attempts(cursor, attempt_ids):
+    """The subset of attempt_ids already in quiz_attempts"""
+    recorded = set()
+    for chunk in chunked(attempt_ids):
+        cursor.execute(f"SELECT id FROM quiz_attempts WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        recorded.update(row[0] for row in cursor.fetchall())
+    return recorded
+
+def grade(user_ids, module_ids, question_ids, answers, key):
+    """Vectorised grading.
+
+    Returns a mask of gradable rows (known user, question of that module)
+    and, for those rows, whether each answer is correct.
+    """
+    key_ids, key_modules, key_answers = key
+
+    if not len(key_ids):
+        return np.zeros(len(question_ids), dtype=bool), np.zeros(0, dtype=bool)
+
+    pos = np.minimum(np.searchsorted(key_ids, question_ids), len(key_ids) - 1)
+    valid = (user_ids >= 0) & (key_ids[pos] == question_ids) & (key_modules[pos] == module_ids)
+
+    return valid, answers[valid] == key_answers[pos[valid]]
+
+def module_sizes(key, module_ids):
+    """Number of questions in the answer key of each of module_ids (all present in the key)"""
+    modules, sizes = np.unique(key[1], return_counts=True)
+    return sizes[np.searchsorted(modules, module_ids)]
+
+def point_awards(percentages):
+    """Points and reason index (into POINT_TIERS, -1 for none) per attempt"""
+    tier = np.full(len(percentages), -1)
+    for i, (minimum, _, _) in reversed(list(enumerate(POINT_TIERS))):
+        tier[percentages >= minimum] = i
+    points = np.array([points for _, points, _ in POINT_TIERS] + [0])[tier]
+    return points, tier
+
+def write_batch(conn, attempts, answer_rows, now):
+    """Write one batch of graded attempts in a single transaction"""
+    cursor = conn.cursor()
+    conn.execute("BEGIN IMMEDIATE")
+
+    try:
+        cursor.executemany("""
+            INSERT INTO quiz_attempts
+            (id, user_id, module_id, quiz_version, mode, status, score, total_questions, started_date, completed_date)
+            VALUES (?, ?, ?, ?, 'offline', 'completed', ?, ?, ?, ?)
+        """, [(a['id'], a['user_id'], a['module_id'], a['version'], a['score'], a['total'], now, now)
+              for a in attempts])
+
+        cursor.executemany("""
+            INSERT INTO quiz_attempt_answers (attempt_id, question_id, position, selected_answer, is_correct)
+            VALUES (?, ?, ?, ?, ?)
+        """, answer_rows)
+
+        cursor.executemany("""
+            INSERT INTO user_progress
+            (user_id, module_id, quiz_score, best_score, quiz_attempts, started_date)
+            VALUES (?, ?, ?, ?, 1, ?)
+            ON CONFLICT (user_id, module_id) DO UPDATE SET
+                quiz_score = excluded.quiz_score,
+                best_score = MAX(user_progress.best_score, excluded.best_score),
+                quiz_attempts = user_progress.quiz_attempts + 1
+        """, [(a['user_id'], a['module_id'], a['percentage'], a['percentage'], now) for a in attempts])
+
+        # Points: ledger and achievement rows per attempt, one balance update per user
+        awarded = [a for a in attempts if a['points']]
+        cursor.executemany("""
+            INSERT INTO points_ledger (user_id, delta, reason, created_date) VALUES (?, ?, ?, ?)
+        """, [(a['user_id'], a['points'], a['reason'], now) for a in awarded])
+        cursor.executemany("""
+            INSERT INTO user_achievements (user_id, achievement_type, achievement_name, points_earned, earned_date)
+            VALUES (?, 'points', ?, ?, ?)
+        """, [(a['user_id'], a['reason'], a['points'], now) for a in awarded])
+
+        balances = {}
+        for a in awarded:
+            balances[a['user_id']] = balances.get(a['user_id'], 0) + a['points']
+        cursor.executemany("""
+            INSERT INTO point_balances (user_id, points, updated_date)
+            VALUES (?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                points = point_balances.points + excluded.points,
+                updated_date = excluded.updated_date
+        """, [(user_id, points, now) for user_id, points in balances.items()])
+
+        for user_id in {a['user_id'] for a in attempts}:
+            apply_badge(cursor, user_id, "Quiz Taker")
+        for user_id in {a['user_id'] for a in attempts if a['percentage'] == 100}:
+            apply_badge(cursor, user_id, "Perfect Score")
+
+        # Missed questions go into each learner's review queue
+        owners = {a['id']: (a['user_id'], a['module_id']) for a in attempts}
+        record_answers(cursor, [
+            (owners[attempt_id][0], question_id, owners[attempt_id][1], correct)
+            for attempt_id, question_id, _, _, correct in answer_rows
+        ], datetime.fromisoformat(now))
+
+        for module_id in {a['module_id'] for a in attempts}:
+            bump_version(cursor, answers_version_name(module_id))
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def grade_sheets(conn, sheets, batch_attempts=BATCH_ATTEMPTS):
+    """Grade and record answer rows; returns counts and timings.
+
+    Raises ValueError, before writing anything, if the sheet has malformed
+    answers or repeated questions.
+    """
+    started = time.perf_counter()
+    cursor = conn.cursor()
+
+    user_ids = resolve_users(cursor, sheets)
+    module_ids = pd.to_numeric(sheets['module_id'], errors='coerce').fillna(-1).astype(np.int64).to_numpy()
+    question_ids = pd.to_numeric(sheets['question_id'], errors='coerce').fillna(-1).astype(np.int64).to_numpy()
+    answers = sheets['answer'].astype(str).str.strip().str.upper().to_numpy(dtype=str)
+
+    key = load_answer_key(cursor, np.unique(module_ids[module_ids >= 0]).tolist())
+    valid, correct = grade(user_ids, module_ids, question_ids, answers, key)
+
+    problems = sheet_problems(user_ids, module_ids, question_ids, answers, valid, key)
+    if problems:
+        raise ValueError(f"Answer sheet rejected: {'; '.join(problems)}")
+
+    user_ids, module_ids, question_ids, answers = (
+        user_ids[valid], module_ids[valid], question_ids[valid], answers[valid]
+    )
+
+    # One attempt per (user, module); positions follow the sheet's row order
+    attempt, pairs = pd.factorize(pd.MultiIndex.from_arrays([user_ids, module_ids]))
+    scores = np.bincount(attempt, weights=correct, minlength=len(pairs)).astype(np.int64)
+    totals = module_sizes(key, pairs.get_level_values(1).to_numpy())
+    positions = pd.Series(attempt).groupby(attempt).cumcount().to_numpy()
+    percentages = scores / np.maximum(totals, 1) * 100
+    points, tiers = point_awards(percentages)
+
+    graded = time.perf_counter()
+
+    pair_users = pairs.get_level_values(0).tolist()
+    pair_modules = pairs.get_level_values(1).tolist()
+    versions = {module_id: quiz_version(cursor, module_id) for module_id in set(pair_modules)}
+    now = datetime.now().isoformat()
+
+    # Answer rows sorted by attempt so each attempt's rows are one contiguous slice
+    order = np.argsort(attempt, kind='stable')
+    bounds = np.searchsorted(attempt[order], np.arange(len(pairs) + 1))
+    slices = [order[bounds[i]:bounds[i + 1]] for i in range(len(pairs))]
+
+    # The same answers always yield the same attempt id; recorded ones are skipped
+    attempt_ids = [attempt_id(user_id, module_id, question_ids[rows], answers[rows])
+                   for user_id, module_id, rows in zip(pair_users, pair_modules, slices)]
+    recorded = recorded_attempts(cursor, attempt_ids)
+    pending = [i for i in range(len(pairs)) if attempt_ids[i] not in recorded]
+
+    for start in range(0, len(pending), batch_attempts):
+        batch = pending[start:start + batch_attempts]
+        attempts = [
+            {
+                'id': attempt_ids[i],
+                'user_id': pair_users[i],
+                'module_id': pair_modules[i],
+                'version': versions[pair_modules[i]],
+                'score': int(scores[i]),
+                'total': int(totals[i]),
+                'percentage': float(percentages[i]),
+                'points': int(points[i]),
+                'reason': f"{POINT_TIERS[tiers[i]][2]} ({percentages[i]:.1f}%)" if tiers[i] >= 0 else None,
+            }
+            for i in batch
+        ]
+
+        rows = np.concatenate([slices[i] for i in batch])
+        answer_rows = [
+            (attempt_ids[a], q, p, s or None, c)
+            for a, q, p, s, c in zip(attempt[rows].tolist(), question_ids[rows].tolist(),
+                                     positions[rows].tolist(), answers[rows].tolist(),
+                                     correct[rows].astype(int).tolist())
+        ]
+        write_batch(conn, attempts, answer_rows, now)
+
+    finished = time.perf_counter()
+
+    return {
+        'rows': len(sheets),
+        'graded_rows': int(valid.sum()),
+        'skipped_rows': int(len(sheets) - valid.sum()),
+        'attempts': len(pending),
+        'already_recorded': len(recorded),
+        'grading_seconds': graded - started,
+        'writing_seconds': finished - graded,
+        'rows_per_second': len(sheets) / max(finished - started, 1e-9),
+    }
+
+if __name__ == "__main__":
+    import sqlite3
+
+    if len(sys.argv) < 2:
+        print("Usage: python bulk_grading.py answers.csv [database]")
+        sys.exit(1)
+
+    conn = sqlite3.connect(sys.argv[2] if len(sys.argv) > 2 else "realestate_guru.db")
+    conn.execute("PRAGMA busy_timeout = 5000")
+
+    try:
+        report = grade_sheets(conn, read_sheets(sys.argv[1]))
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    print(f"Graded {report['graded_rows']} of {report['rows']} rows into {report['attempts']} attempts "
+          f"({report['skipped_rows']} skipped: unknown user, or question not in that module)")
+    if report['already_recorded']:
+        print(f"{report['already_recorded']} attempts from this sheet were already recorded and were skipped")
+    print(f"Grading {report['grading_seconds']:.2f}s, writing {report['writing_seconds']:.2f}s, "
+          f"{report['rows_per_second']:,.0f} rows/sec")
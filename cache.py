@@ -0,0 +1,78 @@
+"""Process-wide caches invalidated through version rows in the database.
+
+Every cache has a name and a row in cache_versions.  Writers bump that row
+in the same transaction as their change; readers compare it with the
+version their copy was built from and reload only when it moved.  The check
+is a single primary-key lookup, and because the counter lives in the shared
+database file every Streamlit server process sees the same invalidations.
+"""
+import threading
+
+def bump_version(cursor, name):
+    """Invalidate a cache; call inside the transaction that changes its data"""
+    cursor.execute("""
+        INSERT INTO cache_versions (name, version) VALUES (?, 1)
+        ON CONFLICT (name) DO UPDATE SET version = version + 1
+    """, (name,))
+
+def read_version(cursor, name):
+    cursor.execute("SELECT version FROM cache_versions WHERE name = ?", (name,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+class VersionedCache:
+    """A value loaded by load(conn) and reused until its version row changes"""
+
+    def __init__(self, name, load):
+        self.name = name
+        self.load = load
+        self._value = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, conn):
+        version = read_version(conn.cursor(), self.name)
+
+        with self._lock:
+            if version == self._version:
+                return self._value
+
+        # A write landing between the version read and the load only makes
+        # the cached copy newer than its version, so the next get() reloads
+        value = self.load(conn)
+
+        with self._lock:
+            self._value = value
+            self._version = version
+        return value
+
+    def invalidate(self):
+        """Drop this process's copy (the next get() reloads)"""
+        with self._lock:
+            self._value = None
+            self._version = None
+
+def load_module_catalog(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, title, description, difficulty, category, youtube_url
+        FROM modules
+        WHERE active = 1
+        ORDER BY order_index
+    """)
+
+    return tuple(
+        {
+            'id': module[0],
+            'title': module[1],
+            'description': module[2],
+            'difficulty': module[3],
+            'category': module[4],
+            'youtube_url': module[5]
+        }
+        for module in cursor.fetchall()
+    )
+
+MODULES = 'modules'
+
+module_catalog = VersionedCache(MODULES, load_module_catalog)
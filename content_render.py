@@ -0,0 +1,192 @@
+"""Save-time rendering of module content into sections.
+
+Module bodies are authored as one markdown document.  When a module is
+added or updated the body is sanitized (raw HTML, script-style links and
+control characters removed outside code blocks), split at its top-level
+headings into sections, and stored in module_sections together with a
+table of contents and a hash of the sanitized text on the module row.
+
+Each section records its offset and length in the sanitized text, so the
+table of contents (and reading progress, kept per section anchor in
+section_progress) is served from a covering index without reading any
+body.  The module page then sends one section per rerun instead of the
+whole body.  Section bodies are cached in-process keyed on the content
+hash, so like an ETag an unchanged module is never re-read, and a changed
+module can never be served from a stale entry.
+"""
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+# Headings at this level or above (# and ##) start a new section
+SPLIT_LEVEL = 2
+
+# Title of the text before the first heading
+INTRO_TITLE = "Introduction"
+
+# Section bodies kept in memory across all modules
+MAX_CACHED_SECTIONS = 256
+
+Section = namedtuple('Section', 'position level title anchor start_offset length body')
+TocEntry = namedtuple('TocEntry', 'position level title anchor start_offset length')
+RenderedModule = namedtuple('RenderedModule', 'content_hash toc sections')
+
+HEADING = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t#]*$')
+FENCE = re.compile(r'^[ \t]*(```|~~~)')
+CODE_BLOCK = re.compile(r'^[ \t]*(```|~~~).*?(^[ \t]*\1[^\n]*$|\Z)', re.M | re.S)
+UNSAFE_BLOCK = re.compile(r'<(script|style|iframe|object|embed)\b.*?(</\1\s*>|\Z)', re.I | re.S)
+HTML_TAG = re.compile(r'</?[A-Za-z][^<>]*>')
+UNSAFE_LINK = re.compile(r'\]\(\s*(?:javascript|vbscript|data):(?:[^()]|\([^()]*\))*\)', re.I)
+CONTROL = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+
+def clean_text(text):
+    text = UNSAFE_BLOCK.sub('', text)
+    text = HTML_TAG.sub('', text)
+    return UNSAFE_LINK.sub('](#)', text)
+
+def sanitize(markdown):
+    """Markdown with raw HTML and unsafe links removed; code blocks are left as written"""
+    text = CONTROL.sub('', (markdown or '').replace('\r\n', '\n').replace('\r', '\n'))
+
+    parts, last = [], 0
+    for block in CODE_BLOCK.finditer(text):
+        parts.append(clean_text(text[last:block.start()]))
+        parts.append(block.group(0))
+        last = block.end()
+    parts.append(clean_text(text[last:]))
+
+    return '\n'.join(line.rstrip() for line in ''.join(parts).strip().split('\n'))
+
+def slugify(title, seen):
+    """URL-style anchor for a heading, unique within the module"""
+    slug = re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-') or 'section'
+    anchor, n = slug, 2
+    while anchor in seen:
+        anchor, n = f"{slug}-{n}", n + 1
+    seen.add(anchor)
+    return anchor
+
+def split_sections(text):
+    """Split sanitized markdown at headings of level <= SPLIT_LEVEL (not inside code blocks).
+
+    Each section's body is text[start_offset:start_offset + length].
+    """
+    sections, seen = [], set()
+    title, level, start = INTRO_TITLE, 0, 0
+    in_code = False
+
+    def flush(end):
+        raw = text[start:end]
+        body = raw.strip()
+        if body:
+            offset = start + len(raw) - len(raw.lstrip())
+            sections.append(Section(len(sections), level, title, slugify(title, seen), offset, len(body), body))
+
+    offset = 0
+    for line in text.split('\n'):
+        if FENCE.match(line):
+            in_code = not in_code
+
+        heading = None if in_code else HEADING.match(line)
+        if heading and len(heading.group(1)) <= SPLIT_LEVEL:
+            flush(offset)
+            title, level, start = heading.group(2).strip(), len(heading.group(1)), offset
+
+        offset += len(line) + 1
+
+    flush(len(text))
+    return sections
+
+def render_module(markdown):
+    """Sanitized sections, table of contents and content hash of a module body"""
+    text = sanitize(markdown)
+    sections = split_sections(text)
+    toc = [TocEntry(*section[:-1]) for section in sections]
+    return RenderedModule(hashlib.sha256(text.encode('utf-8')).hexdigest(), toc, sections)
+
+def store_sections(cursor, module_id, markdown):
+    """Re-render a module's sections in the caller's transaction.
+
+    Nothing is rewritten when the sanitized content hash is unchanged.
+    Returns the content hash.
+    """
+    rendered = render_module(markdown)
+
+    cursor.execute("SELECT content_hash FROM modules WHERE id = ?", (module_id,))
+    row = cursor.fetchone()
+    if row and row[0] == rendered.content_hash:
+        return rendered.content_hash
+
+    cursor.execute("DELETE FROM module_sections WHERE module_id = ?", (module_id,))
+    cursor.executemany("""
+        INSERT INTO module_sections (module_id, position, level, title, anchor, start_offset, length, body)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(module_id, *section) for section in rendered.sections])
+    cursor.execute("UPDATE modules SET content_hash = ?, toc = ? WHERE id = ?",
+                   (rendered.content_hash, json.dumps(rendered.toc), module_id))
+
+    return rendered.content_hash
+
+def load_toc(cursor, module_id):
+    """Table of contents from idx_module_sections_toc; never reads a section body"""
+    cursor.execute("""
+        SELECT position, level, title, anchor, start_offset, length
+        FROM module_sections
+        WHERE module_id = ?
+        ORDER BY position
+    """, (module_id,))
+    return [TocEntry(*row) for row in cursor.fetchall()]
+
+def read_anchors(cursor, user_id, module_id):
+    """Anchors of the sections a user has read in a module"""
+    cursor.execute("""
+        SELECT anchor FROM section_progress
+        WHERE user_id = ? AND module_id = ?
+    """, (user_id, module_id))
+    return {row[0] for row in cursor.fetchall()}
+
+def record_section_read(cursor, user_id, module_id, anchor):
+    """Mark a section read; progress is kept by anchor so it survives edits that move sections"""
+    cursor.execute("""
+        INSERT OR IGNORE INTO section_progress (user_id, module_id, anchor, read_date)
+        VALUES (?, ?, ?, ?)
+    """, (user_id, module_id, anchor, datetime.now().isoformat()))
+    return cursor.rowcount == 1
+
+class SectionCache:
+    """Process-wide LRU of section bodies keyed on (content hash, position)"""
+
+    def __init__(self, max_entries=MAX_CACHED_SECTIONS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cursor, module_id, content_hash, position):
+        key = (content_hash, position)
+
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+
+        # Only cache a body that still belongs to this hash
+        cursor.execute("""
+            SELECT s.body FROM module_sections s
+            JOIN modules m ON m.id = s.module_id
+            WHERE s.module_id = ? AND s.position = ? AND m.content_hash = ?
+        """, (module_id, position, content_hash))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+
+        with self._lock:
+            self._entries[key] = row[0]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return row[0]
+
+section_cache = SectionCache()
@@ -205,7 +205,7 @@ class ContentResearcher:
     def update_content_database(self, research_results):
         """Update database with researched content"""
         
-        from database.database import get_db_connection
+        from database import get_db_connection
         
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -1,13 +1,194 @@
 import sqlite3
 import os
-from database.models import DatabaseModels
+import atexit
+import threading
+from contextlib import contextmanager
+from models import DatabaseModels
+from cache import bump_version, MODULES
 
 DATABASE_PATH = "realestate_guru.db"
 
+# Connection tuning
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KB = 16000
+STATEMENT_CACHE_SIZE = 256
+MAX_IDLE_CONNECTIONS = 8
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection whose close() hands it back to its pool"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.transaction_depth = 0
+        self.checkout_depth = 0
+    
+    def owns_transaction(self):
+        """Whether commit()/rollback() here end the transaction.
+        
+        Inside pool.transaction() the block that began it commits or rolls
+        back; helpers borrowing the connection there defer to it.
+        """
+        return self.transaction_depth == 0
+    
+    def commit(self):
+        if self.owns_transaction():
+            super().commit()
+    
+    def rollback(self):
+        if self.owns_transaction():
+            super().rollback()
+    
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+    
+    def close_physical(self):
+        """Really close the underlying SQLite handle"""
+        sqlite3.Connection.close(self)
+
+class ConnectionPool:
+    """Process-wide pool of tuned SQLite connections.
+    
+    Inside a transaction() block, nested checkouts on the same thread share
+    its connection, so helpers join the transaction. Anywhere else every
+    checkout gets a connection of its own, as with plain sqlite3.connect(),
+    so a helper's commit() always sticks and never ends a caller's work.
+    close() returns a connection to the idle list for reuse.
+    """
+    
+    def __init__(self, database_path, max_idle=MAX_IDLE_CONNECTIONS):
+        self.database_path = database_path
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=PooledConnection
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.pool = self
+        return conn
+    
+    def _checkouts(self):
+        """This thread's checked-out connections, innermost last"""
+        checkouts = getattr(self._local, 'checkouts', None)
+        if checkouts is None:
+            checkouts = self._local.checkouts = []
+        return checkouts
+    
+    def acquire(self):
+        """Check out a connection: the enclosing transaction's, else an idle or new one"""
+        checkouts = self._checkouts()
+        if checkouts and checkouts[-1].transaction_depth > 0:
+            conn = checkouts[-1]
+            conn.checkout_depth += 1
+            return conn
+        
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        
+        if conn is None:
+            conn = self._connect()
+        
+        conn.checkout_depth = 1
+        checkouts.append(conn)
+        return conn
+    
+    def release(self, conn):
+        """Return a connection; a shared one goes back to the pool on its last release"""
+        checkouts = self._checkouts()
+        if not any(checkout is conn for checkout in checkouts):
+            # Not checked out by this thread - don't risk handing it out twice
+            conn.close_physical()
+            return
+        
+        conn.checkout_depth -= 1
+        if conn.checkout_depth > 0:
+            return
+        
+        del checkouts[next(i for i, checkout in enumerate(checkouts) if checkout is conn)]
+        conn.transaction_depth = 0
+        
+        # Same semantics as sqlite3 close(): uncommitted work is discarded
+        if conn.in_transaction:
+            sqlite3.Connection.rollback(conn)
+        conn.row_factory = None
+        
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        
+        conn.close_physical()
+    
+    @contextmanager
+    def transaction(self):
+        """Run a block as one IMMEDIATE transaction.
+        
+        Helpers called inside the block share this thread's connection, and
+        their own commit() calls are deferred until the block exits. A block
+        nested in another joins the outer transaction.
+        """
+        conn = self.acquire()
+        
+        # Only the outermost block begins and ends the transaction
+        began = conn.transaction_depth == 0
+        if began:
+            conn.execute("BEGIN IMMEDIATE")
+        conn.transaction_depth += 1
+        
+        try:
+            yield conn
+        except BaseException:
+            conn.transaction_depth -= 1
+            if began:
+                sqlite3.Connection.rollback(conn)
+            raise
+        else:
+            conn.transaction_depth -= 1
+            if began:
+                sqlite3.Connection.commit(conn)
+        finally:
+            conn.close()
+    
+    def in_transaction(self):
+        """Whether this thread is inside a transaction() block"""
+        checkouts = self._checkouts()
+        return bool(checkouts) and checkouts[-1].transaction_depth > 0
+    
+    def close_all(self):
+        """Close every idle connection (used at shutdown)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        
+        for conn in idle:
+            conn.close_physical()
+
+pool = ConnectionPool(DATABASE_PATH)
+atexit.register(lambda: get_pool().close_all())
+
+def get_pool():
+    """The process-wide pool; every module goes through this, so swapping pool swaps it everywhere"""
+    return pool
+
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    """Get database connection (rows as sqlite3.Row unless borrowed inside a transaction)"""
+    conn = get_pool().acquire()
+    if conn.checkout_depth == 1:
+        conn.row_factory = sqlite3.Row
     return conn
 
 def init_database():
@@ -96,6 +277,7 @@ def init_database():
                 module['order_index'],
                 datetime.now().isoformat()
             ))
+        bump_version(cursor, MODULES)
         
         conn.commit()
     
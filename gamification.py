@@ -0,0 +1,481 @@
+"""Points ledger, leaderboard and write-behind award queue"""
+import atexit
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from database import get_pool
+
+# Write-behind batching: flush every FLUSH_INTERVAL_MS or MAX_BATCH_EVENTS
+FLUSH_INTERVAL_MS = 200
+MAX_BATCH_EVENTS = 100
+
+# Deduplicated event keys remembered in memory before falling back to the DB
+SEEN_EVENTS_CACHE_SIZE = 50000
+
+# Window for events that count once, ever
+EVER = 'ever'
+
+def record_points(cursor, user_id, points, reason):
+    """Append a ledger entry and update the user's balance.
+
+    Runs on the caller's cursor so both writes land in the caller's
+    transaction; returns nothing, the balance is read back by whoever needs it.
+    """
+    created_date = datetime.now().isoformat()
+
+    cursor.execute("""
+        INSERT INTO points_ledger (user_id, delta, reason, created_date)
+        VALUES (?, ?, ?, ?)
+    """, (user_id, points, reason, created_date))
+
+    cursor.execute("""
+        INSERT INTO point_balances (user_id, points, updated_date)
+        VALUES (?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE SET
+            points = point_balances.points + excluded.points,
+            updated_date = excluded.updated_date
+    """, (user_id, points, created_date))
+
+def apply_points(cursor, user_id, points, reason):
+    """Write a points award: ledger, balance and achievement row"""
+    record_points(cursor, user_id, points, reason)
+    cursor.execute("""
+        INSERT INTO user_achievements (user_id, achievement_type, achievement_name, points_earned, earned_date)
+        VALUES (?, ?, ?, ?, ?)
+    """, (user_id, "points", reason, points, datetime.now().isoformat()))
+
+def apply_badge(cursor, user_id, badge_name):
+    """Write a badge award; a badge the user already has is a no-op"""
+    earned_date = datetime.now().isoformat()
+
+    cursor.execute("""
+        INSERT OR IGNORE INTO user_badges (user_id, badge, earned_date)
+        VALUES (?, ?, ?)
+    """, (user_id, badge_name, earned_date))
+
+    if cursor.rowcount == 1:
+        cursor.execute("""
+            INSERT INTO user_achievements (user_id, achievement_type, achievement_name, points_earned, earned_date)
+            VALUES (?, ?, ?, ?, ?)
+        """, (user_id, "badge", badge_name, 0, earned_date))
+
+def claim_event(cursor, user_id, event_type, object_id, window):
+    """Record an event key; True only the first time it is claimed"""
+    cursor.execute("""
+        INSERT OR IGNORE INTO gamification_events (user_id, event_type, object_id, event_window, created_date)
+        VALUES (?, ?, ?, ?, ?)
+    """, (user_id, event_type, object_id, window, datetime.now().isoformat()))
+    return cursor.rowcount == 1
+
+def apply_event(cursor, event):
+    """Write one queued (kind, user_id, value, reason) event"""
+    kind, user_id, value, reason = event
+    if kind == 'points':
+        apply_points(cursor, user_id, value, reason)
+    elif kind == 'badge':
+        apply_badge(cursor, user_id, value)
+    else:
+        # 'once': the awards only land if this key hasn't been claimed yet
+        event_type, object_id, window, points, badge = value
+        if claim_event(cursor, user_id, event_type, object_id, window):
+            if points:
+                apply_points(cursor, user_id, points, reason)
+            if badge:
+                apply_badge(cursor, user_id, badge)
+
+def event_key(event):
+    """(user_id, event_type, object_id, window) of a 'once' event, else None"""
+    kind, user_id, value, _ = event
+    if kind != 'once':
+        return None
+    return (user_id, *value[:3])
+
+def event_awards(event):
+    """(points, badge or None) an event adds to the pending overlay"""
+    kind, _, value, _ = event
+    if kind == 'points':
+        return value, None
+    if kind == 'badge':
+        return 0, value
+    return value[3], value[4]
+
+class SeenEvents:
+    """Bounded LRU set of event keys already claimed by this process.
+
+    Only keys whose claim is committed are added, so a hit is a certain
+    duplicate and costs no query; a miss (evicted, or claimed by another
+    process) falls back to the gamification_events primary key.
+    """
+
+    def __init__(self, max_keys=SEEN_EVENTS_CACHE_SIZE):
+        self.max_keys = max_keys
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                return True
+            return False
+
+    def add(self, key):
+        with self._lock:
+            self._keys[key] = True
+            self._keys.move_to_end(key)
+            if len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+
+class GamificationQueue:
+    """Write-behind queue for points and badge awards.
+
+    Awards are queued on the render thread and a background writer applies
+    them in one transaction per batch, every FLUSH_INTERVAL_MS or as soon
+    as MAX_BATCH_EVENTS are waiting. Until a batch commits, its awards are
+    kept in a per-user overlay so the awarding user sees them immediately.
+    The queue is drained at interpreter exit; awards made after that are
+    written directly.
+    """
+
+    def __init__(self, flush_interval_ms=FLUSH_INTERVAL_MS, max_batch=MAX_BATCH_EVENTS):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self._events = []
+        self._in_flight = 0
+        self._pending_points = {}
+        self._pending_badges = {}
+        self._commits = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._flush_requested = False
+        self._seen = SeenEvents()
+        self._claiming = set()
+
+    def award_points(self, user_id, points, reason):
+        self._put(('points', user_id, points, reason))
+
+    def award_badge(self, user_id, badge_name):
+        self._put(('badge', user_id, badge_name, None))
+
+    def award_once(self, user_id, event_type, object_id, points=0, reason=None, badge=None, window=EVER):
+        """Award points/badge the first time (user, event, object, window) happens.
+
+        Returns False for a repeat. Repeats seen by this process cost nothing;
+        otherwise one primary-key lookup decides, and the writer's INSERT OR
+        IGNORE settles races with other processes. A key is remembered only
+        once its claim commits, so a failed write doesn't suppress the award.
+        """
+        object_id = str(object_id)
+        key = (user_id, event_type, object_id, window)
+        if key in self._seen:
+            return False
+        with self._cond:
+            if key in self._claiming:
+                return False
+
+        conn = get_pool().acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT 1 FROM gamification_events
+                WHERE user_id = ? AND event_type = ? AND object_id = ? AND event_window = ?
+            """, (user_id, event_type, object_id, window))
+            claimed = cursor.fetchone() is not None
+        finally:
+            conn.close()
+
+        if claimed:
+            self._seen.add(key)
+            return False
+
+        return self._put(('once', user_id, (event_type, object_id, window, points, badge), reason))
+
+    def _put(self, event):
+        """Queue an event (written directly once the queue is closed); False if it is already queued"""
+        key = event_key(event)
+
+        with self._cond:
+            if key is not None:
+                if key in self._claiming:
+                    return False
+                self._claiming.add(key)
+
+            closed = self._closed
+            if not closed:
+                self._enqueue(event)
+
+        if closed:
+            self._write_direct(event)
+        return True
+
+    def _enqueue(self, event):
+        """Queue an event and add it to the overlay (caller holds the lock)"""
+        user_id = event[1]
+        points, badge = event_awards(event)
+        if points:
+            self._pending_points[user_id] = self._pending_points.get(user_id, 0) + points
+        if badge:
+            self._pending_badges.setdefault(user_id, []).append(badge)
+
+        self._events.append(event)
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="gamification-writer", daemon=True)
+            self._thread.start()
+
+        self._cond.notify_all()
+
+    def _write_direct(self, event):
+        """Write one event in its own transaction, bypassing the queue"""
+        written = False
+        try:
+            with get_pool().transaction() as conn:
+                apply_event(conn.cursor(), event)
+            written = True
+        except Exception as e:
+            print(f"Error writing gamification event {event}: {e}")
+
+        with self._cond:
+            self._settle_claims([event], written)
+
+    def _settle_claims(self, events, written):
+        """Release queued 'once' keys, remembering them if their claim committed (caller holds the lock)"""
+        for event in events:
+            key = event_key(event)
+            if key is not None:
+                self._claiming.discard(key)
+                if written:
+                    self._seen.add(key)
+
+    def _forget(self, batch, written=True):
+        """Drop written (or failed) events from the overlay (caller holds the lock)"""
+        self._commits += 1
+        self._settle_claims(batch, written)
+        for event in batch:
+            user_id = event[1]
+            points, badge = event_awards(event)
+            if points:
+                remaining = self._pending_points.get(user_id, 0) - points
+                if remaining:
+                    self._pending_points[user_id] = remaining
+                else:
+                    self._pending_points.pop(user_id, None)
+            if badge:
+                badges = self._pending_badges.get(user_id, [])
+                if badge in badges:
+                    badges.remove(badge)
+                if not badges:
+                    self._pending_badges.pop(user_id, None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._events and not self._closed:
+                    self._cond.wait()
+
+                # Give the batch one flush interval to fill up
+                deadline = time.monotonic() + self.flush_interval
+                while not (self._closed or self._flush_requested) and len(self._events) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch, self._events = self._events[:self.max_batch], self._events[self.max_batch:]
+                if not self._events:
+                    self._flush_requested = False
+                if not batch:
+                    return
+                self._in_flight = len(batch)
+
+            self._write(batch)
+
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _commit(self, events):
+        """Apply events in one transaction; the commit and the overlay update happen together"""
+        conn = get_pool().acquire()
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            for event in events:
+                apply_event(cursor, event)
+
+            with self._cond:
+                conn.commit()
+                self._forget(events)
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _write(self, batch):
+        try:
+            self._commit(batch)
+            return
+        except Exception as e:
+            print(f"Error writing gamification batch, retrying one by one: {e}")
+
+        # Isolate a bad event instead of losing the whole batch
+        for event in batch:
+            try:
+                self._commit([event])
+            except Exception as e:
+                print(f"Error writing gamification event {event}: {e}")
+                with self._cond:
+                    self._forget([event], written=False)
+
+    def read_with_pending(self, user_id, read, attempts=3):
+        """Call read() and return (result, pending points, pending badges).
+
+        The overlay is copied under the writer lock and read() runs without
+        it, so readers don't queue behind each other or stall the writer. If
+        a batch committed in the meantime the read is retried (the last try
+        holds the lock), so nothing is missed or counted twice.
+        """
+        for _ in range(attempts - 1):
+            with self._cond:
+                commits = self._commits
+                pending = self._pending_points.get(user_id, 0), list(self._pending_badges.get(user_id, ()))
+
+            result = read()
+
+            with self._cond:
+                if self._commits == commits:
+                    return (result, *pending)
+
+        with self._cond:
+            return (
+                read(),
+                self._pending_points.get(user_id, 0),
+                list(self._pending_badges.get(user_id, ()))
+            )
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is committed"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._events or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=10.0):
+        """Stop accepting awards and drain the queue"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout)
+
+class Leaderboard:
+    """Learner point balances indexed for rank queries.
+
+    One (-balance, user_id) entry per ranked user is kept in a sorted list,
+    so the top N is a slice and a rank is one bisect, O(log U) for U users.
+    Memory grows with the number of users, not with the size of the
+    balances. Users tied on a balance share a rank and are listed by user
+    id. Negative balances are ranked as zero. The board catches up from the
+    ledger: every refresh() only reads ledger rows newer than the last one
+    it saw, which also picks up points awarded by other processes.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._points = {}
+        self._total = 0
+        self._last_ledger_id = None
+        self._lock = threading.Lock()
+
+    def _set(self, user_id, points):
+        self._remove(user_id)
+
+        bisect.insort(self._entries, (-max(points, 0), user_id))
+        self._points[user_id] = points
+        self._total += points
+
+    def _remove(self, user_id):
+        old = self._points.pop(user_id, None)
+        if old is not None:
+            del self._entries[bisect.bisect_left(self._entries, (-max(old, 0), user_id))]
+            self._total -= old
+
+    def refresh(self, conn):
+        """Apply balances changed since the last refresh (full load the first time)"""
+        with self._lock:
+            cursor = conn.cursor()
+
+            if self._last_ledger_id is None:
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM points_ledger")
+                last_id = cursor.fetchone()[0]
+                cursor.execute("""
+                    SELECT b.user_id, b.points, u.role
+                    FROM point_balances b
+                    JOIN users u ON u.id = b.user_id
+                """)
+            else:
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM points_ledger")
+                last_id = cursor.fetchone()[0]
+                if last_id == self._last_ledger_id:
+                    return
+                cursor.execute("""
+                    SELECT b.user_id, b.points, u.role
+                    FROM point_balances b
+                    JOIN users u ON u.id = b.user_id
+                    WHERE b.user_id IN (SELECT user_id FROM points_ledger WHERE id > ? AND id <= ?)
+                """, (self._last_ledger_id, last_id))
+
+            rows = cursor.fetchall()
+            if self._last_ledger_id is None:
+                # One sort instead of an insertion per user
+                self._points = {user_id: points for user_id, points, role in rows if role != 'admin'}
+                self._entries = sorted((-max(points, 0), user_id) for user_id, points in self._points.items())
+                self._total = sum(self._points.values())
+            else:
+                for user_id, points, role in rows:
+                    if role == 'admin':
+                        self._remove(user_id)
+                    else:
+                        self._set(user_id, points)
+
+            self._last_ledger_id = last_id
+
+    def top(self, limit=10):
+        """[(user_id, points)] for the highest balances"""
+        with self._lock:
+            return [(user_id, self._points[user_id]) for _, user_id in self._entries[:limit]]
+
+    def rank(self, user_id):
+        """1-based rank (ties share a rank), or None if the user isn't ranked"""
+        with self._lock:
+            points = self._points.get(user_id)
+            if points is None:
+                return None
+            # (-balance,) sorts before every entry at that balance
+            return bisect.bisect_left(self._entries, (-max(points, 0),)) + 1
+
+    def size(self):
+        with self._lock:
+            return len(self._points)
+
+    def total_points(self):
+        with self._lock:
+            return self._total
+
+leaderboard = Leaderboard()
+gamification_queue = GamificationQueue()
+atexit.register(gamification_queue.close)
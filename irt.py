@@ -0,0 +1,305 @@
+"""Adaptive testing with a two-parameter logistic (2PL) IRT model.
+
+An item with discrimination a and difficulty b is answered correctly with
+probability 1 / (1 + exp(-a (theta - b))) by a learner of ability theta.
+Item parameters are calibrated offline from the quiz attempt log
+(``python irt.py``) and loaded per module into an ItemIndex: numpy arrays
+of question ids, a and b.  Choosing the next question is a single
+vectorised Fisher-information argmax, even for banks of tens of thousands
+of questions.
+
+An AdaptiveTest re-estimates ability after every answer (EAP on a fixed
+grid with a standard normal prior) and stops as soon as the confidence
+interval around the estimate lies wholly above or below the cut score: the
+ability whose expected score on the whole bank is the passing percentage.
+"""
+import sys
+from datetime import datetime
+import numpy as np
+from cache import bump_version, read_version
+from quiz_engine import ModuleQuizCache, quiz_version
+
+PASSING_SCORE = 0.70
+
+# Stop once the CI at this z clears the cut score, within these item limits
+CONFIDENCE_Z = 1.96
+MIN_ITEMS = 5
+MAX_ITEMS = 30
+
+# Smallest bank the adaptive mode is offered for
+MIN_BANK_SIZE = 10
+
+# Ability grid for EAP estimates and the cut score
+GRID = np.linspace(-4.0, 4.0, 81)
+LOG_PRIOR = -GRID ** 2 / 2
+
+# Calibration: responses an item needs before it gets fitted parameters,
+# the ridge pulling estimates towards a=1, b=0, and the allowed slope range
+MIN_RESPONSES = 30
+RIDGE = 1.0
+MIN_DISCRIMINATION = 0.2
+MAX_DISCRIMINATION = 4.0
+
+# Starting difficulty of questions that haven't been calibrated yet
+DEFAULT_DIFFICULTY = {'Beginner': -1.0, 'Intermediate': 0.0, 'Advanced': 1.0}
+
+def irt_version_name(module_id):
+    """cache_versions row bumped whenever a module is recalibrated"""
+    return f"irt:{module_id}"
+
+def item_version(cursor, module_id):
+    return (quiz_version(cursor, module_id), read_version(cursor, irt_version_name(module_id)))
+
+def probability(theta, a, b):
+    return 1.0 / (1.0 + np.exp(-a * (theta - b)))
+
+def information(theta, a, b):
+    """Fisher information of each item at ability theta"""
+    p = probability(theta, a, b)
+    return a * a * p * (1.0 - p)
+
+def expected_score(theta, a, b):
+    """Expected fraction correct over all items at ability theta"""
+    return float(probability(theta, a, b).mean()) if len(a) else 0.0
+
+def cut_score(a, b, passing=PASSING_SCORE):
+    """Ability whose expected score over all items equals the passing fraction"""
+    if not len(a):
+        return 0.0
+    expected = np.array([expected_score(theta, a, b) for theta in GRID])
+    return float(np.interp(passing, expected, GRID))
+
+def estimate_ability(a, b, responses):
+    """EAP ability estimate and posterior SD from the items answered so far"""
+    log_posterior = LOG_PRIOR.copy()
+
+    if len(responses):
+        p = probability(GRID[:, None], a[None, :], b[None, :])
+        log_posterior += np.where(responses, np.log(p), np.log1p(-p)).sum(axis=1)
+
+    weights = np.exp(log_posterior - log_posterior.max())
+    weights /= weights.sum()
+
+    theta = float((weights * GRID).sum())
+    return theta, float(np.sqrt((weights * (GRID - theta) ** 2).sum()))
+
+class ItemIndex:
+    """Read-only item parameters of one module, aligned by position"""
+    __slots__ = ('module_id', 'version', 'ids', 'a', 'b', 'cut')
+
+    def __init__(self, module_id, version, ids, a, b):
+        for values in (ids, a, b):
+            values.flags.writeable = False
+        self.module_id = module_id
+        self.version = version
+        self.ids = ids
+        self.a = a
+        self.b = b
+        self.cut = cut_score(a, b)
+
+    def __len__(self):
+        return len(self.ids)
+
+def load_item_index(conn, module_id, version):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT q.id, q.difficulty, p.discrimination, p.difficulty
+        FROM quizzes q
+        LEFT JOIN item_parameters p ON p.question_id = q.id
+        WHERE q.module_id = ?
+        ORDER BY q.id
+    """, (module_id,))
+    rows = cursor.fetchall()
+
+    return ItemIndex(
+        module_id,
+        version,
+        np.array([row[0] for row in rows], dtype=np.int64),
+        np.array([1.0 if row[2] is None else row[2] for row in rows]),
+        np.array([DEFAULT_DIFFICULTY.get(row[1], 0.0) if row[3] is None else row[3] for row in rows])
+    )
+
+class AdaptiveTest:
+    """One learner's adaptive attempt (small; kept in session state).
+
+    current is the position of the question being asked; record() grades it
+    and picks the next one, so reruns in between don't change the question.
+    """
+
+    def __init__(self, index, title=None, min_items=MIN_ITEMS, max_items=MAX_ITEMS):
+        self.index = index
+        self.title = title
+        self.min_items = min_items
+        self.max_items = min(max_items, len(index))
+        self.positions = []
+        self.responses = []
+        self.retired = []
+        self.theta, self.se = estimate_ability(index.a[:0], index.b[:0], [])
+        self.current = self._select()
+
+    @property
+    def module_id(self):
+        return self.index.module_id
+
+    def current_id(self):
+        return int(self.index.ids[self.current])
+
+    def _select(self):
+        """Unasked item with the most information at the current estimate"""
+        info = information(self.theta, self.index.a, self.index.b)
+        info[self.positions] = -1.0
+        info[self.retired] = -1.0
+        return int(np.argmax(info))
+
+    def record(self, correct):
+        self.positions.append(self.current)
+        self.responses.append(bool(correct))
+
+        asked = self.positions
+        self.theta, self.se = estimate_ability(self.index.a[asked], self.index.b[asked], np.array(self.responses))
+
+        self.current = None if self.finished() else self._select()
+
+    def retire(self):
+        """Drop the current item unasked (its question is gone) and pick another"""
+        self.retired.append(self.current)
+        self.max_items = min(self.max_items, len(self.index) - len(self.retired))
+
+        self.current = None if self.finished() else self._select()
+
+    def decision(self):
+        """'pass' or 'fail' once the confidence interval clears the cut score"""
+        if self.theta - CONFIDENCE_Z * self.se > self.index.cut:
+            return 'pass'
+        if self.theta + CONFIDENCE_Z * self.se < self.index.cut:
+            return 'fail'
+        return None
+
+    def finished(self):
+        asked = len(self.positions)
+        return asked >= self.max_items or (asked >= self.min_items and self.decision() is not None)
+
+    def passed(self):
+        return self.theta >= self.index.cut
+
+    def expected_score(self):
+        """Estimated percentage the learner would score on the whole bank"""
+        return expected_score(self.theta, self.index.a, self.index.b) * 100
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def eap_abilities(person, item, correct, a, b, n_persons):
+    """EAP ability of every respondent given item parameters"""
+    log_posterior = np.tile(LOG_PRIOR[:, None], (1, n_persons))
+
+    for g, theta in enumerate(GRID):
+        p = probability(theta, a[item], b[item])
+        log_posterior[g] += np.bincount(person, np.where(correct, np.log(p), np.log1p(-p)), n_persons)
+
+    weights = np.exp(log_posterior - log_posterior.max(axis=0))
+    return (weights * GRID[:, None]).sum(axis=0) / weights.sum(axis=0)
+
+def calibrate(attempt_ids, question_ids, correct, rounds=3, iterations=20):
+    """Fit 2PL parameters from (attempt, question, correct) response triples.
+
+    Alternates EAP abilities with Newton steps on every item at once
+    (slope/intercept form, ridge-regularised). Returns question ids and their
+    discrimination, difficulty and response counts.
+    """
+    _, person = np.unique(np.asarray(attempt_ids), return_inverse=True)
+    items, item = np.unique(np.asarray(question_ids), return_inverse=True)
+    y = np.asarray(correct, dtype=float)
+    n_persons, n_items = person.max() + 1, len(items)
+
+    counts = np.bincount(item, minlength=n_items)
+
+    # Start from logits of the proportions correct
+    answered = np.bincount(person, minlength=n_persons)
+    theta = np.log((np.bincount(person, y, n_persons) + 0.5) / (answered - np.bincount(person, y, n_persons) + 0.5))
+    theta = (theta - theta.mean()) / (theta.std() or 1.0)
+
+    item_correct = np.bincount(item, y, n_items)
+    slope = np.ones(n_items)
+    intercept = np.log((item_correct + 0.5) / (counts - item_correct + 0.5))
+
+    for _ in range(rounds):
+        t = theta[person]
+
+        for _ in range(iterations):
+            p = sigmoid(slope[item] * t + intercept[item])
+            w = p * (1.0 - p)
+            r = y - p
+
+            g_s = np.bincount(item, r * t, n_items) - RIDGE * (slope - 1.0)
+            g_c = np.bincount(item, r, n_items) - RIDGE * intercept
+            h_ss = np.bincount(item, w * t * t, n_items) + RIDGE
+            h_sc = np.bincount(item, w * t, n_items)
+            h_cc = np.bincount(item, w, n_items) + RIDGE
+
+            det = h_ss * h_cc - h_sc * h_sc
+            slope = np.clip(slope + (h_cc * g_s - h_sc * g_c) / det, MIN_DISCRIMINATION, MAX_DISCRIMINATION)
+            intercept = intercept + (h_ss * g_c - h_sc * g_s) / det
+
+        theta = eap_abilities(person, item, y.astype(bool), slope, -intercept / slope, n_persons)
+
+    return items, slope, -intercept / slope, counts
+
+def calibrate_module(conn, module_id, min_responses=MIN_RESPONSES):
+    """Recalibrate one module from its completed attempts; returns items fitted"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT a.attempt_id, a.question_id, a.is_correct
+        FROM quiz_attempt_answers a
+        JOIN quiz_attempts t ON t.id = a.attempt_id
+        JOIN quizzes q ON q.id = a.question_id
+        WHERE t.module_id = ? AND t.status = 'completed' AND q.module_id = t.module_id
+    """, (module_id,))
+    rows = cursor.fetchall()
+
+    if not rows:
+        return 0
+
+    attempt_ids, question_ids, correct = zip(*rows)
+    items, a, b, counts = calibrate(attempt_ids, question_ids, correct)
+
+    now = datetime.now().isoformat()
+    fitted = [
+        (int(question_id), module_id, float(a_i), float(b_i), int(n), now)
+        for question_id, a_i, b_i, n in zip(items, a, b, counts)
+        if n >= min_responses
+    ]
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.executemany("""
+            INSERT INTO item_parameters (question_id, module_id, discrimination, difficulty, responses, calibrated_date)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (question_id) DO UPDATE SET
+                discrimination = excluded.discrimination,
+                difficulty = excluded.difficulty,
+                responses = excluded.responses,
+                calibrated_date = excluded.calibrated_date
+        """, fitted)
+        bump_version(cursor, irt_version_name(module_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return len(fitted)
+
+item_cache = ModuleQuizCache(load_item_index, version=item_version)
+
+if __name__ == "__main__":
+    import sqlite3
+
+    conn = sqlite3.connect(sys.argv[1] if len(sys.argv) > 1 else "realestate_guru.db")
+    module_ids = [int(arg) for arg in sys.argv[2:]] or [
+        row[0] for row in conn.execute("SELECT DISTINCT module_id FROM quiz_attempts WHERE status = 'completed'")
+    ]
+
+    for module_id in module_ids:
+        print(f"Module {module_id}: calibrated {calibrate_module(conn, module_id)} items")
+
+    conn.close()
@@ -0,0 +1,158 @@
+"""Classical item analysis of stored quiz answers.
+
+Answers are streamed from quiz_attempt_answers in chunks with
+pandas.read_sql_query and folded into per-question sufficient statistics
+(counts and sums), so memory stays proportional to the number of questions
+rather than the number of answer rows.  From those sums we get, per module:
+
+- p-value: share of responses that were correct
+- point-biserial: correlation between answering the question correctly and
+  the attempt's overall score
+- distractor rates: share of responses choosing each option
+- KR-20 reliability over attempts that took the full, unsampled quiz
+
+Results are cached per module and keyed on the quiz version plus an answers
+version that complete_quiz_attempt bumps, so the report is only recomputed
+after new attempts come in.
+"""
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from cache import read_version
+from quiz_engine import ModuleQuizCache, quiz_version, OPTION_LETTERS
+
+# Answer rows per chunk read from SQLite
+CHUNK_ROWS = 100000
+
+# Thresholds for flagging questions in the report
+TOO_EASY = 0.90
+TOO_HARD = 0.20
+LOW_DISCRIMINATION = 0.20
+
+ItemAnalysis = namedtuple('ItemAnalysis', 'module_id version attempts kr20 items')
+
+SUMS = ['responses', 'correct', 'total', 'total_sq', 'correct_total', 'full_responses', 'full_correct']
+
+def answers_version_name(module_id):
+    """cache_versions row bumped whenever an attempt on the module completes"""
+    return f"answers:{module_id}"
+
+def analysis_version(cursor, module_id):
+    return (quiz_version(cursor, module_id), read_version(cursor, answers_version_name(module_id)))
+
+def full_form_length(cursor, module_id):
+    """Length of the full quiz, from linear unsampled attempts"""
+    cursor.execute("""
+        SELECT MAX(total_questions) FROM quiz_attempts
+        WHERE module_id = ? AND status = 'completed' AND mode = 'linear' AND sample_seed IS NULL
+    """, (module_id,))
+    return cursor.fetchone()[0] or 0
+
+def read_answer_sums(conn, module_id, form_length, chunk_rows=CHUNK_ROWS):
+    """Per-question sums and per-(question, option) counts, accumulated chunk by chunk"""
+    sums = pd.DataFrame(columns=SUMS, dtype=float)
+    options = pd.Series(dtype=float)
+
+    chunks = pd.read_sql_query("""
+        SELECT a.question_id, COALESCE(a.selected_answer, '') AS selected_answer, a.is_correct,
+               CAST(t.score AS REAL) / t.total_questions AS total,
+               t.mode = 'linear' AND t.sample_seed IS NULL AND t.total_questions = ? AS full_form
+        FROM quiz_attempt_answers a
+        JOIN quiz_attempts t ON t.id = a.attempt_id
+        WHERE t.module_id = ? AND t.status = 'completed' AND t.total_questions > 0
+    """, conn, params=(form_length, module_id), chunksize=chunk_rows)
+
+    for chunk in chunks:
+        correct = chunk['is_correct'].to_numpy(dtype=float)
+        total = chunk['total'].to_numpy(dtype=float)
+        full = chunk['full_form'].to_numpy(dtype=float)
+
+        part = pd.DataFrame({
+            'question_id': chunk['question_id'],
+            'responses': 1.0,
+            'correct': correct,
+            'total': total,
+            'total_sq': total * total,
+            'correct_total': correct * total,
+            'full_responses': full,
+            'full_correct': correct * full,
+        }).groupby('question_id').sum()
+
+        counts = chunk.groupby(['question_id', 'selected_answer']).size().astype(float)
+
+        sums = part if sums.empty else sums.add(part, fill_value=0)
+        options = counts if options.empty else options.add(counts, fill_value=0)
+
+    return sums, options
+
+def point_biserial(sums):
+    """Pearson correlation of item correctness (0/1) with attempt score, from sums"""
+    n, x, t = sums['responses'], sums['correct'], sums['total']
+    numerator = n * sums['correct_total'] - x * t
+    denominator = np.sqrt((n * x - x * x) * (n * sums['total_sq'] - t * t))
+    return (numerator / denominator.replace(0, np.nan)).astype(float)
+
+def kr20(cursor, module_id, form_length, sums):
+    """KR-20 over full-form attempts (None when it isn't defined)"""
+    if form_length < 2:
+        return None
+
+    cursor.execute("""
+        SELECT COUNT(*), SUM(score), SUM(score * score) FROM quiz_attempts
+        WHERE module_id = ? AND status = 'completed' AND mode = 'linear'
+          AND sample_seed IS NULL AND total_questions = ?
+    """, (module_id, form_length))
+    n, score_sum, score_sq_sum = cursor.fetchone()
+    if not n or n < 2:
+        return None
+
+    variance = score_sq_sum / n - (score_sum / n) ** 2
+    full = sums[sums['full_responses'] > 0]
+    p = full['full_correct'] / full['full_responses']
+    if variance <= 0 or full.empty:
+        return None
+
+    return float(form_length / (form_length - 1) * (1 - (p * (1 - p)).sum() / variance))
+
+def analyze_module(conn, module_id, version, chunk_rows=CHUNK_ROWS):
+    cursor = conn.cursor()
+    form_length = full_form_length(cursor, module_id)
+    sums, options = read_answer_sums(conn, module_id, form_length, chunk_rows)
+
+    cursor.execute("SELECT id, question FROM quizzes WHERE module_id = ? ORDER BY id", (module_id,))
+    items = pd.DataFrame(cursor.fetchall(), columns=['question_id', 'question']).set_index('question_id')
+    items = items.join(sums, how='left').fillna({column: 0 for column in SUMS})
+
+    responses = items['responses'].replace(0, np.nan)
+    items['p_value'] = items['correct'] / responses
+    items['point_biserial'] = point_biserial(items)
+
+    rates = options.unstack(fill_value=0) if not options.empty else pd.DataFrame()
+    rates = rates.reindex(columns=list(OPTION_LETTERS), fill_value=0)
+    for letter in OPTION_LETTERS:
+        items[f'rate_{letter}'] = rates[letter].reindex(items.index).fillna(0) / responses
+
+    cursor.execute("""
+        SELECT COUNT(*) FROM quiz_attempts WHERE module_id = ? AND status = 'completed'
+    """, (module_id,))
+    attempts = cursor.fetchone()[0]
+
+    report = items[['question', 'responses', 'p_value', 'point_biserial'] +
+                   [f'rate_{letter}' for letter in OPTION_LETTERS]].reset_index()
+    report['responses'] = report['responses'].astype(int)
+    report['flag'] = [flag(p, r) for p, r in zip(report['p_value'], report['point_biserial'])]
+
+    return ItemAnalysis(module_id, version, attempts, kr20(cursor, module_id, form_length, items), report)
+
+def flag(p_value, discrimination):
+    if pd.isna(p_value):
+        return "No responses"
+    if p_value > TOO_EASY:
+        return "Too easy"
+    if p_value < TOO_HARD:
+        return "Too hard"
+    if not pd.isna(discrimination) and discrimination < LOW_DISCRIMINATION:
+        return "Low discrimination"
+    return ""
+
+analysis_cache = ModuleQuizCache(analyze_module, version=analysis_version)
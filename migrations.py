@@ -0,0 +1,886 @@
+"""Ordered, numbered schema migrations.
+
+Every migration runs in its own IMMEDIATE transaction together with the
+schema_version row that records it, so a half-applied migration is never
+visible and re-running the runner is a no-op.  Migrations only ever add
+tables or append columns (ALTER TABLE ... ADD COLUMN does not rewrite the
+table in SQLite).
+
+Indexes are declared separately and built after the schema transaction
+has committed, one transaction per index.  CREATE INDEX holds the write
+lock for the whole build, so writers wait while each index is built (in WAL
+mode readers keep going); splitting the builds only bounds that wait to one
+index at a time, and an interrupted build is simply retried on the next run.
+
+Data derived by application code (rendered module sections, question
+signatures) is not filled in by the versioned migrations, whose behaviour
+must not change once released.  backfill() runs after them instead: each
+step only touches rows that still need it, using the current code.
+"""
+import re
+from datetime import datetime
+from content_render import store_sections
+from question_dedup import index_questions
+
+class Migration:
+    def __init__(self, version, name, apply=None, indexes=(), drops=()):
+        self.version = version
+        self.name = name
+        self.apply = apply
+        self.indexes = list(indexes)
+        self.drops = list(drops)
+
+class Index:
+    def __init__(self, name, table, columns, unique=False, where=None):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.unique = unique
+        self.where = where
+
+    def create_sql(self):
+        sql = f"CREATE {'UNIQUE ' if self.unique else ''}INDEX IF NOT EXISTS {self.name} ON {self.table} ({self.columns})"
+        if self.where:
+            sql += f" WHERE {self.where}"
+        return sql
+
+def table_columns(cursor, table):
+    """Column names of a table (empty if the table doesn't exist)"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [col[1] for col in cursor.fetchall()]
+
+def add_missing_columns(cursor, table, columns):
+    """Append columns that an older schema didn't have"""
+    existing = table_columns(cursor, table)
+
+    for name, declaration in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+
+# Migration 1: the union of the app.py and models.py schemas
+def create_baseline_schema(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL DEFAULT 'student',
+            created_date TEXT NOT NULL,
+            last_login TEXT,
+            active INTEGER DEFAULT 1,
+            points INTEGER DEFAULT 0,
+            badges TEXT DEFAULT '[]',
+            streak_days INTEGER DEFAULT 0
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS modules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            difficulty TEXT NOT NULL,
+            category TEXT NOT NULL,
+            content TEXT,
+            youtube_url TEXT,
+            order_index INTEGER DEFAULT 0,
+            created_date TEXT NOT NULL,
+            updated_date TEXT,
+            active INTEGER DEFAULT 1
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lessons (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            module_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            content TEXT,
+            video_url TEXT,
+            order_index INTEGER DEFAULT 0,
+            created_date TEXT NOT NULL,
+            active INTEGER DEFAULT 1,
+            FOREIGN KEY (module_id) REFERENCES modules (id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quizzes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            module_id INTEGER NOT NULL,
+            question TEXT NOT NULL,
+            option_a TEXT NOT NULL,
+            option_b TEXT NOT NULL,
+            option_c TEXT NOT NULL,
+            option_d TEXT NOT NULL,
+            correct_answer TEXT NOT NULL,
+            explanation TEXT,
+            created_date TEXT NOT NULL,
+            FOREIGN KEY (module_id) REFERENCES modules (id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_progress (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            module_id INTEGER NOT NULL,
+            lesson_id INTEGER,
+            progress_percentage REAL DEFAULT 0,
+            completed INTEGER DEFAULT 0,
+            started_date TEXT,
+            completed_date TEXT,
+            quiz_score REAL DEFAULT 0,
+            quiz_attempts INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (module_id) REFERENCES modules (id),
+            FOREIGN KEY (lesson_id) REFERENCES lessons (id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS assessments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            module_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            questions TEXT NOT NULL,
+            passing_score INTEGER DEFAULT 70,
+            time_limit INTEGER DEFAULT 30,
+            created_date TEXT NOT NULL,
+            active INTEGER DEFAULT 1,
+            FOREIGN KEY (module_id) REFERENCES modules (id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS assessment_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            assessment_id INTEGER NOT NULL,
+            score REAL NOT NULL,
+            answers TEXT,
+            started_date TEXT NOT NULL,
+            completed_date TEXT,
+            passed INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (assessment_id) REFERENCES assessments (id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_points (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            points INTEGER DEFAULT 0,
+            badges TEXT,
+            streak_days INTEGER DEFAULT 0,
+            last_activity TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_achievements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            achievement_type TEXT NOT NULL,
+            achievement_name TEXT NOT NULL,
+            points_earned INTEGER DEFAULT 0,
+            earned_date TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS content_research (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic TEXT NOT NULL,
+            content TEXT NOT NULL,
+            sources TEXT NOT NULL,
+            created_date TEXT NOT NULL,
+            status TEXT DEFAULT 'pending'
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS video_content (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            module_id INTEGER,
+            title TEXT NOT NULL,
+            description TEXT,
+            youtube_id TEXT,
+            duration TEXT,
+            thumbnail_url TEXT,
+            created_date TEXT NOT NULL,
+            active INTEGER DEFAULT 1,
+            FOREIGN KEY (module_id) REFERENCES modules (id)
+        )
+    """)
+
+# Migration 2: bring databases created by either legacy schema up to the union
+def reconcile_legacy_columns(cursor):
+    add_missing_columns(cursor, "users", [
+        ("points", "INTEGER DEFAULT 0"),
+        ("badges", "TEXT DEFAULT '[]'"),
+        ("streak_days", "INTEGER DEFAULT 0"),
+    ])
+
+    add_missing_columns(cursor, "modules", [
+        ("youtube_url", "TEXT"),
+    ])
+
+    add_missing_columns(cursor, "user_progress", [
+        ("lesson_id", "INTEGER"),
+        ("quiz_score", "REAL DEFAULT 0"),
+        ("quiz_attempts", "INTEGER DEFAULT 0"),
+    ])
+
+# Migration 4: one user_progress row per (user, module) with best and last score
+def compact_user_progress(cursor):
+    add_missing_columns(cursor, "user_progress", [
+        ("best_score", "REAL DEFAULT 0"),
+    ])
+
+    cursor.execute("""
+        UPDATE user_progress
+        SET best_score = MAX(COALESCE(best_score, 0), COALESCE(quiz_score, 0))
+    """)
+
+    # Fold every duplicate group into its oldest row: the latest attempt's
+    # score, the best score, and one attempt per stored row
+    cursor.execute("""
+        UPDATE user_progress
+        SET quiz_score = (
+                SELECT d.quiz_score FROM user_progress d
+                WHERE d.user_id = user_progress.user_id AND d.module_id = user_progress.module_id
+                ORDER BY d.id DESC LIMIT 1
+            ),
+            (best_score, quiz_attempts, progress_percentage, completed, started_date, completed_date) = (
+                SELECT MAX(d.best_score), MAX(COUNT(*), MAX(d.quiz_attempts)), MAX(d.progress_percentage),
+                       MAX(d.completed), MIN(d.started_date), MIN(d.completed_date)
+                FROM user_progress d
+                WHERE d.user_id = user_progress.user_id AND d.module_id = user_progress.module_id
+            )
+        WHERE id IN (
+            SELECT MIN(id) FROM user_progress
+            GROUP BY user_id, module_id
+            HAVING COUNT(*) > 1
+        )
+    """)
+
+    cursor.execute("""
+        DELETE FROM user_progress
+        WHERE id NOT IN (SELECT MIN(id) FROM user_progress GROUP BY user_id, module_id)
+    """)
+
+    # Built inside the migration: the upsert depends on it, so it can't lag behind
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_user_progress_user_module
+        ON user_progress (user_id, module_id)
+    """)
+
+    for name in ("idx_user_progress_user_module", "idx_user_progress_module_score"):
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+# Migration 5: server-side quiz attempts with per-question answers
+def create_quiz_attempts(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quiz_attempts (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            module_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'in_progress',
+            score INTEGER,
+            total_questions INTEGER,
+            started_date TEXT NOT NULL,
+            completed_date TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (module_id) REFERENCES modules (id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quiz_attempt_answers (
+            attempt_id TEXT NOT NULL,
+            question_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            selected_answer TEXT,
+            is_correct INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (attempt_id, question_id),
+            FOREIGN KEY (attempt_id) REFERENCES quiz_attempts (id),
+            FOREIGN KEY (question_id) REFERENCES quizzes (id)
+        ) WITHOUT ROWID
+    """)
+
+# Migration 6: one row per earned badge instead of a JSON array on users
+def create_user_badges(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_badges (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            badge TEXT NOT NULL,
+            earned_date TEXT NOT NULL,
+            UNIQUE (user_id, badge),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+
+    # users.badges is no longer written; keep its order as insertion order
+    cursor.execute("""
+        INSERT OR IGNORE INTO user_badges (user_id, badge, earned_date)
+        SELECT u.id, b.value, u.created_date
+        FROM users u, json_each(u.badges) b
+        WHERE json_valid(u.badges) AND b.type = 'text'
+        ORDER BY u.id, b.key
+    """)
+
+# Migration 7: append-only points ledger with materialized balances
+def create_points_ledger(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS points_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            delta INTEGER NOT NULL,
+            reason TEXT NOT NULL,
+            created_date TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS point_balances (
+            user_id INTEGER PRIMARY KEY,
+            points INTEGER NOT NULL DEFAULT 0,
+            updated_date TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+
+    # users.points is no longer written; it becomes each user's opening balance
+    now = datetime.now().isoformat()
+    cursor.execute("""
+        INSERT INTO points_ledger (user_id, delta, reason, created_date)
+        SELECT id, points, 'Opening balance', ?
+        FROM users
+        WHERE COALESCE(points, 0) != 0
+        ORDER BY id
+    """, (now,))
+
+    cursor.execute("""
+        INSERT OR IGNORE INTO point_balances (user_id, points, updated_date)
+        SELECT id, COALESCE(points, 0), ?
+        FROM users
+    """, (now,))
+
+# Migration 8: one row per deduplicated gamification event
+def create_gamification_events(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS gamification_events (
+            user_id INTEGER NOT NULL,
+            event_type TEXT NOT NULL,
+            object_id TEXT NOT NULL,
+            event_window TEXT NOT NULL,
+            created_date TEXT NOT NULL,
+            PRIMARY KEY (user_id, event_type, object_id, event_window),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        ) WITHOUT ROWID
+    """)
+
+    # Videos and modules already rewarded count as claimed
+    for event_type, prefix in (('video_view', 'Watched video: '), ('module_read', 'Completed reading: ')):
+        cursor.execute("""
+            INSERT OR IGNORE INTO gamification_events (user_id, event_type, object_id, event_window, created_date)
+            SELECT a.user_id, ?, CAST(m.id AS TEXT), 'ever', MIN(a.earned_date)
+            FROM user_achievements a
+            JOIN modules m ON a.achievement_name = ? || m.title
+            GROUP BY a.user_id, m.id
+        """, (event_type, prefix))
+
+# Migration 9: version counters for the process-wide caches in cache.py
+def create_cache_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+# Migration 10: quiz version each attempt's question snapshot was taken at
+def add_attempt_quiz_version(cursor):
+    add_missing_columns(cursor, "quiz_attempts", [("quiz_version", "INTEGER")])
+
+# Migration 11: difficulty/tag strata for question sampling, and the
+# sampling parameters an attempt was drawn with
+def add_question_sampling(cursor):
+    add_missing_columns(cursor, "quizzes", [
+        ("difficulty", "TEXT"),
+        ("tag", "TEXT"),
+    ])
+    add_missing_columns(cursor, "quiz_attempts", [
+        ("sample_seed", "INTEGER"),
+        ("sample_size", "INTEGER"),
+        ("sample_strata", "TEXT"),
+    ])
+
+# Migration 12: calibrated 2PL item parameters and adaptive attempt results
+def create_item_parameters(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS item_parameters (
+            question_id INTEGER PRIMARY KEY,
+            module_id INTEGER NOT NULL,
+            discrimination REAL NOT NULL,
+            difficulty REAL NOT NULL,
+            responses INTEGER NOT NULL,
+            calibrated_date TEXT NOT NULL,
+            FOREIGN KEY (question_id) REFERENCES quizzes (id),
+            FOREIGN KEY (module_id) REFERENCES modules (id)
+        )
+    """)
+
+    add_missing_columns(cursor, "quiz_attempts", [
+        ("mode", "TEXT NOT NULL DEFAULT 'linear'"),
+        ("ability", "REAL"),
+        ("ability_se", "REAL"),
+    ])
+
+# Migration 13: timed assessment attempts carry their assessment and deadline
+def add_attempt_deadline(cursor):
+    add_missing_columns(cursor, "quiz_attempts", [
+        ("assessment_id", "INTEGER"),
+        ("deadline", "TEXT"),
+    ])
+
+# Migration 14: spaced-repetition cards for missed questions (review_queue.py)
+def create_review_cards(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS review_cards (
+            user_id INTEGER NOT NULL,
+            question_id INTEGER NOT NULL,
+            module_id INTEGER NOT NULL,
+            easiness REAL NOT NULL,
+            interval_days INTEGER NOT NULL,
+            repetitions INTEGER NOT NULL,
+            lapses INTEGER NOT NULL DEFAULT 0,
+            due_at TEXT NOT NULL,
+            last_reviewed TEXT,
+            PRIMARY KEY (user_id, question_id),
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (question_id) REFERENCES quizzes (id)
+        ) WITHOUT ROWID
+    """)
+
+# Migration 16: module bodies pre-rendered into sections (content_render.py)
+def create_module_sections(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS module_sections (
+            module_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            level INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            anchor TEXT NOT NULL,
+            body TEXT NOT NULL,
+            PRIMARY KEY (module_id, position),
+            FOREIGN KEY (module_id) REFERENCES modules (id)
+        )
+    """)
+
+    add_missing_columns(cursor, "modules", [
+        ("content_hash", "TEXT"),
+        ("toc", "TEXT"),
+    ])
+
+# Migration 17: section offsets and per-section read progress; every module
+# is marked for backfill() to re-render with offsets
+def add_section_offsets(cursor):
+    add_missing_columns(cursor, "module_sections", [
+        ("start_offset", "INTEGER NOT NULL DEFAULT 0"),
+        ("length", "INTEGER NOT NULL DEFAULT 0"),
+    ])
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS section_progress (
+            user_id INTEGER NOT NULL,
+            module_id INTEGER NOT NULL,
+            anchor TEXT NOT NULL,
+            read_date TEXT NOT NULL,
+            PRIMARY KEY (user_id, module_id, anchor),
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (module_id) REFERENCES modules (id)
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("UPDATE modules SET content_hash = NULL")
+
+    # Superseded by the covering idx_modules_metadata
+    cursor.execute("DROP INDEX IF EXISTS idx_modules_active_order")
+
+# Migration 18: external-content FTS5 indexes for search.py, kept in sync by
+# triggers. (index, source table, indexed columns, bm25 column weights)
+SEARCH_INDEXES = [
+    ("modules_fts", "modules", ("title", "description", "content"), (10.0, 4.0, 1.0)),
+    ("quizzes_fts", "quizzes", ("question", "explanation"), (4.0, 1.0)),
+    ("research_fts", "content_research", ("topic", "content"), (4.0, 1.0)),
+]
+
+def create_search_indexes(cursor):
+    for index, table, columns, weights in SEARCH_INDEXES:
+        names = ", ".join(columns)
+        new = ", ".join(f"new.{column}" for column in columns)
+        old = ", ".join(f"old.{column}" for column in columns)
+
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+                {names}, content='{table}', content_rowid='id',
+                tokenize='porter unicode61', prefix='3'
+            )
+        """)
+
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {index} (rowid, {names}) VALUES (new.id, {new});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', old.id, {old});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF {names} ON {table} BEGIN
+                INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', old.id, {old});
+                INSERT INTO {index} (rowid, {names}) VALUES (new.id, {new});
+            END
+        """)
+
+        cursor.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {index} ({index}, rank) VALUES ('rank', ?)",
+                       (f"bm25({', '.join(str(w) for w in weights)})",))
+
+# Migration 19: MinHash signatures and LSH band buckets for question_dedup.py
+# (backfill() signs the existing questions)
+def create_question_dedup(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS question_signatures (
+            question_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL,
+            FOREIGN KEY (question_id) REFERENCES quizzes (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS question_lsh (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            question_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, question_id),
+            FOREIGN KEY (question_id) REFERENCES quizzes (id)
+        ) WITHOUT ROWID
+    """)
+
+MIGRATIONS = [
+    Migration(1, "baseline schema", create_baseline_schema),
+    Migration(2, "reconcile legacy columns", reconcile_legacy_columns),
+    Migration(3, "hot path indexes", indexes=[
+        Index("idx_quizzes_module", "quizzes", "module_id"),
+        Index("idx_user_progress_user_module", "user_progress", "user_id, module_id"),
+        Index("idx_user_progress_module_score", "user_progress", "module_id, quiz_score"),
+        Index("idx_user_achievements_user_date", "user_achievements", "user_id, earned_date"),
+        Index("idx_users_role_active_created", "users", "role, active, created_date"),
+        Index("idx_modules_active_order", "modules", "active, order_index"),
+    ]),
+    Migration(4, "unique user progress", compact_user_progress,
+              indexes=[Index("idx_user_progress_module_best", "user_progress", "module_id, best_score")],
+              drops=["idx_user_progress_user_module", "idx_user_progress_module_score"]),
+    Migration(5, "quiz attempts", create_quiz_attempts, indexes=[
+        Index("idx_quiz_attempts_user_module", "quiz_attempts", "user_id, module_id, started_date"),
+    ]),
+    Migration(6, "user badges", create_user_badges),
+    Migration(7, "points ledger", create_points_ledger, indexes=[
+        Index("idx_points_ledger_user", "points_ledger", "user_id, id"),
+        Index("idx_point_balances_points", "point_balances", "points DESC, user_id"),
+    ]),
+    Migration(8, "gamification events", create_gamification_events),
+    Migration(9, "cache versions", create_cache_versions),
+    Migration(10, "attempt quiz version", add_attempt_quiz_version),
+    Migration(11, "question sampling", add_question_sampling, indexes=[
+        Index("idx_quizzes_module_strata", "quizzes", "module_id, id, difficulty, tag"),
+    ]),
+    Migration(12, "item parameters", create_item_parameters),
+    Migration(13, "timed assessments", add_attempt_deadline, indexes=[
+        Index("idx_assessments_module_active", "assessments", "module_id, active"),
+    ]),
+    Migration(14, "review cards", create_review_cards, indexes=[
+        Index("idx_review_cards_user_due", "review_cards", "user_id, due_at"),
+    ]),
+    Migration(15, "user directory", indexes=[
+        Index("idx_users_created", "users", "created_date, id"),
+        Index("idx_users_active_created", "users", "active, created_date"),
+    ]),
+    Migration(16, "module sections", create_module_sections),
+    # Metadata reads are answered from these covering indexes, so they never
+    # page through a module's content
+    Migration(17, "section offsets", add_section_offsets, indexes=[
+        Index("idx_modules_metadata", "modules",
+              "active, order_index, id, title, description, difficulty, category, youtube_url, content_hash"),
+        Index("idx_module_sections_toc", "module_sections",
+              "module_id, position, level, title, anchor, start_offset, length"),
+    ], drops=["idx_modules_active_order"]),
+    Migration(18, "search indexes", create_search_indexes),
+    Migration(19, "question dedup index", create_question_dedup),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+def ensure_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_date TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+def applied_versions(conn):
+    return {row[0] for row in conn.execute("SELECT version FROM schema_version")}
+
+def current_version(conn):
+    """Highest applied migration version (0 for a fresh database)"""
+    ensure_version_table(conn)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def apply_migration(conn, migration):
+    """Apply one migration atomically; returns False if it was already applied"""
+    conn.execute("BEGIN IMMEDIATE")
+
+    try:
+        cursor = conn.cursor()
+
+        # Another process may have applied it while we waited for the lock
+        cursor.execute("SELECT 1 FROM schema_version WHERE version = ?", (migration.version,))
+        if cursor.fetchone():
+            conn.rollback()
+            return False
+
+        if migration.apply:
+            migration.apply(cursor)
+
+        cursor.execute("""
+            INSERT INTO schema_version (version, name, applied_date)
+            VALUES (?, ?, ?)
+        """, (migration.version, migration.name, datetime.now().isoformat()))
+
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+
+def build_indexes(conn, migrations=None):
+    """Create any declared index that doesn't exist yet, one transaction each"""
+    applied = applied_versions(conn)
+    migrations = [m for m in migrations or MIGRATIONS if m.version in applied]
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    dropped = {name for migration in migrations for name in migration.drops}
+    built = []
+
+    for migration in migrations:
+        for index in migration.indexes:
+            if index.name in existing or index.name in dropped:
+                continue
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(index.create_sql())
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            built.append(index.name)
+
+    return built
+
+def backfill(conn):
+    """Fill in derived data the schema doesn't have yet, in one transaction.
+
+    Modules without a content hash (never rendered, or marked by a
+    migration) are rendered into sections, and questions without a
+    signature are signed. Returns (modules rendered, questions signed).
+    """
+    conn.execute("BEGIN IMMEDIATE")
+
+    try:
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT id, content FROM modules WHERE content_hash IS NULL")
+        modules = cursor.fetchall()
+        for module_id, content in modules:
+            store_sections(cursor, module_id, content)
+
+        signed = index_questions(cursor)
+
+        conn.commit()
+        return len(modules), signed
+    except Exception:
+        conn.rollback()
+        raise
+
+def migrate(conn):
+    """Apply all pending migrations in order, then build their indexes and backfill derived data"""
+    if conn.in_transaction:
+        conn.commit()
+
+    ensure_version_table(conn)
+    done = applied_versions(conn)
+    applied = []
+
+    for migration in MIGRATIONS:
+        if migration.version in done:
+            continue
+        if apply_migration(conn, migration):
+            applied.append(migration.version)
+
+    build_indexes(conn)
+    backfill(conn)
+
+    return applied
+
+# The app.py queries the index set exists for; check_query_plans() fails if
+# any of them stops using an index
+HOT_QUERIES = {
+    'get_available_modules': ("""
+        SELECT id, title, description, difficulty, category, youtube_url
+        FROM modules
+        WHERE active = 1
+        ORDER BY order_index
+    """, ()),
+    'get_quiz_questions': ("""
+        SELECT id, question, option_a, option_b, option_c, option_d, correct_answer, explanation
+        FROM quizzes
+        WHERE module_id = ?
+        ORDER BY id
+    """, (1,)),
+    'get_module_summaries': ("""
+        SELECT m.id, m.title, m.description, m.difficulty, m.category, m.youtube_url,
+               (SELECT COUNT(*) FROM quizzes q WHERE q.module_id = m.id), p.best_score
+        FROM modules m
+        LEFT JOIN user_progress p ON p.module_id = m.id AND p.user_id = ?
+        WHERE m.active = 1
+        ORDER BY m.order_index
+    """, (1,)),
+    'get_module_questions_page': ("""
+        SELECT id, question, option_a, option_b, option_c, option_d, correct_answer, explanation
+        FROM quizzes
+        WHERE module_id = ? AND id > ?
+        ORDER BY id
+        LIMIT ?
+    """, (1, 0, 21)),
+    'load_bank': ("""
+        SELECT id, difficulty, tag
+        FROM quizzes
+        WHERE module_id = ?
+        ORDER BY id
+    """, (1,)),
+    'due_cards': ("""
+        SELECT question_id FROM review_cards
+        WHERE user_id = ? AND due_at <= ?
+        ORDER BY due_at
+        LIMIT ?
+    """, (1, '9999', 20)),
+    'get_users_page': ("""
+        SELECT u.id, u.username, u.email, u.role, u.created_date, u.last_login, u.active,
+               (SELECT points FROM point_balances p WHERE p.user_id = u.id),
+               (SELECT COUNT(*) FROM user_badges b WHERE b.user_id = u.id)
+        FROM users u
+        WHERE (u.created_date, u.id) < (?, ?)
+        ORDER BY u.created_date DESC, u.id DESC
+        LIMIT ?
+    """, ('9999', 0, 26)),
+    'get_module_page': ("""
+        SELECT title, description, difficulty, category, youtube_url, content_hash
+        FROM modules
+        WHERE active = 1 AND id = ?
+    """, (1,)),
+    'load_toc': ("""
+        SELECT position, level, title, anchor, start_offset, length
+        FROM module_sections
+        WHERE module_id = ?
+        ORDER BY position
+    """, (1,)),
+    'create_user_progress_chart': ("""
+        SELECT m.title, COALESCE(p.best_score, 0) as score
+        FROM modules m
+        LEFT JOIN user_progress p ON m.id = p.module_id AND p.user_id = ?
+        WHERE m.active = 1
+        ORDER BY m.order_index
+    """, (1,)),
+    'admin_registrations': ("""
+        SELECT DATE(created_date) as date, COUNT(*) as registrations
+        FROM users
+        WHERE role != 'admin'
+        GROUP BY DATE(created_date)
+        ORDER BY date
+    """, ()),
+    'admin_completions': ("""
+        SELECT m.title, COUNT(p.user_id) as completions
+        FROM modules m
+        LEFT JOIN user_progress p ON m.id = p.module_id AND p.best_score >= 70
+        WHERE m.active = 1
+        GROUP BY m.id, m.title
+        ORDER BY completions DESC
+    """, ()),
+}
+
+def full_scans(conn, sql, params=()):
+    """Plan steps that read a whole table instead of searching an index.
+    
+    A scan of a covering index never touches the table rows, so it is not
+    counted as a full scan.
+    """
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [
+        row[3] for row in plan
+        if row[3].startswith("SCAN ") and "COVERING INDEX" not in row[3]
+    ]
+
+# Queries that must be answered from a covering index, never reading the
+# modules/module_sections rows that carry content. Single-module lookups by
+# id (get_module_page) use the primary key instead, which is faster than
+# seeking the metadata index and works even if that index is missing.
+METADATA_QUERIES = ('get_available_modules', 'get_module_summaries', 'load_toc', 'create_user_progress_chart')
+
+def content_reads(conn, sql, params=()):
+    """Plan steps that read modules or module_sections rows rather than a covering index"""
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [
+        row[3] for row in plan
+        if re.match(r"(SCAN|SEARCH) (modules|module_sections|m)\b", row[3]) and "COVERING INDEX" not in row[3]
+    ]
+
+def check_query_plans(conn, queries=None):
+    """Map each hot query that falls back to a full scan to its plan steps"""
+    failures = {}
+
+    for name, (sql, params) in (queries or HOT_QUERIES).items():
+        scans = full_scans(conn, sql, params)
+        if name in METADATA_QUERIES:
+            scans += content_reads(conn, sql, params)
+        if scans:
+            failures[name] = scans
+
+    return failures
+
+if __name__ == "__main__":
+    import sqlite3
+    import sys
+
+    conn = sqlite3.connect(sys.argv[1] if len(sys.argv) > 1 else "realestate_guru.db")
+    print(f"Applied migrations: {migrate(conn) or 'none pending'}")
+
+    failures = check_query_plans(conn)
+    for name, scans in failures.items():
+        print(f"FULL SCAN in {name}: {'; '.join(scans)}")
+
+    conn.close()
+    sys.exit(1 if failures else 0)
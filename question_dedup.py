@@ -0,0 +1,284 @@
+"""Near-duplicate detection for quiz questions (MinHash + LSH).
+
+A question is normalized (lowercase words of the question text followed by
+its options in sorted order, so reordered options don't matter) and cut
+into 4-byte shingles.  Its MinHash signature has NUM_PERM values, each the
+minimum of a multiply-shift hash over the shingles; the fraction of values
+two signatures share estimates the Jaccard similarity of their shingle sets.
+
+The signature is split into BANDS bands of ROWS values.  Every band is
+hashed to a bucket key and stored in question_lsh, so two questions that
+agree on any whole band are candidates: pairs at the duplicate threshold
+almost always share a band, unrelated pairs almost never do.  Checking a
+new question is one indexed lookup of its BANDS bucket keys plus a
+signature comparison against the few candidates, however large the bank.
+The whole-bank report reads the buckets that hold more than one question
+straight from question_lsh and compares only the stored signatures of
+those pairs, so it never re-signs the bank or compares every pair.
+
+Similar wording is not always the same question ("freehold" versus
+"leasehold"), so matches are shown for review rather than rejected outright.
+"""
+import re
+import threading
+from collections import namedtuple
+import numpy as np
+from quiz_engine import bank_version
+
+# Estimated Jaccard similarity at which two questions count as near-duplicates
+DUPLICATE_THRESHOLD = 0.6
+
+# Signature layout: BANDS * ROWS hash values. With 32 bands of 4 a pair at
+# similarity 0.6 shares a band 99% of the time, a pair at 0.2 about 5%.
+BANDS = 32
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+
+# Bytes per shingle (one shingle packs into a uint32)
+SHINGLE_BYTES = 4
+
+# Shingles hashed per NumPy block when signing many questions
+CHUNK_SHINGLES = 1 << 13
+
+# Neighbours each question is paired with inside one report bucket, so a
+# large group of identical questions can't produce a quadratic pair list
+MAX_BUCKET_PAIRS = 50
+
+# Fixed seed: stored signatures must be comparable across processes
+SEED = 20240601
+
+_rng = np.random.default_rng(SEED)
+HASH_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+HASH_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+BAND_MIX = _rng.integers(1, 2**63, ROWS, dtype=np.uint64) | np.uint64(1)
+
+Duplicate = namedtuple('Duplicate', 'question_id module_id question similarity')
+
+WORD = re.compile(r'\w+')
+
+def normalize(question, options):
+    """Lowercase words of the question followed by its options, sorted"""
+    def words(text):
+        return ' '.join(WORD.findall((text or '').lower()))
+    return ' '.join([words(question), *sorted(words(option) for option in options)])
+
+def shingles(texts):
+    """(shingles, offsets): every text's 4-byte shingles as uint32, text i at shingles[offsets[i]:offsets[i + 1]]"""
+    encoded = [text.encode('utf-8').ljust(SHINGLE_BYTES) for text in texts]
+    lengths = np.array([len(data) for data in encoded], dtype=np.int64)
+    counts = lengths - SHINGLE_BYTES + 1
+
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint32)
+    packed = data[:-3] << 24 | data[1:-2] << 16 | data[2:-1] << 8 | data[3:]
+
+    # Drop the shingles that straddle two texts
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    starts = np.cumsum(lengths) - lengths
+    positions = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1])
+    return packed[positions], offsets
+
+def signatures(texts):
+    """MinHash signatures of normalized texts as an (n, NUM_PERM) uint32 array"""
+    if not texts:
+        return np.zeros((0, NUM_PERM), dtype=np.uint32)
+
+    packed, offsets = shingles(texts)
+    result = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+
+    # Blocks of whole texts, about CHUNK_SHINGLES shingles each
+    bounds = np.unique(np.concatenate([
+        np.searchsorted(offsets, np.arange(0, offsets[-1], CHUNK_SHINGLES), side='right') - 1,
+        [len(texts)],
+    ]))
+
+    # Hashed in place in one reused buffer; small blocks stay in cache
+    buffer = np.empty((NUM_PERM, np.diff(offsets[bounds]).max()), dtype=np.uint64)
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        block = packed[offsets[first]:offsets[last]].astype(np.uint64)
+        hashes = buffer[:, :len(block)]
+        np.multiply(HASH_A[:, None], block, out=hashes)
+        hashes += HASH_B[:, None]
+        hashes >>= np.uint64(32)
+        result[first:last] = np.minimum.reduceat(hashes, offsets[first:last] - offsets[first], axis=1).T
+
+    return result
+
+def band_keys(signature_rows):
+    """LSH bucket key of every band: (n, BANDS) int64"""
+    bands = signature_rows.reshape(len(signature_rows), BANDS, ROWS).astype(np.uint64)
+    return (bands * BAND_MIX).sum(axis=2, dtype=np.uint64).view(np.int64)
+
+def similarity(signature, others):
+    """Estimated Jaccard similarity of one signature to each row of others"""
+    return (others == signature).mean(axis=1)
+
+def question_signature(question, options):
+    return signatures([normalize(question, options)])[0]
+
+def find_duplicates(cursor, question, options, threshold=DUPLICATE_THRESHOLD, limit=5):
+    """Indexed questions at or above threshold similarity, most similar first"""
+    signature = question_signature(question, options)
+    keys = band_keys(signature[None])[0].tolist()
+
+    cursor.execute(f"""
+        SELECT s.question_id, s.signature, q.module_id, q.question
+        FROM question_signatures s
+        JOIN quizzes q ON q.id = s.question_id
+        WHERE s.question_id IN (
+            SELECT question_id FROM question_lsh
+            WHERE {' OR '.join(['(band = ? AND bucket = ?)'] * BANDS)}
+        )
+    """, [value for band, key in enumerate(keys) for value in (band, key)])
+    candidates = cursor.fetchall()
+    if not candidates:
+        return []
+
+    scores = similarity(signature, np.stack([np.frombuffer(row[1], dtype='<u4') for row in candidates]))
+    duplicates = [
+        Duplicate(row[0], row[2], row[3], float(score))
+        for row, score in zip(candidates, scores) if score >= threshold
+    ]
+    duplicates.sort(key=lambda duplicate: -duplicate.similarity)
+    return duplicates[:limit]
+
+def store_signatures(cursor, question_ids, signature_rows):
+    cursor.executemany("INSERT OR REPLACE INTO question_signatures (question_id, signature) VALUES (?, ?)",
+                       [(question_id, signature.astype('<u4').tobytes())
+                        for question_id, signature in zip(question_ids, signature_rows)])
+    cursor.executemany("INSERT OR IGNORE INTO question_lsh (band, bucket, question_id) VALUES (?, ?, ?)",
+                       [(band, key, question_id)
+                        for question_id, keys in zip(question_ids, band_keys(signature_rows).tolist())
+                        for band, key in enumerate(keys)])
+
+def index_question(cursor, question_id, question, options):
+    """Add a newly inserted question to the index, in the caller's transaction"""
+    store_signatures(cursor, [question_id], question_signature(question, options)[None])
+
+def load_bank(cursor, where=""):
+    cursor.execute(f"""
+        SELECT q.id, q.question, q.option_a, q.option_b, q.option_c, q.option_d
+        FROM quizzes q {where}
+        ORDER BY q.id
+    """)
+    rows = cursor.fetchall()
+    return [row[0] for row in rows], [normalize(row[1], row[2:6]) for row in rows]
+
+def index_questions(cursor):
+    """Index every question that has no signature yet; returns how many were added"""
+    question_ids, texts = load_bank(cursor, """
+        WHERE NOT EXISTS (SELECT 1 FROM question_signatures s WHERE s.question_id = q.id)
+    """)
+    store_signatures(cursor, question_ids, signatures(texts))
+    return len(question_ids)
+
+def shared_buckets(cursor):
+    """(band, bucket, question_id) rows of every bucket holding more than one question, sorted"""
+    cursor.execute("""
+        SELECT band, bucket, question_id
+        FROM question_lsh
+        WHERE (band, bucket) IN (
+            SELECT band, bucket FROM question_lsh
+            GROUP BY band, bucket
+            HAVING COUNT(*) > 1
+        )
+        ORDER BY band, bucket, question_id
+    """)
+    return np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 3)
+
+def bucket_pairs(rows):
+    """Question id pairs (first < second) that share a bucket, from rows sorted by (band, bucket, question_id)
+
+    A pair found in several bands appears once per band.
+    """
+    band, bucket, question_id = rows.T
+    pairs = []
+    for step in range(1, MAX_BUCKET_PAIRS + 1):
+        same = np.flatnonzero((band[step:] == band[:-step]) & (bucket[step:] == bucket[:-step]))
+        if not len(same):
+            break
+        pairs.append(np.stack([question_id[same], question_id[same + step]], axis=1))
+
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.concatenate(pairs)
+
+def stored_signatures(cursor, question_ids):
+    """Stored signatures of sorted question_ids as an (n, NUM_PERM) uint32 array"""
+    blobs = []
+    for start in range(0, len(question_ids), 500):
+        chunk = question_ids[start:start + 500].tolist()
+        cursor.execute(f"""
+            SELECT signature FROM question_signatures
+            WHERE question_id IN ({','.join('?' * len(chunk))})
+            ORDER BY question_id
+        """, chunk)
+        blobs.extend(row[0] for row in cursor.fetchall())
+    return np.frombuffer(b''.join(blobs), dtype='<u4').reshape(len(blobs), NUM_PERM)
+
+def duplicate_pairs(cursor, threshold=DUPLICATE_THRESHOLD):
+    """Near-duplicate pairs across the whole bank: (similarity, question_id, question_id), most similar first.
+
+    Signs any question that has no signature yet first, in the caller's
+    transaction, so the report also covers questions that were never indexed.
+    """
+    index_questions(cursor)
+
+    rows = shared_buckets(cursor)
+    pairs = bucket_pairs(rows)
+    if not len(pairs):
+        return []
+
+    question_ids = np.unique(rows[:, 2])
+    signature_rows = stored_signatures(cursor, question_ids)
+
+    # Row of each question in signature_rows, looked up by id
+    position = np.zeros(question_ids[-1] + 1, dtype=np.int64)
+    position[question_ids] = np.arange(len(question_ids))
+    positions = position[pairs]
+
+    # Small blocks keep the gathered signatures in cache
+    matches = np.concatenate([
+        (signature_rows[block[:, 0]] == signature_rows[block[:, 1]]).sum(axis=1, dtype=np.uint8)
+        for block in np.array_split(positions, max(1, len(positions) // 4096))
+    ])
+    scores = matches / NUM_PERM
+
+    keep = np.flatnonzero(scores >= threshold)
+    keep = keep[np.argsort(-scores[keep], kind='stable')]
+
+    # A pair found in several bands is reported once
+    found = {}
+    for i in keep.tolist():
+        found.setdefault((int(pairs[i, 0]), int(pairs[i, 1])), float(scores[i]))
+    return [(score, first, second) for (first, second), score in found.items()]
+
+class DuplicateReport:
+    """The duplicate pairs last found at each threshold, reused until any module's questions change"""
+
+    def __init__(self):
+        self._pairs = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, cursor, threshold=DUPLICATE_THRESHOLD):
+        version = bank_version(cursor)
+
+        with self._lock:
+            if version == self._version and threshold in self._pairs:
+                return self._pairs[threshold]
+
+        pairs = duplicate_pairs(cursor, threshold)
+
+        with self._lock:
+            if version != self._version:
+                self._pairs = {}
+                self._version = version
+            self._pairs[threshold] = pairs
+        return pairs
+
+    def invalidate(self):
+        with self._lock:
+            self._pairs = {}
+            self._version = None
+
+duplicate_report = DuplicateReport()
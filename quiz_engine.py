@@ -0,0 +1,228 @@
+"""Immutable per-attempt quiz snapshots.
+
+A snapshot freezes a module's question set when a quiz starts.  Snapshots
+are shared by every session taking the same module at the same quiz
+version, so once an attempt has its snapshot it never reads questions from
+the database again: navigation indexes into the snapshot and grading is an
+in-memory comparison.  Adding questions bumps the module's quiz version,
+which only affects attempts started afterwards, so question positions
+never shift under an attempt in progress.
+
+Large banks are sampled instead of presented whole.  A QuestionBank holds
+only the module's question ids (overall and per difficulty/tag stratum) in
+arrays, so drawing k questions is O(k) and only those k rows are fetched.
+The draw is a pure function of the bank version and a seed stored with the
+attempt, which makes every sampled attempt reproducible.
+"""
+import random
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+from cache import read_version, MODULES
+
+OPTION_LETTERS = ('A', 'B', 'C', 'D')
+
+# Columns a sample can be stratified by
+STRATA = ('difficulty', 'tag')
+
+# Questions per attempt once a bank is larger than this
+QUIZ_SAMPLE_SIZE = 20
+
+# Snapshots/banks kept in memory (one per module, quiz version and modules version)
+MAX_SNAPSHOTS = 64
+
+def quiz_version_name(module_id):
+    """cache_versions row bumped whenever a module's questions change"""
+    return f"quizzes:{module_id}"
+
+def quiz_version(cursor, module_id):
+    return read_version(cursor, quiz_version_name(module_id))
+
+def bank_version(cursor):
+    """Sum of every module's quiz version, so it moves whenever any question changes"""
+    cursor.execute("""
+        SELECT COALESCE(SUM(version), 0) FROM cache_versions
+        WHERE name >= 'quizzes:' AND name < 'quizzes;'
+    """)
+    return cursor.fetchone()[0]
+
+class Question(namedtuple('Question', 'id text options correct_answer explanation')):
+    __slots__ = ()
+
+    def option(self, letter):
+        """Text of option A-D, or None for an unknown/missing letter"""
+        if letter in OPTION_LETTERS:
+            return self.options[OPTION_LETTERS.index(letter)]
+        return None
+
+class QuizSnapshot(namedtuple('QuizSnapshot', 'module_id version title questions')):
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.questions)
+
+    def grade(self, answers):
+        """Per-question correctness for {position: letter} answers"""
+        return tuple(
+            answers.get(i) == question.correct_answer
+            for i, question in enumerate(self.questions)
+        )
+
+    def score(self, answers):
+        return sum(self.grade(answers))
+
+class QuestionBank(namedtuple('QuestionBank', 'module_id version title ids strata')):
+    """Question ids of a module: ids is an array, strata maps column -> {value: array}"""
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.ids)
+
+def module_title(cursor, module_id):
+    cursor.execute("SELECT title FROM modules WHERE active = 1 AND id = ?", (module_id,))
+    module = cursor.fetchone()
+    return module[0] if module else None
+
+def fetch_questions(cursor, ids):
+    """Questions for ids, in the order given"""
+    ids = list(ids)
+    if not ids:
+        return ()
+
+    cursor.execute(f"""
+        SELECT id, question, option_a, option_b, option_c, option_d, correct_answer, explanation
+        FROM quizzes
+        WHERE id IN ({','.join('?' * len(ids))})
+    """, ids)
+
+    by_id = {
+        q[0]: Question(q[0], q[1], (q[2], q[3], q[4], q[5]), q[6], q[7])
+        for q in cursor.fetchall()
+    }
+    return tuple(by_id[question_id] for question_id in ids if question_id in by_id)
+
+def load_snapshot(conn, module_id, version):
+    cursor = conn.cursor()
+    title = module_title(cursor, module_id)
+    if title is None:
+        return None
+
+    cursor.execute("""
+        SELECT id, question, option_a, option_b, option_c, option_d, correct_answer, explanation
+        FROM quizzes
+        WHERE module_id = ?
+        ORDER BY id
+    """, (module_id,))
+
+    questions = tuple(
+        Question(q[0], q[1], (q[2], q[3], q[4], q[5]), q[6], q[7])
+        for q in cursor.fetchall()
+    )
+    return QuizSnapshot(module_id, version, title, questions)
+
+def load_bank(conn, module_id, version):
+    cursor = conn.cursor()
+    title = module_title(cursor, module_id)
+    if title is None:
+        return None
+
+    # Answered from idx_quizzes_module_strata without touching question text
+    cursor.execute("""
+        SELECT id, difficulty, tag
+        FROM quizzes
+        WHERE module_id = ?
+        ORDER BY id
+    """, (module_id,))
+
+    ids = array('q')
+    strata = {column: {} for column in STRATA}
+    for question_id, *values in cursor.fetchall():
+        ids.append(question_id)
+        for column, value in zip(STRATA, values):
+            strata[column].setdefault(value, array('q')).append(question_id)
+
+    return QuestionBank(module_id, version, title, ids, strata)
+
+def allocate(sizes, k):
+    """Split k draws across strata in proportion to their sizes (largest remainder)"""
+    total = sum(sizes)
+    quotas = [size * k / total for size in sizes]
+    counts = [int(quota) for quota in quotas]
+
+    by_remainder = sorted(range(len(sizes)), key=lambda i: counts[i] - quotas[i])
+    for i in by_remainder[:k - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+def sample_ids(bank, k, seed, stratify=None):
+    """Draw k question ids from a bank; the same bank, k, seed and strata give the same draw"""
+    rng = random.Random(seed)
+    k = min(k, len(bank))
+
+    if not stratify:
+        return [bank.ids[i] for i in rng.sample(range(len(bank.ids)), k)]
+
+    # Strata in a fixed order so the draw doesn't depend on dict order
+    groups = sorted(bank.strata[stratify].items(), key=lambda item: (item[0] is None, str(item[0])))
+    counts = allocate([len(group) for _, group in groups], k)
+
+    ids = []
+    for (_, group), count in zip(groups, counts):
+        ids.extend(group[i] for i in rng.sample(range(len(group)), count))
+
+    rng.shuffle(ids)
+    return ids
+
+def sample_snapshot(conn, bank, k, seed, stratify=None):
+    """Snapshot of k sampled questions; version and ordering come from the bank and seed"""
+    questions = fetch_questions(conn.cursor(), sample_ids(bank, k, seed, stratify))
+    return QuizSnapshot(bank.module_id, bank.version, bank.title, questions)
+
+def new_seed():
+    return random.SystemRandom().getrandbits(31)
+
+class ModuleQuizCache:
+    """Process-wide LRU of load(conn, module_id, version) keyed on (module_id, version, modules version).
+
+    version(cursor, module_id) defaults to the module's quiz version.  Values
+    embed the module's title and exist only for active modules, so module
+    edits and deletions (which bump MODULES) invalidate them as well.
+    """
+
+    def __init__(self, load, version=quiz_version, max_entries=MAX_SNAPSHOTS):
+        self.load = load
+        self.version = version
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conn, module_id):
+        """Current value for a module (None if the module doesn't exist)"""
+        cursor = conn.cursor()
+
+        while True:
+            version = self.version(cursor, module_id)
+            key = (module_id, version, read_version(cursor, MODULES))
+
+            with self._lock:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    return value
+
+            value = self.load(conn, module_id, version)
+
+            # Retry if questions changed while loading, so a value always
+            # matches the version it is filed under
+            if (module_id, self.version(cursor, module_id), read_version(cursor, MODULES)) != key:
+                continue
+
+            if value is not None:
+                with self._lock:
+                    self._entries[key] = value
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return value
+
+snapshot_cache = ModuleQuizCache(load_snapshot)
+bank_cache = ModuleQuizCache(load_bank)
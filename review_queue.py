@@ -0,0 +1,151 @@
+"""Spaced-repetition review of missed quiz questions (SM-2).
+
+Every question a learner gets wrong in a quiz becomes a card in
+review_cards, due immediately.  Reviewing a card rates the recall (again,
+hard, good, easy) and SM-2 schedules the next review: 1 day, then 6 days,
+then the previous interval times the card's easiness factor.  A failed
+review starts the card over.
+
+Cards are keyed on (user_id, question_id) and indexed on (user_id, due_at),
+so the next batch of due cards is one index range scan however many cards
+a learner has.  Quiz submissions only read and rewrite the cards of the
+questions in that quiz.
+"""
+from datetime import datetime, timedelta
+
+# SM-2 defaults
+DEFAULT_EASINESS = 2.5
+MIN_EASINESS = 1.3
+
+# Recall ratings (SM-2 quality, 0-5); below PASSING_QUALITY counts as a lapse
+AGAIN = 1
+HARD = 3
+GOOD = 4
+EASY = 5
+PASSING_QUALITY = 3
+
+# Cards loaded per review batch
+REVIEW_BATCH = 20
+
+def sm2(easiness, interval_days, repetitions, quality):
+    """Next (easiness, interval_days, repetitions) after a review rated quality"""
+    easiness = max(MIN_EASINESS, easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+    if quality < PASSING_QUALITY:
+        # Lapse: relearn from the start, due again right away
+        return easiness, 0, 0
+
+    if repetitions == 0:
+        interval_days = 1
+    elif repetitions == 1:
+        interval_days = 6
+    else:
+        interval_days = round(interval_days * easiness)
+
+    return easiness, interval_days, repetitions + 1
+
+def load_cards(cursor, user_id, question_ids):
+    """{question_id: (easiness, interval_days, repetitions, lapses)} for existing cards"""
+    question_ids = list(question_ids)
+    if not question_ids:
+        return {}
+
+    cursor.execute(f"""
+        SELECT question_id, easiness, interval_days, repetitions, lapses
+        FROM review_cards
+        WHERE user_id = ? AND question_id IN ({','.join('?' * len(question_ids))})
+    """, [user_id, *question_ids])
+    return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+def save_cards(cursor, cards):
+    """Upsert (user_id, question_id, module_id, easiness, interval, repetitions, lapses, due_at, reviewed) rows"""
+    cursor.executemany("""
+        INSERT INTO review_cards
+        (user_id, question_id, module_id, easiness, interval_days, repetitions, lapses, due_at, last_reviewed)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, question_id) DO UPDATE SET
+            easiness = excluded.easiness,
+            interval_days = excluded.interval_days,
+            repetitions = excluded.repetitions,
+            lapses = excluded.lapses,
+            due_at = excluded.due_at,
+            last_reviewed = excluded.last_reviewed
+    """, cards)
+
+def schedule(user_id, question_id, module_id, card, quality, now):
+    """Card row after rating a recall; card is None for a new card"""
+    easiness, interval_days, repetitions, lapses = card or (DEFAULT_EASINESS, 0, 0, 0)
+    easiness, interval_days, repetitions = sm2(easiness, interval_days, repetitions, quality)
+    if quality < PASSING_QUALITY:
+        lapses += 1
+
+    due_at = now + timedelta(days=interval_days)
+    return (user_id, question_id, module_id, easiness, interval_days, repetitions, lapses,
+            due_at.isoformat(), now.isoformat())
+
+def record_answers(cursor, answers, now=None):
+    """Update cards from graded quiz answers: (user_id, question_id, module_id, correct) rows.
+
+    A wrong answer creates the card or counts as a lapse; a right answer only
+    advances a card that already exists. Runs on the caller's cursor, so it
+    lands in the caller's transaction.
+    """
+    now = now or datetime.now()
+
+    by_user = {}
+    for user_id, question_id, module_id, correct in answers:
+        by_user.setdefault(user_id, []).append((question_id, module_id, correct))
+
+    rows = []
+    for user_id, graded in by_user.items():
+        cards = load_cards(cursor, user_id, {question_id for question_id, _, _ in graded})
+
+        for question_id, module_id, correct in graded:
+            card = cards.get(question_id)
+            if card is None and correct:
+                continue
+
+            row = schedule(user_id, question_id, module_id, card, GOOD if correct else AGAIN, now)
+            cards[question_id] = row[3:7]
+            rows.append(row)
+
+    save_cards(cursor, rows)
+    return len(rows)
+
+def review_card(cursor, user_id, question_id, quality, now=None):
+    """Rate one review and reschedule the card"""
+    now = now or datetime.now()
+
+    cursor.execute("""
+        SELECT module_id, easiness, interval_days, repetitions, lapses
+        FROM review_cards
+        WHERE user_id = ? AND question_id = ?
+    """, (user_id, question_id))
+    row = cursor.fetchone()
+    if row is None:
+        return False
+
+    save_cards(cursor, [schedule(user_id, question_id, row[0], tuple(row[1:]), quality, now)])
+    return True
+
+def due_cards(cursor, user_id, now=None, limit=REVIEW_BATCH):
+    """Question ids of the next due cards, most overdue first"""
+    cursor.execute("""
+        SELECT question_id FROM review_cards
+        WHERE user_id = ? AND due_at <= ?
+        ORDER BY due_at
+        LIMIT ?
+    """, (user_id, (now or datetime.now()).isoformat(), limit))
+    return [row[0] for row in cursor.fetchall()]
+
+def queue_stats(cursor, user_id, now=None):
+    """(cards due now, total cards, next due time or None)"""
+    now = (now or datetime.now()).isoformat()
+
+    cursor.execute("""
+        SELECT COUNT(*), SUM(due_at <= ?), MIN(CASE WHEN due_at > ? THEN due_at END)
+        FROM review_cards
+        WHERE user_id = ?
+    """, (now, now, user_id))
+    total, due, next_due = cursor.fetchone()
+    return due or 0, total, next_due
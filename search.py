@@ -0,0 +1,121 @@
+"""Full-text search over modules, quiz questions and research notes.
+
+Each source table has an external-content FTS5 index (modules_fts,
+quizzes_fts, research_fts) kept in sync by triggers, so the index holds
+only the inverted lists and snippets are cut from the source rows.
+
+Results are ranked with bm25 (column weights are stored as each index's
+rank function).  bm25 has to score every match, so a query that matches
+almost everything (a single very common word) would cost time in
+proportion to the corpus.  Each source therefore first counts matches up
+to RANK_LIMIT, which stops early; past that the newest matches are
+returned unranked and the caller is told to narrow the query.  Either
+way a search touches a bounded number of rows.
+"""
+import re
+from collections import namedtuple
+
+# Results per source
+SEARCH_LIMIT = 10
+
+# Most matches a source will rank with bm25 in one query
+RANK_LIMIT = 5000
+
+# Shortest last word searched as a prefix; shorter prefixes expand to too many terms
+PREFIX_MIN_CHARS = 3
+
+# Words of the snippet window around the best match
+SNIPPET_TOKENS = 12
+
+# Dropped from queries (unless the query has nothing else)
+STOPWORDS = frozenset("""
+    a an and are as at be by for from has how in is it its of on or that the to was what when
+    where which who why will with
+""".split())
+
+# Marks around matched terms in snippets, swapped for markdown bold after escaping
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+SearchResult = namedtuple('SearchResult', 'kind id module_id title snippet')
+
+# kind: (index, SELECT producing id, module_id, title, snippet, extra WHERE)
+SOURCES = {
+    'modules': ('modules_fts', """
+        SELECT m.id, m.id, m.title, snippet(modules_fts, -1, ?, ?, ' … ', ?)
+        FROM modules_fts
+        JOIN modules m ON m.id = modules_fts.rowid
+    """, "m.active = 1"),
+    'quizzes': ('quizzes_fts', """
+        SELECT q.id, q.module_id, q.question, snippet(quizzes_fts, -1, ?, ?, ' … ', ?)
+        FROM quizzes_fts
+        JOIN quizzes q ON q.id = quizzes_fts.rowid
+    """, None),
+    'research': ('research_fts', """
+        SELECT r.id, NULL, r.topic, snippet(research_fts, -1, ?, ?, ' … ', ?)
+        FROM research_fts
+        JOIN content_research r ON r.id = research_fts.rowid
+    """, None),
+}
+
+MARKUP = re.compile(r'[#*_`>~|]+|(?<!\S)[-+](?=\s)')
+MARKDOWN_SPECIAL = re.compile(r'([\\`*_{}\[\]()#+\-.!|<>~$])')
+
+def fts_query(text):
+    """FTS5 MATCH expression for free text: every word must match, the last one as a prefix
+    (while it is still being typed).
+
+    Words are quoted, so FTS5 operators and punctuation in the input are
+    treated as plain text. None if there is nothing to search for.
+    """
+    words = re.findall(r'\w+', (text or '').lower())
+    if not words:
+        return None
+
+    kept = [word for word in words if word not in STOPWORDS] or words
+    prefix = (not text[-1].isspace() and words[-1] == kept[-1]
+              and len(kept[-1]) >= PREFIX_MIN_CHARS)
+
+    terms = [f'"{word}"' for word in kept]
+    if prefix:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+def highlight(snippet):
+    """Snippet as markdown: source markup dropped, text escaped, matched terms in bold"""
+    text = MARKUP.sub(' ', snippet or '')
+    text = MARKDOWN_SPECIAL.sub(r'\\\1', ' '.join(text.split()))
+    return text.replace(MATCH_START, '**').replace(MATCH_END, '**')
+
+def count_matches(cursor, index, query, limit):
+    """Matches of query in an index, counted only up to limit"""
+    cursor.execute(f"SELECT COUNT(*) FROM (SELECT rowid FROM {index} WHERE {index} MATCH ? LIMIT ?)",
+                   (query, limit))
+    return cursor.fetchone()[0]
+
+def search_source(cursor, kind, query, limit=SEARCH_LIMIT, rank_limit=RANK_LIMIT):
+    """(results, ranked) for one source; unranked results are the newest matches"""
+    index, select, where = SOURCES[kind]
+    ranked = count_matches(cursor, index, query, rank_limit + 1) <= rank_limit
+    order = f"{index}.rank" if ranked else f"{index}.rowid DESC"
+
+    cursor.execute(f"""
+        {select}
+        WHERE {index} MATCH ? {'AND ' + where if where else ''}
+        ORDER BY {order}
+        LIMIT ?
+    """, (MATCH_START, MATCH_END, SNIPPET_TOKENS, query, limit))
+
+    results = [
+        SearchResult(kind, row[0], row[1], row[2], highlight(row[3]))
+        for row in cursor.fetchall()
+    ]
+    return results, ranked
+
+def search(cursor, text, kinds=tuple(SOURCES), limit=SEARCH_LIMIT):
+    """{kind: (results, ranked)} for free-text input; empty if there is nothing to search for"""
+    query = fts_query(text)
+    if query is None:
+        return {}
+
+    return {kind: search_source(cursor, kind, query, limit) for kind in kinds}
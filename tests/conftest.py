@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate
+
+@pytest.fixture
+def db(tmp_path):
+    """Connection to a fully migrated scratch database"""
+    conn = sqlite3.connect(tmp_path / "test.db")
+    migrate(conn)
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def app_db(tmp_path, monkeypatch):
+    """The app module running against its own bootstrapped scratch database"""
+    import app
+    import database
+
+    monkeypatch.chdir(tmp_path)
+    pool = database.ConnectionPool(str(tmp_path / "app.db"))
+    monkeypatch.setattr(database, 'pool', pool)
+    app.bootstrap_database()
+    yield app
+    app.gamification_queue.flush()
+    pool.close_all()
+
+@pytest.fixture
+def trace_sql(monkeypatch):
+    """Call to start collecting the SQL statements run through the pool; returns the list"""
+    import database
+
+    def start():
+        statements = []
+        pool = database.get_pool()
+        acquire = pool.acquire
+
+        def traced_acquire():
+            conn = acquire()
+            conn.set_trace_callback(statements.append)
+            return conn
+
+        monkeypatch.setattr(pool, 'acquire', traced_acquire)
+        return statements
+
+    return start
@@ -0,0 +1,29 @@
+from gamification import apply_badge
+
+def test_a_badge_is_awarded_once(db):
+    db.execute("""
+        INSERT INTO users (username, email, password, created_date) VALUES ('learner', 'l@example.com', '', '')
+    """)
+    cursor = db.cursor()
+    apply_badge(cursor, 1, "Quiz Taker")
+    apply_badge(cursor, 1, "Quiz Taker")
+    apply_badge(cursor, 1, "Perfect Score")
+
+    assert db.execute("SELECT badge FROM user_badges ORDER BY id").fetchall() == [('Quiz Taker',), ('Perfect Score',)]
+    assert db.execute("""
+        SELECT achievement_name FROM user_achievements WHERE achievement_type = 'badge' ORDER BY id
+    """).fetchall() == [('Quiz Taker',), ('Perfect Score',)]
+
+def test_badges_are_listed_in_the_order_earned(app_db):
+    assert app_db.register_user('learner', 'learner@example.com', 'secret1', 'student')
+    conn = app_db.get_db_connection()
+    try:
+        user_id = conn.execute("SELECT id FROM users WHERE username = 'learner'").fetchone()[0]
+    finally:
+        conn.close()
+
+    app_db.award_badge(user_id, "Quiz Taker")
+    app_db.award_badge(user_id, "Welcome Learner")
+    app_db.gamification_queue.flush()
+
+    assert app_db.get_user_badges(user_id) == ["Welcome Learner", "Quiz Taker"]
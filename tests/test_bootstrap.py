@@ -0,0 +1,37 @@
+import sqlite3
+
+def counts(conn):
+    return [conn.execute(sql).fetchone()[0] for sql in (
+        "SELECT COUNT(*) FROM users WHERE role = 'admin'",
+        "SELECT COUNT(*) FROM modules",
+        "SELECT COUNT(*) FROM quizzes",
+    )]
+
+def test_bootstrap_seeds_a_database_that_is_already_migrated(tmp_path, monkeypatch):
+    import app
+    import database
+    from migrations import migrate
+
+    path = tmp_path / "app.db"
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    assert counts(conn) == [0, 0, 0]
+
+    monkeypatch.chdir(tmp_path)
+    pool = database.ConnectionPool(str(path))
+    monkeypatch.setattr(database, 'pool', pool)
+    try:
+        assert app.bootstrap_database() is False
+        assert all(counts(conn))
+    finally:
+        pool.close_all()
+        conn.close()
+
+def test_bootstrap_is_idempotent(app_db):
+    conn = app_db.get_db_connection()
+    try:
+        seeded = counts(conn)
+        assert app_db.bootstrap_database() is False
+        assert counts(conn) == seeded
+    finally:
+        conn.close()
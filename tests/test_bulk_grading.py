@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bulk_grading import grade, grade_sheets
+
+def key():
+    return (np.array([1, 2, 3]), np.array([10, 10, 20]), np.array(['A', 'B', 'C']))
+
+def test_grade_checks_answers_against_the_module_key():
+    valid, correct = grade(
+        user_ids=np.array([1, 1, 1, -1, 2]),
+        module_ids=np.array([10, 10, 10, 10, 20]),
+        question_ids=np.array([1, 2, 3, 1, 3]),
+        answers=np.array(['A', 'C', 'C', 'A', 'C']),
+        key=key(),
+    )
+    # Question 3 isn't in module 10, and user -1 is unknown
+    assert valid.tolist() == [True, True, False, False, True]
+    assert correct.tolist() == [True, False, True]
+
+def test_grade_with_an_empty_key():
+    valid, correct = grade(np.array([1]), np.array([10]), np.array([1]), np.array(['A']),
+                           (np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([], dtype=str)))
+    assert valid.tolist() == [False] and len(correct) == 0
+
+@pytest.fixture
+def sheet(app_db):
+    conn = app_db.get_db_connection()
+    conn.execute("""
+        INSERT INTO users (username, email, password, role, created_date)
+        VALUES ('learner', 'learner@example.com', '', 'student', '')
+    """)
+    conn.commit()
+    questions = conn.execute("SELECT id, correct_answer FROM quizzes WHERE module_id = 1 ORDER BY id").fetchall()
+    conn.close()
+
+    return pd.DataFrame({
+        'username': 'learner',
+        'module_id': 1,
+        'question_id': [q[0] for q in questions],
+        'answer': [q[1] for q in questions],
+    })
+
+def attempt_count(app):
+    conn = app.get_db_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM quiz_attempts").fetchone()[0]
+    finally:
+        conn.close()
+
+def grade_with(app, sheet):
+    conn = app.get_db_connection()
+    try:
+        return grade_sheets(conn, sheet)
+    finally:
+        conn.close()
+
+@pytest.mark.parametrize('answer', ['Option A', 'NaN', 'AB'])
+def test_malformed_answers_reject_the_sheet(app_db, sheet, answer):
+    sheet.loc[1, 'answer'] = answer
+    with pytest.raises(ValueError, match="lines 3$"):
+        grade_with(app_db, sheet)
+    assert attempt_count(app_db) == 0
+
+def test_repeated_questions_reject_the_sheet(app_db, sheet):
+    sheet = pd.concat([sheet, sheet.iloc[[0]]], ignore_index=True)
+    with pytest.raises(ValueError, match=f"more than once on lines {len(sheet) + 1}$"):
+        grade_with(app_db, sheet)
+    assert attempt_count(app_db) == 0
+
+def test_regrading_a_sheet_records_nothing_new(app_db, sheet):
+    first = grade_with(app_db, sheet)
+    second = grade_with(app_db, sheet)
+
+    assert (first['attempts'], first['already_recorded']) == (1, 0)
+    assert (second['attempts'], second['already_recorded']) == (0, 1)
+    assert attempt_count(app_db) == 1
+
+def test_interrupted_run_resumes_where_it_stopped(app_db, sheet, monkeypatch):
+    import bulk_grading
+
+    conn = app_db.get_db_connection()
+    conn.execute("""
+        INSERT INTO users (username, email, password, role, created_date)
+        VALUES ('second', 'second@example.com', '', 'student', '')
+    """)
+    conn.commit()
+    conn.close()
+    sheet = pd.concat([sheet, sheet.assign(username='second')], ignore_index=True)
+
+    write_batch = bulk_grading.write_batch
+    calls = []
+
+    def fail_second_batch(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("interrupted")
+        write_batch(*args)
+
+    monkeypatch.setattr(bulk_grading, 'write_batch', fail_second_batch)
+    conn = app_db.get_db_connection()
+    with pytest.raises(RuntimeError):
+        grade_sheets(conn, sheet, batch_attempts=1)
+    conn.close()
+    assert attempt_count(app_db) == 1
+
+    monkeypatch.setattr(bulk_grading, 'write_batch', write_batch)
+    report = grade_with(app_db, sheet)
+    assert (report['attempts'], report['already_recorded']) == (1, 1)
+    assert attempt_count(app_db) == 2
+
+def test_unanswered_questions_count_as_wrong(app_db, sheet):
+    report = grade_with(app_db, sheet.iloc[[0]])
+    assert report['attempts'] == 1
+
+    conn = app_db.get_db_connection()
+    try:
+        score, total = conn.execute("SELECT score, total_questions FROM quiz_attempts").fetchone()
+        best = conn.execute("SELECT best_score FROM user_progress").fetchone()[0]
+    finally:
+        conn.close()
+    assert (score, total) == (1, len(sheet))
+    assert best == pytest.approx(100 / len(sheet))
+
+def test_attempt_ids_depend_only_on_the_attempts_own_rows(app_db, sheet):
+    conn = app_db.get_db_connection()
+    conn.execute("""
+        INSERT INTO users (username, email, password, role, created_date)
+        VALUES ('second', 'second@example.com', '', 'student', '')
+    """)
+    conn.commit()
+    conn.close()
+
+    assert grade_with(app_db, sheet)['attempts'] == 1
+
+    # The learner's rows reordered and mixed with another learner's: only the new attempt is written
+    combined = pd.concat([sheet.assign(username='second'), sheet.iloc[::-1]], ignore_index=True)
+    report = grade_with(app_db, combined)
+    assert (report['attempts'], report['already_recorded']) == (1, 1)
+
+    # Different answers are a different attempt
+    changed = sheet.assign(answer='')
+    assert grade_with(app_db, changed)['attempts'] == 1
+    assert attempt_count(app_db) == 3
@@ -0,0 +1,37 @@
+import sqlite3
+from cache import VersionedCache, bump_version, read_version, module_catalog
+
+def test_a_cached_value_is_reused_until_its_version_moves(db, tmp_path):
+    loads = []
+    cache = VersionedCache('things', lambda conn: loads.append(1) or len(loads))
+
+    assert cache.get(db) == 1
+    assert cache.get(db) == 1
+    assert read_version(db.cursor(), 'things') == 0
+
+    # A bump committed by another connection (another process) invalidates too
+    other = sqlite3.connect(tmp_path / "test.db")
+    bump_version(other.cursor(), 'things')
+    other.commit()
+    other.close()
+
+    assert cache.get(db) == 2
+    assert cache.get(db) == 2
+
+    cache.invalidate()
+    assert cache.get(db) == 3
+
+def test_module_writes_refresh_the_catalog(app_db):
+    module_catalog.invalidate()
+    titles = lambda: {module['title']: module['id'] for module in app_db.get_available_modules()}
+    before = titles()
+
+    app_db.add_module('Cached Module', 'Description', 'Beginner', 'Fundamentals')
+    module_id = titles()['Cached Module']
+    assert titles().keys() == before.keys() | {'Cached Module'}
+
+    app_db.update_module_content(module_id, 'Renamed Module', 'Description', '', '')
+    assert titles().keys() == before.keys() | {'Renamed Module'}
+
+    app_db.delete_module(module_id)
+    assert titles() == before
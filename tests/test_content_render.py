@@ -0,0 +1,27 @@
+from content_render import sanitize, split_sections, render_module, INTRO_TITLE
+
+def test_sanitize_strips_html_and_unsafe_links():
+    text = sanitize("Intro <b>bold</b>\r\n<script>alert(1)</script>[x](javascript:alert(1)) [y](https://ok)\x07")
+    assert text == "Intro bold\n[x](#) [y](https://ok)"
+
+def test_sanitize_leaves_code_blocks_alone():
+    markdown = "```html\n<script>kept()</script>\n```\n<i>dropped</i>"
+    assert sanitize(markdown) == "```html\n<script>kept()</script>\n```\ndropped"
+
+def test_split_at_top_level_headings():
+    text = sanitize("Welcome\n\n# Basics\nOne\n### Detail\nTwo\n## Basics\nThree")
+    sections = split_sections(text)
+
+    assert [(s.level, s.title, s.anchor) for s in sections] == [
+        (0, INTRO_TITLE, 'introduction'), (1, 'Basics', 'basics'), (2, 'Basics', 'basics-2'),
+    ]
+    assert sections[1].body == "# Basics\nOne\n### Detail\nTwo"
+    for section in sections:
+        assert text[section.start_offset:section.start_offset + section.length] == section.body
+
+def test_headings_inside_code_do_not_split():
+    sections = split_sections("# Shell\n```\n# not a heading\n```")
+    assert [s.title for s in sections] == ['Shell']
+
+def test_hash_ignores_markup_that_sanitizing_removes():
+    assert render_module("# A\ntext").content_hash == render_module("# A\n<span>text</span>").content_hash
@@ -0,0 +1,92 @@
+import sqlite3
+import pytest
+from database import ConnectionPool
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE items (name TEXT)")
+    conn.commit()
+    conn.close()
+    yield pool
+    pool.close_all()
+
+def names(pool):
+    conn = sqlite3.connect(pool.database_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT name FROM items ORDER BY name")]
+    finally:
+        conn.close()
+
+def test_nested_checkout_commits_on_its_own_connection(pool):
+    outer = pool.acquire()
+    outer.execute("SELECT 1").fetchall()
+
+    inner = pool.acquire()
+    assert inner is not outer
+    inner.execute("INSERT INTO items VALUES ('inner')")
+    inner.commit()
+    inner.close()
+
+    # The outer caller never commits; the helper's write still stands
+    outer.close()
+    assert names(pool) == ['inner']
+
+def test_nested_commit_does_not_commit_outer_writes(pool):
+    outer = pool.acquire()
+    outer.execute("INSERT INTO items VALUES ('outer')")
+
+    inner = pool.acquire()
+    inner.commit()
+    inner.rollback()
+    inner.close()
+
+    assert names(pool) == []
+    outer.commit()
+    outer.close()
+    assert names(pool) == ['outer']
+
+def test_checkouts_inside_a_transaction_join_it(pool):
+    with pool.transaction() as conn:
+        inner = pool.acquire()
+        assert inner is conn
+        inner.execute("INSERT INTO items VALUES ('inner')")
+        inner.commit()
+        inner.close()
+        assert names(pool) == []
+    assert names(pool) == ['inner']
+
+def test_transaction_commits_once_and_rolls_back_on_error(pool):
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO items VALUES ('a')")
+        with pool.transaction() as inner:
+            inner.execute("INSERT INTO items VALUES ('b')")
+            inner.commit()
+        assert names(pool) == []
+    assert names(pool) == ['a', 'b']
+
+    with pytest.raises(ValueError):
+        with pool.transaction() as conn:
+            conn.execute("INSERT INTO items VALUES ('c')")
+            raise ValueError
+    assert names(pool) == ['a', 'b']
+
+def test_release_discards_uncommitted_work(pool):
+    conn = pool.acquire()
+    conn.execute("INSERT INTO items VALUES ('lost')")
+    conn.close()
+    assert names(pool) == []
+
+def test_borrowed_connection_keeps_outer_row_factory(pool, monkeypatch):
+    import database
+    monkeypatch.setattr(database, 'pool', pool)
+
+    with pool.transaction():
+        inner = database.get_db_connection()
+        assert inner.row_factory is None
+        inner.close()
+
+    conn = database.get_db_connection()
+    assert conn.row_factory is sqlite3.Row
+    conn.close()
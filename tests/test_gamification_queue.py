@@ -0,0 +1,92 @@
+import sqlite3
+import threading
+import pytest
+import database
+import gamification
+from database import ConnectionPool
+from gamification import GamificationQueue
+from migrations import migrate
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    path = str(tmp_path / "queue.db")
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.close()
+
+    pool = ConnectionPool(path)
+    monkeypatch.setattr(database, 'pool', pool)
+    queue = GamificationQueue(flush_interval_ms=10)
+    yield queue
+    queue.close()
+    pool.close_all()
+
+def balance(user_id):
+    conn = database.get_pool().acquire()
+    try:
+        row = conn.execute("SELECT points FROM point_balances WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else 0
+    finally:
+        conn.close()
+
+def test_pending_awards_are_counted_once(queue):
+    queue.award_points(1, 50, "Quiz")
+    result, pending, _ = queue.read_with_pending(1, lambda: balance(1))
+    assert result + pending == 50
+
+    assert queue.flush()
+    assert queue.read_with_pending(1, lambda: balance(1)) == (50, 0, [])
+
+def test_read_runs_without_the_writer_lock(queue):
+    acquired = []
+
+    def try_lock():
+        acquired.append(queue._cond.acquire(timeout=1))
+        if acquired[-1]:
+            queue._cond.release()
+
+    def read():
+        other = threading.Thread(target=try_lock)
+        other.start()
+        other.join()
+        return balance(1)
+
+    queue.read_with_pending(1, read)
+    assert acquired == [True]
+
+def test_awards_after_close_are_written_directly(queue):
+    queue.close()
+    queue.award_points(2, 75, "Late award")
+    queue.award_badge(2, "Quiz Taker")
+    assert balance(2) == 75
+
+def test_failed_claim_does_not_suppress_the_award(queue):
+    conn = database.get_pool().acquire()
+    conn.execute("""
+        CREATE TRIGGER fail_claim BEFORE INSERT ON gamification_events
+        BEGIN SELECT RAISE(ABORT, 'claim failed'); END
+    """)
+    conn.commit()
+    conn.close()
+
+    assert queue.award_once(3, 'module_complete', 7, points=20, reason="Module")
+    assert not queue.award_once(3, 'module_complete', 7, points=20, reason="Module")
+    assert queue.flush()
+    assert balance(3) == 0
+
+    conn = database.get_pool().acquire()
+    conn.execute("DROP TRIGGER fail_claim")
+    conn.commit()
+    conn.close()
+
+    assert queue.award_once(3, 'module_complete', 7, points=20, reason="Module")
+    assert queue.flush()
+    assert balance(3) == 20
+    assert not queue.award_once(3, 'module_complete', 7, points=20, reason="Module")
+
+def test_app_awards_land_in_the_app_database(app_db):
+    app_db.award_points(1, 40, "Welcome")
+    assert app_db.gamification_queue.flush()
+    conn = app_db.get_db_connection()
+    assert conn.execute("SELECT COUNT(*) FROM points_ledger WHERE reason = 'Welcome'").fetchone()[0] == 1
+    conn.close()
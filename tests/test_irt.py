@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from irt import AdaptiveTest, ItemIndex, estimate_ability, cut_score, MIN_ITEMS, MAX_ITEMS
+
+def item_index(n=60):
+    return ItemIndex(1, (1, 0), np.arange(1, n + 1), np.full(n, 1.5), np.linspace(-2.5, 2.5, n))
+
+def test_prior_alone_is_centred():
+    theta, se = estimate_ability(np.zeros(0), np.zeros(0), [])
+    assert theta == pytest.approx(0.0, abs=1e-9)
+    assert se == pytest.approx(1.0, abs=0.01)
+
+def test_estimate_follows_the_responses():
+    a, b = np.ones(5), np.zeros(5)
+    right, right_se = estimate_ability(a, b, np.ones(5, dtype=bool))
+    wrong, _ = estimate_ability(a, b, np.zeros(5, dtype=bool))
+    assert wrong < 0 < right
+    assert right_se < 1.0
+
+def test_cut_score_of_symmetric_items():
+    a, b = np.ones(3), np.array([-1.0, 0.0, 1.0])
+    assert cut_score(a, b, passing=0.5) == pytest.approx(0.0, abs=1e-6)
+
+def run(index, answer):
+    test = AdaptiveTest(index)
+    while not test.finished():
+        test.record(answer(test.index.b[test.current]))
+    return test
+
+def test_clear_results_stop_early():
+    index = item_index()
+    strong = run(index, lambda difficulty: True)
+    weak = run(index, lambda difficulty: False)
+
+    assert MIN_ITEMS <= len(strong.positions) < MAX_ITEMS
+    assert (strong.decision(), weak.decision()) == ('pass', 'fail')
+    assert len(set(strong.positions)) == len(strong.positions)
+
+def test_borderline_learner_gets_the_maximum():
+    index = item_index()
+    test = run(index, lambda difficulty: difficulty < index.cut)
+    assert len(test.positions) == MAX_ITEMS
+
+def test_retired_items_are_never_selected():
+    index = item_index()
+    test = AdaptiveTest(index)
+    first = test.current
+    test.retire()
+    assert test.current != first
+
+    while not test.finished():
+        test.record(True)
+    assert first not in test.positions
+
+def test_retiring_every_item_ends_the_test():
+    test = AdaptiveTest(item_index(3), min_items=1, max_items=3)
+    test.record(True)
+    test.retire()
+    test.retire()
+    assert test.current is None and test.finished()
+    assert len(test.positions) == 1
+
+def test_missing_questions_are_skipped(app_db):
+    conn = app_db.get_db_connection()
+    try:
+        ids = [row[0] for row in conn.execute("SELECT id FROM quizzes WHERE module_id = 1 ORDER BY id")]
+        # The missing id sits at b = 0, where the first question is picked
+        index = ItemIndex(1, (1, 0), np.array([999999, *ids]), np.full(len(ids) + 1, 1.5),
+                          np.array([0.0, *np.linspace(-2.5, 2.5, len(ids))]))
+        test = AdaptiveTest(index, min_items=1)
+        assert test.current_id() == 999999
+
+        question = app_db.next_adaptive_question(conn.cursor(), test)
+        assert question.id in ids and question.id == test.current_id()
+        assert test.retired == [0]
+    finally:
+        conn.close()
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from item_analysis import analyze_module
+
+KEY = ['A', 'B', 'C']
+
+# Selected answers per attempt (rows) and question (columns); None is unanswered
+SHEETS = [
+    ['A', 'B', 'C'],
+    ['A', 'B', 'D'],
+    ['A', 'C', 'D'],
+    ['B', 'C', None],
+    ['A', 'B', 'C'],
+    ['A', 'D', 'A'],
+]
+
+@pytest.fixture
+def answered(db):
+    for i, letter in enumerate(KEY, 1):
+        db.execute("""
+            INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d, correct_answer, created_date)
+            VALUES (1, ?, 'a', 'b', 'c', 'd', ?, '')
+        """, (f"Question {i}?", letter))
+
+    for attempt, sheet in enumerate(SHEETS):
+        correct = [answer == key for answer, key in zip(sheet, KEY)]
+        db.execute("""
+            INSERT INTO quiz_attempts (id, user_id, module_id, quiz_version, mode, status, score, total_questions,
+                                       started_date)
+            VALUES (?, 1, 1, 0, 'linear', 'completed', ?, ?, '')
+        """, (f"attempt{attempt}", sum(correct), len(KEY)))
+        db.executemany("""
+            INSERT INTO quiz_attempt_answers (attempt_id, question_id, position, selected_answer, is_correct)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(f"attempt{attempt}", question, question - 1, answer, int(right))
+              for question, (answer, right) in enumerate(zip(sheet, correct), 1)])
+    db.commit()
+    return db
+
+def test_statistics_match_a_direct_computation(answered):
+    analysis = analyze_module(answered, 1, (0, 0))
+    items = analysis.items.set_index('question_id')
+
+    correct = np.array([[answer == key for answer, key in zip(sheet, KEY)] for sheet in SHEETS], dtype=float)
+    totals = correct.sum(axis=1) / len(KEY)
+
+    assert analysis.attempts == len(SHEETS)
+    assert items['p_value'].tolist() == pytest.approx(correct.mean(axis=0).tolist())
+    assert items['point_biserial'].tolist() == pytest.approx(
+        [np.corrcoef(correct[:, i], totals)[0, 1] for i in range(len(KEY))])
+    assert items.loc[3, ['rate_A', 'rate_B', 'rate_C', 'rate_D']].tolist() == pytest.approx([1 / 6, 0, 2 / 6, 2 / 6])
+
+    k, p, scores = len(KEY), correct.mean(axis=0), correct.sum(axis=1)
+    assert analysis.kr20 == pytest.approx(k / (k - 1) * (1 - (p * (1 - p)).sum() / scores.var()))
+
+def test_chunked_reads_give_the_same_report(answered):
+    whole = analyze_module(answered, 1, (0, 0))
+    chunked = analyze_module(answered, 1, (0, 0), chunk_rows=4)
+    pd.testing.assert_frame_equal(chunked.items, whole.items)
+    assert chunked.kr20 == pytest.approx(whole.kr20)
+
+def test_flags(answered):
+    answered.execute("""
+        INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d, correct_answer, created_date)
+        VALUES (1, 'Never asked?', 'a', 'b', 'c', 'd', 'A', '')
+    """)
+    flags = analyze_module(answered, 1, (0, 0)).items['flag'].tolist()
+    assert flags[0] == "" and flags[-1] == "No responses"
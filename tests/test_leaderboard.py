@@ -0,0 +1,69 @@
+import random
+from gamification import Leaderboard
+
+def expected(points):
+    board = sorted(points.items(), key=lambda item: (-max(item[1], 0), item[0]))
+    ranks = {user_id: 1 + sum(max(p, 0) > max(points[user_id], 0) for p in points.values()) for user_id in points}
+    return board, ranks
+
+def test_matches_a_sorted_board_through_updates():
+    rng = random.Random(7)
+    board, points = Leaderboard(), {}
+
+    for _ in range(2000):
+        user_id = rng.randrange(60)
+        if rng.random() < 0.1 and user_id in points:
+            board._remove(user_id)
+            del points[user_id]
+        else:
+            points[user_id] = rng.choice([0, 50, 75, 100, rng.randrange(-10, 5000)])
+            board._set(user_id, points[user_id])
+
+    ordered, ranks = expected(points)
+    assert board.top(15) == ordered[:15]
+    assert board.top(1000) == ordered
+    assert {user_id: board.rank(user_id) for user_id in points} == ranks
+    assert board.size() == len(points)
+    assert board.total_points() == sum(points.values())
+
+def test_ties_share_a_rank():
+    board = Leaderboard()
+    for user_id, points in [(3, 100), (1, 100), (2, 50)]:
+        board._set(user_id, points)
+
+    assert board.top() == [(1, 100), (3, 100), (2, 50)]
+    assert [board.rank(user_id) for user_id in (1, 3, 2)] == [1, 1, 3]
+    assert board.rank(99) is None
+
+def test_large_balances_cost_nothing_extra():
+    board = Leaderboard()
+    board._set(1, 10 ** 12)
+    board._set(2, 5)
+    board._set(1, 10 ** 15)
+
+    assert board.top() == [(1, 10 ** 15), (2, 5)]
+    assert [board.rank(1), board.rank(2)] == [1, 2]
+    assert len(board._entries) == 2
+
+def test_refresh_loads_balances_then_catches_up_from_the_ledger(db):
+    from gamification import record_points
+
+    db.executemany("""
+        INSERT INTO users (username, email, password, role, created_date) VALUES (?, ?, '', ?, '')
+    """, [('admin', 'admin@example.com', 'admin'), ('first', 'first@example.com', 'student'),
+          ('second', 'second@example.com', 'student')])
+    cursor = db.cursor()
+    for user_id, points in [(1, 500), (2, 100), (3, 200)]:
+        record_points(cursor, user_id, points, "test")
+    db.commit()
+
+    board = Leaderboard()
+    board.refresh(db)
+    assert board.top() == [(3, 200), (2, 100)]
+    assert board.total_points() == 300
+
+    record_points(cursor, 2, 150, "test")
+    db.commit()
+    board.refresh(db)
+    assert board.top() == [(2, 250), (3, 200)]
+    assert [board.rank(2), board.rank(3), board.rank(1)] == [1, 2, None]
@@ -0,0 +1,146 @@
+import sqlite3
+import pytest
+from migrations import migrate, backfill, current_version, check_query_plans, LATEST_VERSION, MIGRATIONS
+
+# Tables as the original app.py created them, before versioned migrations
+BASELINE_SCHEMA = """
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT NOT NULL DEFAULT 'student',
+        created_date TEXT NOT NULL,
+        last_login TEXT,
+        active INTEGER DEFAULT 1,
+        points INTEGER DEFAULT 0,
+        badges TEXT DEFAULT '[]',
+        streak_days INTEGER DEFAULT 0
+    );
+    CREATE TABLE modules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        difficulty TEXT NOT NULL,
+        category TEXT NOT NULL,
+        content TEXT,
+        youtube_url TEXT,
+        order_index INTEGER DEFAULT 0,
+        created_date TEXT NOT NULL,
+        updated_date TEXT,
+        active INTEGER DEFAULT 1
+    );
+    CREATE TABLE quizzes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        module_id INTEGER NOT NULL,
+        question TEXT NOT NULL,
+        option_a TEXT NOT NULL,
+        option_b TEXT NOT NULL,
+        option_c TEXT NOT NULL,
+        option_d TEXT NOT NULL,
+        correct_answer TEXT NOT NULL,
+        explanation TEXT,
+        created_date TEXT NOT NULL
+    );
+    CREATE TABLE user_progress (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        module_id INTEGER NOT NULL,
+        progress_percentage REAL DEFAULT 0,
+        completed INTEGER DEFAULT 0,
+        started_date TEXT,
+        completed_date TEXT,
+        quiz_score REAL DEFAULT 0,
+        quiz_attempts INTEGER DEFAULT 0
+    );
+    CREATE TABLE user_achievements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        achievement_type TEXT NOT NULL,
+        achievement_name TEXT NOT NULL,
+        points_earned INTEGER DEFAULT 0,
+        earned_date TEXT NOT NULL
+    );
+    CREATE TABLE content_research (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        topic TEXT NOT NULL,
+        content TEXT NOT NULL,
+        sources TEXT NOT NULL,
+        created_date TEXT NOT NULL,
+        status TEXT DEFAULT 'pending'
+    );
+"""
+
+@pytest.fixture
+def baseline(tmp_path):
+    """A database as the original app left it, with some data"""
+    conn = sqlite3.connect(tmp_path / "baseline.db")
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executescript("""
+        INSERT INTO users (username, email, password, created_date, points, badges)
+        VALUES ('learner', 'learner@example.com', '', '2024-01-01', 120, '["Quiz Taker"]');
+        INSERT INTO modules (title, difficulty, category, content, created_date)
+        VALUES ('Basics', 'Beginner', 'Fundamentals', '# Basics\nText', '2024-01-01');
+        INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d, correct_answer,
+                             created_date)
+        VALUES (1, 'What is RERA?', 'A regulator', 'A tax', 'A loan', 'A deed', 'A', '2024-01-01');
+    """)
+    conn.commit()
+    yield conn
+    conn.close()
+
+def test_baseline_database_migrates_to_latest(baseline):
+    assert migrate(baseline) == [migration.version for migration in MIGRATIONS]
+    assert current_version(baseline) == LATEST_VERSION
+    assert check_query_plans(baseline) == {}
+
+    # Existing rows survive and are indexed by the new features
+    assert baseline.execute("SELECT title FROM modules").fetchall() == [('Basics',)]
+    assert baseline.execute("SELECT COUNT(*) FROM quizzes_fts WHERE quizzes_fts MATCH 'rera'").fetchone()[0] == 1
+
+    assert migrate(baseline) == []
+
+def test_derived_data_is_backfilled_after_migrating(baseline):
+    migrate(baseline)
+
+    assert baseline.execute("SELECT COUNT(*) FROM module_sections WHERE module_id = 1").fetchone()[0] > 0
+    assert baseline.execute("SELECT question_id FROM question_signatures").fetchall() == [(1,)]
+    assert backfill(baseline) == (0, 0)
+
+    # Only rows that still need it are touched
+    baseline.execute("UPDATE modules SET content_hash = NULL")
+    baseline.execute("""
+        INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d, correct_answer, created_date)
+        VALUES (1, 'What is TDR?', 'A right', 'A tax', 'A loan', 'A deed', 'A', '2024-01-01')
+    """)
+    baseline.commit()
+    assert backfill(baseline) == (1, 1)
+
+def test_json_badges_become_rows_in_their_order(baseline):
+    baseline.executescript("""
+        UPDATE users SET badges = '["Quiz Taker", "Early Bird", "Quiz Taker"]';
+        INSERT INTO users (username, email, password, created_date, badges)
+        VALUES ('broken', 'broken@example.com', '', '2024-01-02', 'not json'),
+               ('mixed', 'mixed@example.com', '', '2024-01-03', '[1, "Streak"]');
+    """)
+    migrate(baseline)
+
+    rows = baseline.execute("SELECT user_id, badge, earned_date FROM user_badges ORDER BY id").fetchall()
+    assert rows == [(1, 'Quiz Taker', '2024-01-01'), (1, 'Early Bird', '2024-01-01'), (3, 'Streak', '2024-01-03')]
+
+def test_duplicate_progress_rows_are_compacted(baseline):
+    baseline.executescript("""
+        INSERT INTO user_progress (user_id, module_id, quiz_score, quiz_attempts, completed, started_date)
+        VALUES (1, 1, 90, 1, 1, '2024-01-02'),
+               (1, 1, 60, 1, 0, '2024-01-01'),
+               (1, 1, 75, 1, 0, '2024-01-03');
+    """)
+    migrate(baseline)
+
+    rows = baseline.execute("""
+        SELECT id, quiz_score, best_score, quiz_attempts, completed, started_date FROM user_progress
+    """).fetchall()
+    assert rows == [(1, 75, 90, 3, 1, '2024-01-01')]
+
+    with pytest.raises(sqlite3.IntegrityError):
+        baseline.execute("INSERT INTO user_progress (user_id, module_id) VALUES (1, 1)")
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+def button(at, label):
+    return next(b for b in list(at.button) + list(at.sidebar.button) if b.label.startswith(label))
+
+def content_reads(statements):
+    return [sql for sql in statements if 'SELECT title, description, content' in sql]
+
+def stored_content(module_id):
+    """Content as saved, read outside the pool so it isn't traced"""
+    conn = sqlite3.connect("app.db")
+    try:
+        return conn.execute("SELECT content FROM modules WHERE id = ?", (module_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+def open_editor(trace_sql):
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    at.sidebar.text_input[0].input('admin')
+    at.sidebar.text_input[1].input('admin123')
+    button(at, 'Login').click()
+    at.run()
+
+    statements = trace_sql()
+    button(at, '📚 Content Management').click()
+    at.run()
+    assert not at.exception
+    return at, statements
+
+def test_only_the_selected_module_is_loaded(app_db, trace_sql):
+    at, statements = open_editor(trace_sql)
+
+    reads = content_reads(statements)
+    assert len(reads) == 1 and 'WHERE id = 1' in reads[0]
+    assert at.text_input[0].value == app_db.get_module_content(1)['title']
+
+def test_drafts_survive_switching_modules_until_saved(app_db, trace_sql):
+    at, statements = open_editor(trace_sql)
+    modules = app_db.get_available_modules()
+    stored = stored_content(1)
+
+    at.text_area[1].input("Draft body")
+    button(at, '📝 Keep Draft').click()
+    at.run()
+    assert stored_content(1) == stored
+
+    at.selectbox[0].set_value(modules[1])
+    at.run()
+    at.selectbox[0].set_value(modules[0])
+    at.run()
+    assert at.text_area[1].value == "Draft body"
+    assert len(content_reads(statements)) == 2
+
+    button(at, '💾 Update Module').click()
+    at.run()
+    assert not at.exception
+    assert stored_content(1) == "Draft body"
@@ -0,0 +1,37 @@
+def execute(app, sql, params=()):
+    conn = app.get_db_connection()
+    cursor = conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+    return cursor.lastrowid
+
+def test_summaries_count_questions_and_best_score(app_db):
+    user_id = execute(app_db, """
+        INSERT INTO users (username, email, password, role, created_date)
+        VALUES ('learner', 'learner@example.com', '', 'student', '')
+    """)
+    execute(app_db, """
+        INSERT INTO user_progress (user_id, module_id, quiz_score, best_score, quiz_attempts, started_date)
+        VALUES (?, 1, 60, 85, 2, '')
+    """, (user_id,))
+
+    conn = app_db.get_db_connection()
+    counts = dict(conn.execute("SELECT module_id, COUNT(*) FROM quizzes GROUP BY module_id").fetchall())
+    conn.close()
+
+    summaries = app_db.get_module_summaries(user_id)
+    assert [s['question_count'] for s in summaries] == [counts.get(s['id'], 0) for s in summaries]
+    assert [s['best_score'] for s in summaries if s['id'] == 1] == [85]
+    assert all(s['best_score'] is None for s in summaries if s['id'] != 1)
+
+def test_summaries_take_one_query_however_many_modules(app_db, trace_sql):
+    for i in range(20):
+        execute(app_db, """
+            INSERT INTO modules (title, difficulty, category, content, created_date, active)
+            VALUES (?, 'Beginner', 'Extra', '', '', 1)
+        """, (f"Extra {i}",))
+
+    statements = trace_sql()
+    summaries = app_db.get_module_summaries(1)
+    assert len(summaries) > 20
+    assert len(statements) == 1
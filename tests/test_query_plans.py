@@ -0,0 +1,24 @@
+import pytest
+from migrations import HOT_QUERIES, METADATA_QUERIES, check_query_plans, content_reads
+
+def test_hot_queries_use_indexes(db):
+    assert check_query_plans(db) == {}
+
+@pytest.mark.parametrize('name', METADATA_QUERIES)
+def test_metadata_queries_never_read_content(db, name):
+    sql, params = HOT_QUERIES[name]
+    assert content_reads(db, sql, params) == []
+
+def test_check_reports_a_full_scan(db):
+    queries = {'scan': ("SELECT * FROM quizzes WHERE explanation = ?", ('x',))}
+    assert list(check_query_plans(db, queries)) == ['scan']
+
+def test_module_lookup_survives_a_missing_metadata_index(db):
+    from quiz_engine import module_title
+
+    db.execute("""
+        INSERT INTO modules (title, difficulty, category, content, created_date, active)
+        VALUES ('Title', 'Beginner', 'Basics', 'Content', '', 1)
+    """)
+    db.execute("DROP INDEX idx_modules_metadata")
+    assert module_title(db.cursor(), 1) == 'Title'
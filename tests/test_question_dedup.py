@@ -0,0 +1,89 @@
+import numpy as np
+from cache import bump_version
+from quiz_engine import quiz_version_name
+from question_dedup import (bucket_pairs, signatures, similarity, normalize, find_duplicates, index_question,
+                            duplicate_pairs, shared_buckets, DuplicateReport, DUPLICATE_THRESHOLD, BANDS)
+
+OPTIONS = ('Carpet area', 'Built-up area', 'Super built-up area', 'Plot area')
+
+def test_bucket_pairs_share_a_bucket():
+    rows = np.array([[0, 1, 10], [0, 1, 11], [0, 2, 12], [1, 3, 11], [1, 3, 12]])
+    assert bucket_pairs(rows).tolist() == [[10, 11], [11, 12]]
+
+def test_bucket_pairs_are_capped_per_bucket():
+    rows = np.array([[0, 7, question_id] for question_id in range(200)])
+    pairs = bucket_pairs(rows)
+    assert len(pairs) < 200 * 199 // 2
+    assert (pairs[:, 0] < pairs[:, 1]).all()
+
+def test_bucket_pairs_of_nothing():
+    assert bucket_pairs(np.array([[0, 1, 10], [0, 2, 11]])).shape == (0, 2)
+
+def test_option_order_does_not_matter():
+    first, second = signatures([normalize("Which area is quoted?", OPTIONS),
+                                normalize("which AREA is quoted", OPTIONS[::-1])])
+    assert similarity(first, second[None])[0] == 1.0
+
+def test_near_duplicates_clear_the_threshold_and_unrelated_questions_do_not():
+    texts = [normalize(question, OPTIONS) for question in (
+        "Which area must builders quote when selling an apartment under RERA?",
+        "Which area must builders quote when selling apartments under RERA?",
+        "How is stamp duty calculated on a resale flat in Gujarat?",
+    )]
+    rows = signatures(texts)
+    scores = similarity(rows[0], rows[1:])
+    assert scores[0] >= DUPLICATE_THRESHOLD > scores[1]
+
+def test_find_duplicates_uses_the_index(db):
+    db.execute("""
+        INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d, correct_answer, created_date)
+        VALUES (1, 'Which area must builders quote under RERA?', ?, ?, ?, ?, 'A', '')
+    """, OPTIONS)
+    cursor = db.cursor()
+    index_question(cursor, 1, 'Which area must builders quote under RERA?', OPTIONS)
+    assert db.execute("SELECT COUNT(*) FROM question_lsh").fetchone()[0] == BANDS
+
+    duplicates = find_duplicates(cursor, 'Which area must a builder quote under RERA?', OPTIONS)
+    assert [d.question_id for d in duplicates] == [1]
+    assert find_duplicates(cursor, 'What does TDR stand for?', ('a', 'b', 'c', 'd')) == []
+
+def add_question(db, question):
+    db.execute("""
+        INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d, correct_answer, created_date)
+        VALUES (1, ?, ?, ?, ?, ?, 'A', '')
+    """, (question, *OPTIONS))
+
+def test_duplicate_pairs_signs_only_unsigned_questions(db):
+    add_question(db, 'Which area must builders quote when selling an apartment under RERA?')
+    add_question(db, 'How is stamp duty calculated on a resale flat in Gujarat?')
+    cursor = db.cursor()
+    assert duplicate_pairs(cursor) == []
+    assert db.execute("SELECT COUNT(*) FROM question_signatures").fetchone()[0] == 2
+
+    # A stored signature is trusted rather than recomputed from the text
+    db.execute("UPDATE question_signatures SET signature = zeroblob(length(signature)) WHERE question_id = 2")
+    add_question(db, 'Which area must builders quote when selling apartments under RERA?')
+    pairs = duplicate_pairs(cursor)
+    assert [(first, second) for _, first, second in pairs] == [(1, 3)]
+    assert pairs[0][0] >= DUPLICATE_THRESHOLD
+    assert set(shared_buckets(cursor)[:, 2].tolist()) >= {1, 3}
+
+def test_duplicate_report_is_reused_until_questions_change(db, monkeypatch):
+    add_question(db, 'Which area must builders quote when selling an apartment under RERA?')
+    add_question(db, 'Which area must builders quote when selling apartments under RERA?')
+    cursor = db.cursor()
+    report = DuplicateReport()
+    built = []
+    monkeypatch.setattr('question_dedup.duplicate_pairs',
+                        lambda cursor, threshold: built.append(threshold) or duplicate_pairs(cursor, threshold))
+
+    assert len(report.get(cursor, 0.6)) == 1
+    assert len(report.get(cursor, 0.6)) == 1
+    assert built == [0.6]
+
+    report.get(cursor, 0.9)
+    assert built == [0.6, 0.9]
+
+    bump_version(cursor, quiz_version_name(1))
+    report.get(cursor, 0.6)
+    assert built == [0.6, 0.9, 0.6]
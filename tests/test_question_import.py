@@ -0,0 +1,22 @@
+def question(text, answer='A'):
+    return {'question': text, 'option_a': 'Carpet area', 'option_b': 'Built-up area',
+            'option_c': 'Super built-up area', 'option_d': 'Plot area', 'correct_answer': answer}
+
+def test_near_duplicates_are_skipped(app_db):
+    added, skipped = app_db.import_quiz_questions(1, [
+        question("Which area does RERA require builders to quote when selling an apartment?"),
+        question("Which area does RERA require builders to quote when selling apartments?"),
+    ])
+    assert added == 1
+    assert [(row, duplicate.question_id > 0) for row, _, duplicate in skipped] == [(2, True)]
+
+def test_failed_import_is_reported(app_db):
+    conn = app_db.get_db_connection()
+    conn.execute("""
+        CREATE TRIGGER fail_import BEFORE INSERT ON quizzes
+        BEGIN SELECT RAISE(ABORT, 'import failed'); END
+    """)
+    conn.commit()
+    conn.close()
+
+    assert app_db.import_quiz_questions(1, [question("What does FSI stand for in zoning rules?")]) == (None, [])
@@ -0,0 +1,31 @@
+def add_questions(app, module_id, count):
+    conn = app.get_db_connection()
+    conn.executemany("""
+        INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d, correct_answer, created_date)
+        VALUES (?, ?, 'a', 'b', 'c', 'd', 'A', '')
+    """, [(module_id, f"Question {i}") for i in range(count)])
+    conn.commit()
+    ids = [row[0] for row in conn.execute("SELECT id FROM quizzes WHERE module_id = ? ORDER BY id", (module_id,))]
+    conn.close()
+    return ids
+
+def test_pages_cover_the_module_once_in_order(app_db):
+    ids = add_questions(app_db, 2, 45)
+
+    seen, after, pages = [], None, 0
+    while True:
+        questions, after = app_db.get_module_questions_page(2, after=after, page_size=20)
+        seen += [q['id'] for q in questions]
+        pages += 1
+        if after is None:
+            break
+
+    assert seen == ids
+    assert pages == -(-len(ids) // 20)
+
+def test_page_holds_only_that_module(app_db):
+    add_questions(app_db, 3, 5)
+    questions, after = app_db.get_module_questions_page(3, page_size=20)
+    assert after is None
+    assert [q['question'] for q in questions][-5:] == [f"Question {i}" for i in range(5)]
+    assert {q['correct_answer'] for q in questions} <= set('ABCD')
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+def student(app):
+    conn = app.get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO users (username, email, password, role, created_date)
+        VALUES ('learner', 'learner@example.com', '', 'student', '')
+    """)
+    conn.commit()
+    user_id = cursor.lastrowid
+    conn.close()
+    return user_id
+
+def attempt_row(app, attempt_id):
+    conn = app.get_db_connection()
+    try:
+        return conn.execute("SELECT status, score FROM quiz_attempts WHERE id = ?", (attempt_id,)).fetchone()
+    finally:
+        conn.close()
+
+def start_assessment(app, user_id):
+    assert app.create_assessment(1, "Mock test", 3, 10, 70)
+    return app.start_timed_attempt(user_id, app.get_module_assessments(1)[0])
+
+def expire(app, attempt_id):
+    conn = app.get_db_connection()
+    conn.execute("UPDATE quiz_attempts SET deadline = ? WHERE id = ?",
+                 ((datetime.now() - timedelta(hours=1)).isoformat(), attempt_id))
+    conn.commit()
+    conn.close()
+
+def test_completing_an_attempt_twice_records_it_once(app_db):
+    user_id = student(app_db)
+    attempt_id, snapshot = app_db.start_quiz_attempt(user_id, app_db.get_question_bank(1))
+    answers = {i: question.correct_answer for i, question in enumerate(snapshot.questions)}
+
+    first = app_db.complete_quiz_attempt(attempt_id, snapshot, answers)
+    second = app_db.complete_quiz_attempt(attempt_id, snapshot, {})
+    assert first == second == {'score': len(snapshot), 'total_questions': len(snapshot), 'on_time': True}
+
+    conn = app_db.get_db_connection()
+    assert conn.execute("SELECT quiz_attempts FROM user_progress WHERE user_id = ?", (user_id,)).fetchone()[0] == 1
+    conn.close()
+
+def test_failed_progress_write_rolls_back_the_attempt(app_db):
+    user_id = student(app_db)
+    attempt_id, snapshot = app_db.start_quiz_attempt(user_id, app_db.get_question_bank(1))
+
+    conn = app_db.get_db_connection()
+    conn.execute("""
+        CREATE TRIGGER fail_progress BEFORE INSERT ON user_progress
+        BEGIN SELECT RAISE(ABORT, 'progress write failed'); END
+    """)
+    conn.commit()
+    conn.close()
+
+    assert app_db.complete_quiz_attempt(attempt_id, snapshot, {0: 'A'}) is None
+    assert tuple(attempt_row(app_db, attempt_id)) == ('in_progress', None)
+
+def test_answers_after_the_deadline_do_not_count(app_db):
+    user_id = student(app_db)
+    attempt_id, snapshot, _ = start_assessment(app_db, user_id)
+    expire(app_db, attempt_id)
+
+    answers = {i: question.correct_answer for i, question in enumerate(snapshot.questions)}
+    result = app_db.complete_quiz_attempt(attempt_id, snapshot, answers)
+    assert result == {'score': 0, 'total_questions': 3, 'on_time': False}
+
+def test_running_timed_attempt_is_resumed(app_db):
+    user_id = student(app_db)
+    attempt_id, snapshot, deadline = start_assessment(app_db, user_id)
+
+    resumed_id, resumed, resumed_deadline, passing_score = app_db.resume_timed_attempt(user_id, 1)
+    assert (resumed_id, resumed_deadline, passing_score) == (attempt_id, deadline, 70)
+    assert resumed.questions == snapshot.questions
+
+def test_abandoned_timed_attempt_is_finalized(app_db):
+    user_id = student(app_db)
+    attempt_id, _, _ = start_assessment(app_db, user_id)
+    expire(app_db, attempt_id)
+
+    assert app_db.resume_timed_attempt(user_id, 1) is None
+    assert tuple(attempt_row(app_db, attempt_id)) == ('completed', 0)
@@ -0,0 +1,59 @@
+from array import array
+import pytest
+from quiz_engine import snapshot_cache, bank_cache, QuestionBank, allocate, sample_ids
+
+@pytest.fixture
+def app(app_db):
+    # The caches are process-wide; start each test from an empty one
+    for cache in (snapshot_cache, bank_cache):
+        cache._entries.clear()
+    return app_db
+
+def snapshot(app, module_id):
+    conn = app.get_db_connection()
+    try:
+        return snapshot_cache.get(conn, module_id)
+    finally:
+        conn.close()
+
+def test_snapshot_follows_module_edits(app):
+    assert snapshot(app, 1).title != "Renamed"
+
+    app.update_module_content(1, "Renamed", "Description", "Content", "")
+    assert snapshot(app, 1).title == "Renamed"
+
+def test_deleted_module_has_no_snapshot(app):
+    assert snapshot(app, 1) is not None
+
+    app.delete_module(1)
+    assert snapshot(app, 1) is None
+    assert app.get_question_bank(1) is None
+
+def bank():
+    ids = array('q', range(1, 101))
+    strata = {
+        'difficulty': {
+            'Beginner': array('q', range(1, 61)),
+            'Advanced': array('q', range(61, 91)),
+            None: array('q', range(91, 101)),
+        },
+        'tag': {None: ids},
+    }
+    return QuestionBank(1, 3, "Module", ids, strata)
+
+def test_allocate_is_proportional_and_exact():
+    assert allocate([60, 30, 10], 10) == [6, 3, 1]
+    assert sum(allocate([5, 5, 5], 7)) == 7
+
+def test_same_seed_same_draw():
+    assert sample_ids(bank(), 20, seed=42) == sample_ids(bank(), 20, seed=42)
+    assert sample_ids(bank(), 20, seed=42) != sample_ids(bank(), 20, seed=43)
+
+def test_draw_has_no_repeats_and_is_capped_at_the_bank():
+    assert len(set(sample_ids(bank(), 20, seed=1))) == 20
+    assert sorted(sample_ids(bank(), 500, seed=1)) == list(range(1, 101))
+
+def test_stratified_draw_follows_stratum_sizes():
+    ids = sample_ids(bank(), 20, seed=7, stratify='difficulty')
+    assert sample_ids(bank(), 20, seed=7, stratify='difficulty') == ids
+    assert [sum(low <= i <= high for i in ids) for low, high in ((1, 60), (61, 90), (91, 100))] == [12, 6, 2]
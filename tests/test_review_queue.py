@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+import pytest
+from review_queue import (sm2, record_answers, review_card, due_cards, DEFAULT_EASINESS, MIN_EASINESS,
+                          AGAIN, HARD, GOOD, EASY)
+
+def test_intervals_grow_one_six_then_by_easiness():
+    card = (DEFAULT_EASINESS, 0, 0)
+    intervals = []
+    for _ in range(4):
+        card = sm2(*card, GOOD)
+        intervals.append(card[1])
+
+    assert intervals == [1, 6, 15, 38]
+    assert card == (DEFAULT_EASINESS, 38, 4)
+
+def test_easy_and_hard_move_the_easiness():
+    assert sm2(DEFAULT_EASINESS, 0, 0, EASY)[0] == pytest.approx(2.6)
+    assert sm2(DEFAULT_EASINESS, 0, 0, HARD)[0] == pytest.approx(2.36)
+
+def test_lapse_restarts_the_card():
+    easiness, interval, repetitions = sm2(2.0, 30, 5, AGAIN)
+    assert (interval, repetitions) == (0, 0)
+    assert easiness == pytest.approx(1.46)
+
+def test_easiness_never_drops_below_the_floor():
+    assert sm2(MIN_EASINESS, 0, 0, AGAIN)[0] == MIN_EASINESS
+
+def test_only_missed_questions_become_cards(db):
+    now = datetime(2024, 1, 1)
+    cursor = db.cursor()
+    assert record_answers(cursor, [(1, 10, 1, False), (1, 11, 1, True)], now) == 1
+    assert due_cards(cursor, 1, now) == [10]
+
+    # Recalled well: the card is next due in a day
+    assert review_card(cursor, 1, 10, GOOD, now)
+    assert due_cards(cursor, 1, now) == []
+    assert due_cards(cursor, 1, now + timedelta(days=1)) == [10]
+    assert not review_card(cursor, 1, 11, GOOD, now)
@@ -0,0 +1,34 @@
+import pytest
+from search import fts_query, highlight, search, MATCH_START, MATCH_END
+
+@pytest.mark.parametrize('text, query', [
+    ("", None),
+    ("  ?! ", None),
+    ("stamp duty", '"stamp" "duty"*'),
+    ("stamp duty ", '"stamp" "duty"'),
+    ("what is the carpet area", '"carpet" "area"*'),
+    ("what is", '"what" "is"'),
+    ("RERA ca", '"rera" "ca"'),
+    ('fsi" OR tdr', '"fsi" "tdr"*'),
+])
+def test_fts_query(text, query):
+    assert fts_query(text) == query
+
+def test_highlight_escapes_markdown_and_bolds_matches():
+    assert highlight(f"## {MATCH_START}FSI{MATCH_END} (floor *space* index)") == r"**FSI** \(floor space index\)"
+
+def test_search_finds_active_modules_and_questions(db):
+    db.execute("""
+        INSERT INTO modules (title, difficulty, category, content, created_date, active)
+        VALUES ('Stamp duty basics', 'Beginner', 'Finance', 'How stamp duty is charged', '', 1),
+               ('Old stamp duty rules', 'Beginner', 'Finance', 'Retired', '', 0)
+    """)
+    db.execute("""
+        INSERT INTO quizzes (module_id, question, option_a, option_b, option_c, option_d, correct_answer, created_date)
+        VALUES (1, 'Who pays stamp duty?', 'Buyer', 'Seller', 'Broker', 'Bank', 'A', '')
+    """)
+
+    results = search(db.cursor(), "stamp dut", kinds=('modules', 'quizzes'))
+    assert [r.title for r in results['modules'][0]] == ['Stamp duty basics']
+    assert [r.id for r in results['quizzes'][0]] == [1]
+    assert results['modules'][1] and results['quizzes'][1]
@@ -0,0 +1,42 @@
+def add_users(app, count):
+    conn = app.get_db_connection()
+    conn.executemany("""
+        INSERT INTO users (username, email, password, role, created_date, active)
+        VALUES (?, ?, '', ?, ?, ?)
+    """, [(f"user{i:03d}", f"user{i:03d}@example.com", 'professional' if i % 3 == 0 else 'student',
+           f"2024-01-01T00:00:{i % 7:02d}", int(i % 4 != 0)) for i in range(count)])
+    conn.commit()
+    conn.close()
+
+def all_pages(app, page_size=10, **filters):
+    users, after = [], None
+    while True:
+        page, after = app.get_users_page(after=after, page_size=page_size, **filters)
+        assert len(page) <= page_size
+        users += page
+        if after is None:
+            return users
+
+def test_pages_cover_every_user_once_newest_first(app_db):
+    add_users(app_db, 55)
+    users = all_pages(app_db)
+
+    keys = [(user['created_date'], user['id']) for user in users]
+    assert keys == sorted(keys, reverse=True)
+    assert len({user['id'] for user in users}) == len(users) == app_db.get_user_totals()['total']
+
+def test_filters_match_the_totals(app_db):
+    add_users(app_db, 55)
+
+    students = all_pages(app_db, role='student', active=True)
+    assert students and all(user['role'] == 'student' and user['active'] for user in students)
+    assert app_db.get_user_totals(role='student', active=True)['matching'] == len(students)
+
+    found = all_pages(app_db, search='user01')
+    assert sorted(user['username'] for user in found) == [f"user{i:03d}" for i in range(10, 20)]
+    assert app_db.get_user_totals(search='user01')['matching'] == 10
+
+def test_page_rows_carry_points_and_badges(app_db):
+    assert app_db.register_user('learner', 'learner@example.com', 'secret1', 'student')
+    learner = [user for user in all_pages(app_db) if user['username'] == 'learner'][0]
+    assert (learner['points'], learner['badge_count'], learner['badges']) == (100, 1, ['Welcome Learner'])